@@ -0,0 +1,237 @@
+from collections import Counter, OrderedDict
+import hashlib
+import math
+import os
+import re
+import sys
+import threading
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.llm_utils import CHARS_PER_TOKEN
+
+load_dotenv()
+
+# Context compression settings
+# CONTEXT_COMPRESSION = on/off (default on)
+# CONTEXT_MAX_TOKENS = bound on the research context of whole-document prompts
+#                      (summaries, claim extraction, batched verification; default 2000)
+# CLAIM_CONTEXT_TOKENS = research context sent to verify one claim (default 600)
+# CONTEXT_CHUNK_TOKENS = target passage size for ranking (default 120)
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "on").lower() not in ("off", "false", "0")
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", 2000))
+CLAIM_CONTEXT_TOKENS = int(os.getenv("CLAIM_CONTEXT_TOKENS", 600))
+CONTEXT_CHUNK_TOKENS = int(os.getenv("CONTEXT_CHUNK_TOKENS", 120))
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "in", "on", "at", "to", "for", "with", "by",
+    "from", "as", "into", "is", "are", "was", "were", "be", "been", "being", "it", "its",
+    "this", "that", "these", "those", "which", "who", "has", "have", "had", "can", "will"
+}
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercase content words and numbers with a light plural stem"""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def dedupe_sentences(text: str) -> tuple:
+    """
+    Drop repeated sentences, keeping the first occurrence and line layout
+    
+    Returns:
+        (deduplicated text, number of sentences removed)
+    """
+    seen = set()
+    removed = 0
+    lines = []
+    for line in text.split("\n"):
+        kept = []
+        for sentence in _SENTENCE_BOUNDARY.split(line.strip()):
+            key = " ".join(re.findall(r"[a-z0-9]+", sentence.lower()))
+            if key and key in seen:
+                removed += 1
+                continue
+            seen.add(key)
+            kept.append(sentence)
+        if kept or not line.strip():
+            lines.append(" ".join(kept))
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip(), removed
+
+
+def chunk_passages(text: str, chunk_chars: int) -> list:
+    """
+    Split text into passages of about chunk_chars, on sentence boundaries
+    
+    Paragraph breaks end a passage unless it is still short (e.g. a heading),
+    so headings stay attached to the text under them.
+    """
+    passages = []
+    current = []
+    size = 0
+    for paragraph in re.split(r"\n\s*\n|\n(?=\s*[-*#\d])", text):
+        for sentence in _SENTENCE_BOUNDARY.split(paragraph.strip()):
+            if not sentence:
+                continue
+            if current and size + len(sentence) > chunk_chars:
+                passages.append(" ".join(current))
+                current, size = [], 0
+            current.append(sentence)
+            size += len(sentence) + 1
+        if current and size >= chunk_chars / 3:
+            passages.append(" ".join(current))
+            current, size = [], 0
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+class BM25:
+    """Okapi BM25 ranking over a fixed list of tokenized passages"""
+    
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_length = (sum(self.lengths) / len(documents)) if documents else 0
+        document_frequency = Counter(term for doc in self.term_counts for term in doc)
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+    
+    def scores(self, query_tokens: list) -> list:
+        """BM25 score of every passage for the query"""
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            score = 0.0
+            for term in set(query_tokens):
+                tf = counts.get(term, 0)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+
+class PreparedContext:
+    """Research text deduplicated, chunked and indexed once, then queried per prompt"""
+    
+    def __init__(self, text: str, chunk_chars: int):
+        self.original = text
+        self.text, self.duplicates_removed = dedupe_sentences(text)
+        self.passages = chunk_passages(self.text, chunk_chars)
+        self.index = BM25([tokenize(p) for p in self.passages])
+    
+    def select(self, query_tokens: list, budget_chars: int, keep_first: bool = False) -> list:
+        """
+        Indices of the highest-scoring passages for the query that fit in
+        budget_chars (a passage larger than the budget is cut to fit)
+        """
+        scores = self.index.scores(query_tokens)
+        ranked = sorted(range(len(self.passages)), key=lambda i: scores[i], reverse=True)
+        if keep_first and ranked:
+            ranked.remove(0)
+            ranked.insert(0, 0)
+        
+        chosen = []
+        used = 0
+        for i in ranked:
+            if chosen and scores[i] <= 0:
+                break
+            passage_chars = len(self.passages[i]) + 2
+            if chosen and used + passage_chars > budget_chars:
+                continue
+            chosen.append(i)
+            used += passage_chars
+        return chosen
+    
+    def render(self, indices, budget_chars: int) -> str:
+        """Selected passages joined in their original order"""
+        return "\n\n".join(self.passages[i] for i in sorted(indices))[:budget_chars]
+    
+    def salient_terms(self, limit: int = 30) -> list:
+        """Most frequent content terms of the whole text"""
+        counts = Counter(term for passage in self.index.term_counts for term in passage.elements())
+        return [term for term, _ in counts.most_common(limit)]
+
+
+class ContextCompressor:
+    """
+    Shrinks the research context pasted into summarizer and fact-check prompts
+    
+    Every prompt gets the research text with duplicate sentences removed.
+    When that is still over budget, passages are ranked with BM25: against
+    the claim(s) for verification prompts, against the text's most frequent
+    terms (plus its opening passage) for whole-document prompts.
+    Prepared texts are cached, since one report prompts on the same text
+    up to ten times.
+    """
+    
+    def __init__(self, enabled: bool = None, max_tokens: int = None, claim_tokens: int = None,
+                 chunk_tokens: int = None, cache_size: int = 32):
+        self.enabled = CONTEXT_COMPRESSION if enabled is None else enabled
+        self.max_chars = (max_tokens or CONTEXT_MAX_TOKENS) * CHARS_PER_TOKEN
+        self.claim_chars = (claim_tokens or CLAIM_CONTEXT_TOKENS) * CHARS_PER_TOKEN
+        self.chunk_chars = (chunk_tokens or CONTEXT_CHUNK_TOKENS) * CHARS_PER_TOKEN
+        self.cache_size = cache_size
+        self._prepared = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def prepare(self, text: str) -> PreparedContext:
+        key = hashlib.md5(text.encode()).hexdigest()
+        with self._lock:
+            if key in self._prepared:
+                self._prepared.move_to_end(key)
+                return self._prepared[key]
+        
+        prepared = PreparedContext(text, self.chunk_chars)
+        with self._lock:
+            self._prepared[key] = prepared
+            while len(self._prepared) > self.cache_size:
+                self._prepared.popitem(last=False)
+        return prepared
+    
+    def document_context(self, text: str) -> str:
+        """Bounded context for prompts about the whole text (summaries, claim extraction)"""
+        if not self.enabled:
+            return text
+        prepared = self.prepare(text)
+        if len(prepared.text) <= self.max_chars:
+            return prepared.text
+        indices = prepared.select(prepared.salient_terms(), self.max_chars, keep_first=True)
+        return prepared.render(indices, self.max_chars)
+    
+    def claim_context(self, text: str, claims) -> str:
+        """
+        Bounded context for verifying one claim, or a list of claims in one
+        prompt (each claim gets an equal share of the budget)
+        """
+        if not self.enabled:
+            return text
+        claims = [claims] if isinstance(claims, str) else claims
+        budget = min(self.max_chars, self.claim_chars * len(claims))
+        prepared = self.prepare(text)
+        if len(prepared.text) <= budget:
+            return prepared.text
+        
+        indices = set()
+        for claim in claims:
+            indices.update(prepared.select(tokenize(claim), budget // len(claims)))
+        return prepared.render(indices, budget)
+
+
+# Shared by the agents so a report's research text is prepared once
+compressor = ContextCompressor()
@@ -1,50 +1,33 @@
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
+import asyncio
+import math
+import os
 import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.context_compression import compressor
+from agents.llm_clients import get_llm
+from agents.llm_utils import LLMCallMetrics, parse_json_response
 
 load_dotenv(override=True)
 
-class FactCheckerAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.1  # Very low for factual verification
-        )
-    
-    def verify_claims(self, research_text: str, sources: list = None) -> dict:
-        """
-        Verify claims in research text against sources
-        
-        Args:
-            research_text: The research output to verify
-            sources: List of source texts/URLs used in research
-        """
-        
-        # Step 1: Extract claims
-        extract_prompt = PromptTemplate(
-            input_variables=["research_text"],
-            template="""Extract all factual claims from this research text. List each claim as a numbered statement.
+EXTRACT_PROMPT = PromptTemplate(
+    input_variables=["research_text"],
+    template="""Extract all factual claims from this research text. List each claim as a numbered statement.
 
 Research:
 {research_text}
 
 Factual Claims (one per line):"""
-        )
-        
-        chain = extract_prompt | self.llm
-        claims_result = chain.invoke({"research_text": research_text})
-        
-        # Parse claims
-        claims = [line.strip() for line in claims_result.content.split('\n') 
-                  if line.strip() and re.match(r'^\d+\.', line.strip())]
-        
-        # Step 2: Verify each claim
-        verify_prompt = PromptTemplate(
-            input_variables=["claim", "research_text"],
-            template="""Verify this claim against the research context. Provide:
+)
+
+VERIFY_PROMPT = PromptTemplate(
+    input_variables=["claim", "research_text"],
+    template="""Verify this claim against the research context. Provide:
 1. Verification status: SUPPORTED / PARTIALLY SUPPORTED / UNSUPPORTED
 2. Confidence score: 0-100%
 3. Evidence: Quote supporting text or explain why unsupported
@@ -56,39 +39,408 @@ Research Context:
 {research_text}
 
 Verification:"""
-        )
+)
+
+BATCH_VERIFY_PROMPT = PromptTemplate(
+    input_variables=["claims", "research_text"],
+    template="""Verify each numbered claim against the research context.
+
+Respond with ONLY a JSON array containing one object per claim, in the same order:
+[{{"id": 1, "status": "SUPPORTED | PARTIALLY SUPPORTED | UNSUPPORTED", "confidence": 0-100, "evidence": "quote supporting text or explain why unsupported", "concerns": "any issues with the claim"}}]
+
+Claims:
+{claims}
+
+Research Context:
+{research_text}
+
+JSON:"""
+)
+
+VERIFICATION_MODES = ("per_claim", "batched")
+
+
+class FactCheckerAgent:
+    def __init__(self, max_claims: int = None, max_workers: int = None, claim_timeout: float = None,
+                 mode: str = None, batch_size: int = None):
+        """
+        Args:
+            max_claims: Claims verified per report (FACT_CHECK_MAX_CLAIMS, default 5)
+            max_workers: Claims verified in parallel (FACT_CHECK_WORKERS, default 5)
+            claim_timeout: Seconds allowed per claim (FACT_CHECK_CLAIM_TIMEOUT, default 30)
+            mode: 'per_claim' or 'batched' (FACT_CHECK_MODE, default per_claim)
+            batch_size: Claims checked per LLM call in batched mode (FACT_CHECK_BATCH_SIZE, default 10)
+        """
+        self.llm = get_llm("gemini-2.0-flash", temperature=0.1)  # Very low for factual verification
+        # Explicit zeros are kept (e.g. max_claims=0 skips verification)
+        self.max_claims = max_claims if max_claims is not None else int(os.getenv("FACT_CHECK_MAX_CLAIMS", 5))
+        self.max_workers = max(1, max_workers if max_workers is not None else int(os.getenv("FACT_CHECK_WORKERS", 5)))
+        self.claim_timeout = (claim_timeout if claim_timeout is not None
+                              else float(os.getenv("FACT_CHECK_CLAIM_TIMEOUT", 30)))
+        self.mode = mode or os.getenv("FACT_CHECK_MODE", "per_claim")
+        self.batch_size = max(1, batch_size if batch_size is not None else int(os.getenv("FACT_CHECK_BATCH_SIZE", 10)))
+        self.compressor = compressor
+    
+    def verify_claims(self, research_text: str, sources: list = None, max_claims: int = None,
+                      mode: str = None) -> dict:
+        """
+        Verify claims in research text against sources
         
-        verified_claims = []
+        Args:
+            research_text: The research output to verify
+            sources: List of source texts/URLs used in research
+            max_claims: Override for the number of claims verified
+            mode: Override for the verification mode ('per_claim' or 'batched')
+        """
+        mode = self._resolve_mode(mode)
+        start_time = time.time()
+        metrics = LLMCallMetrics()
+        
+        # Step 1: Extract claims
+        chain = EXTRACT_PROMPT | self.llm.for_prompt("fact_checker", "extract_claims")
+        claims_result = chain.invoke({"research_text": self._document_context(research_text, metrics)})
+        metrics.record(claims_result)
+        claims = self._parse_claims(claims_result.content)
         
-        for claim in claims[:5]:  # Limit to 5 claims for speed
-            verify_chain = verify_prompt | self.llm
-            verification = verify_chain.invoke({
-                "claim": claim,
-                "research_text": research_text
-            })
-            
-            # Parse confidence score
-            confidence = self._extract_confidence(verification.content)
-            status = self._extract_status(verification.content)
-            
-            verified_claims.append({
-                "claim": claim,
-                "status": status,
-                "confidence": confidence,
-                "verification_details": verification.content
-            })
+        # Step 2: Verify claims (batched calls, or one call per claim on a bounded worker pool)
+        claims_to_check = claims[:self.max_claims if max_claims is None else max_claims]
+        if mode == "batched":
+            verified_claims = self._verify_batched(claims_to_check, research_text, metrics)
+        else:
+            verified_claims = self._verify_concurrently(claims_to_check, research_text, metrics)
         
         # Step 3: Generate summary report
-        total_claims = len(verified_claims)
-        supported = sum(1 for c in verified_claims if c['status'] == 'SUPPORTED')
-        avg_confidence = sum(c['confidence'] for c in verified_claims) / total_claims if total_claims > 0 else 0
+        return self._build_report(verified_claims, mode, metrics, start_time)
+    
+    async def averify_claims(self, research_text: str, sources: list = None, max_claims: int = None,
+                             mode: str = None, on_claim=None) -> dict:
+        """
+        Async variant of verify_claims
+        
+        Claims are verified concurrently on the event loop, bounded by
+        max_workers, with claim_timeout applied to each claim.
+        
+        Args:
+            on_claim: Optional callback called with each claim's result as soon
+                as it is verified (used to stream partial reports)
+        """
+        mode = self._resolve_mode(mode)
+        start_time = time.time()
+        metrics = LLMCallMetrics()
+        
+        chain = EXTRACT_PROMPT | self.llm.for_prompt("fact_checker", "extract_claims")
+        claims_result = await chain.ainvoke({"research_text": self._document_context(research_text, metrics)})
+        metrics.record(claims_result)
+        claims = self._parse_claims(claims_result.content)
+        
+        claims_to_check = claims[:self.max_claims if max_claims is None else max_claims]
+        semaphore = asyncio.Semaphore(self.max_workers)
+        if mode == "batched":
+            verified_claims = await self._averify_batched(claims_to_check, research_text, metrics, semaphore, on_claim)
+        else:
+            verified_claims = await self._averify_concurrently(claims_to_check, research_text, metrics, semaphore, on_claim)
+        
+        return self._build_report(verified_claims, mode, metrics, start_time)
+    
+    def expected_llm_calls(self, mode: str = None, max_claims: int = None) -> int:
+        """LLM calls one verification makes when nothing fails: claim extraction plus the checks"""
+        mode = self._resolve_mode(mode)
+        claims = self.max_claims if max_claims is None else max_claims
+        return 1 + (math.ceil(claims / self.batch_size) if mode == "batched" else claims)
+    
+    def _resolve_mode(self, mode: str) -> str:
+        """Validate the requested verification mode, defaulting to the agent's"""
+        mode = mode or self.mode
+        if mode not in VERIFICATION_MODES:
+            raise ValueError(f"Unknown verification mode '{mode}'. Use one of {VERIFICATION_MODES}")
+        return mode
+    
+    def _document_context(self, research_text: str, metrics: LLMCallMetrics) -> str:
+        """Deduplicated, bounded research text for the claim extraction prompt"""
+        context = self.compressor.document_context(research_text)
+        metrics.record_context(research_text, context)
+        return context
+    
+    def _claim_context(self, claims, research_text: str, metrics: LLMCallMetrics) -> str:
+        """Passages of the research text relevant to the claim(s) being verified"""
+        context = self.compressor.claim_context(research_text, claims)
+        metrics.record_context(research_text, context)
+        return context
+    
+    def _parse_claims(self, text: str) -> list:
+        """Parse numbered claims out of the extraction response"""
+        return [line.strip() for line in text.split('\n') 
+                if line.strip() and re.match(r'^\d+\.', line.strip())]
+    
+    def _build_report(self, verified_claims: list, mode: str, metrics: LLMCallMetrics, start_time: float) -> dict:
+        """Summarize verified claims (timed out / failed claims excluded from the stats)"""
+        checked_claims = [c for c in verified_claims if c['status'] not in ('TIMEOUT', 'ERROR')]
+        total_claims = len(checked_claims)
+        supported = sum(1 for c in checked_claims if c['status'] == 'SUPPORTED')
+        avg_confidence = sum(c['confidence'] for c in checked_claims) / total_claims if total_claims > 0 else 0
         
         return {
             "total_claims_checked": total_claims,
+            "failed_claims": len(verified_claims) - total_claims,
             "supported_claims": supported,
             "average_confidence": f"{avg_confidence:.1f}%",
             "overall_reliability": self._calculate_reliability(supported, total_claims, avg_confidence),
-            "claims": verified_claims
+            "claims": verified_claims,
+            "metrics": {
+                "mode": mode,
+                **metrics.as_dict(),
+                "latency": f"{time.time() - start_time:.2f}s"
+            }
+        }
+    
+    def _claim_result(self, claim: str, verification) -> dict:
+        """Package a single-claim verification response"""
+        return {
+            "claim": claim,
+            "status": self._extract_status(verification.content),
+            "confidence": self._extract_confidence(verification.content),
+            "verification_details": verification.content
+        }
+    
+    def _verify_claim(self, claim: str, research_text: str, metrics: LLMCallMetrics) -> dict:
+        """Verify a single claim with one LLM call"""
+        verify_chain = VERIFY_PROMPT | self.llm.for_prompt("fact_checker", "verify_claim")
+        verification = verify_chain.invoke({
+            "claim": claim,
+            "research_text": self._claim_context(claim, research_text, metrics)
+        })
+        metrics.record(verification)
+        return self._claim_result(claim, verification)
+    
+    async def _averify_claim(self, claim: str, research_text: str, metrics: LLMCallMetrics,
+                             semaphore: asyncio.Semaphore, on_claim=None) -> dict:
+        """Verify a single claim, reporting timeouts/errors instead of raising"""
+        async with semaphore:
+            try:
+                verify_chain = VERIFY_PROMPT | self.llm.for_prompt("fact_checker", "verify_claim")
+                context = self._claim_context(claim, research_text, metrics)
+                verification = await asyncio.wait_for(
+                    verify_chain.ainvoke({"claim": claim, "research_text": context}),
+                    timeout=self.claim_timeout
+                )
+                metrics.record(verification)
+                result = self._claim_result(claim, verification)
+            except asyncio.TimeoutError:
+                result = self._failed_claim(
+                    claim, "TIMEOUT", f"Verification timed out after {self.claim_timeout:.0f}s"
+                )
+            except Exception as e:
+                result = self._failed_claim(claim, "ERROR", str(e))
+        
+        if on_claim:
+            on_claim(result)
+        return result
+    
+    def _verify_concurrently(self, claims: list, research_text: str, metrics: LLMCallMetrics) -> list:
+        """
+        Verify claims in parallel, keeping input order
+        
+        All claims share one deadline: claim_timeout for each round of
+        max_workers claims. A claim still unfinished at the deadline, or
+        that raised, is reported with status TIMEOUT / ERROR instead of
+        failing the whole report.
+        """
+        if not claims:
+            return []
+        
+        timeout = self._pool_deadline(len(claims), self.claim_timeout)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = [executor.submit(self._verify_claim, claim, research_text, metrics) for claim in claims]
+        
+        verified_claims = []
+        try:
+            done, _ = wait(futures, timeout=timeout)
+            for claim, future in zip(claims, futures):
+                if future not in done:
+                    future.cancel()
+                    verified_claims.append(self._failed_claim(
+                        claim, "TIMEOUT", f"Verification timed out after {timeout:.0f}s"
+                    ))
+                elif future.exception() is not None:
+                    verified_claims.append(self._failed_claim(claim, "ERROR", str(future.exception())))
+                else:
+                    verified_claims.append(future.result())
+        finally:
+            # Don't block the report on stragglers that already timed out
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return verified_claims
+    
+    async def _averify_concurrently(self, claims: list, research_text: str, metrics: LLMCallMetrics,
+                                    semaphore: asyncio.Semaphore, on_claim=None) -> list:
+        """Async variant of _verify_concurrently"""
+        return list(await asyncio.gather(*[
+            self._averify_claim(claim, research_text, metrics, semaphore, on_claim) for claim in claims
+        ]))
+    
+    def _batch_inputs(self, claims: list, research_text: str, metrics: LLMCallMetrics) -> dict:
+        """Prompt inputs for a batched verification call"""
+        return {
+            "claims": "\n".join(f"{i}. {claim}" for i, claim in enumerate(claims, 1)),
+            "research_text": self._claim_context(claims, research_text, metrics)
+        }
+    
+    def _parse_batch(self, claims: list, response) -> list:
+        """
+        Match a batched verification response back to its claims
+        
+        Returns one result per claim, with None for claims the response
+        doesn't cover (missing, malformed, or the JSON can't be parsed).
+        """
+        try:
+            results = parse_json_response(response.content)
+        except ValueError:
+            return [None] * len(claims)
+        if not isinstance(results, list):
+            return [None] * len(claims)
+        
+        items = {}
+        for position, item in enumerate(results, 1):
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.get("id", position))
+            except (TypeError, ValueError):
+                continue
+            if 1 <= index <= len(claims):
+                items.setdefault(index, item)
+        
+        verified_claims = []
+        for index, claim in enumerate(claims, 1):
+            item = items.get(index)
+            try:
+                verified_claims.append(None if item is None else self._batch_claim_result(claim, item))
+            except (TypeError, ValueError):
+                verified_claims.append(None)
+        return verified_claims
+    
+    def _batch_claim_result(self, claim: str, item: dict) -> dict:
+        """Package one claim's entry from a batched verification response"""
+        details = (
+            f"Verification status: {item.get('status', 'UNKNOWN')}\n"
+            f"Confidence score: {item.get('confidence', 50)}%\n"
+            f"Evidence: {item.get('evidence', '')}\n"
+            f"Concerns: {item.get('concerns', '')}"
+        )
+        return {
+            "claim": claim,
+            "status": self._extract_status(str(item.get("status", ""))),
+            "confidence": float(item.get("confidence", 50.0)),
+            "verification_details": details
+        }
+    
+    def _request_batch(self, claims: list, research_text: str, metrics: LLMCallMetrics):
+        """
+        One structured-output LLM call verifying several claims
+        
+        The caller records the response in the metrics once it uses it, so
+        a call abandoned at the deadline isn't counted.
+        """
+        batch_chain = BATCH_VERIFY_PROMPT | self.llm.for_prompt("fact_checker", "verify_claim")
+        return batch_chain.invoke(self._batch_inputs(claims, research_text, metrics))
+    
+    def _verify_batched(self, claims: list, research_text: str, metrics: LLMCallMetrics) -> list:
+        """
+        Verify claims batch_size at a time against a single copy of the context
+        
+        Only claims missing from a completed batch response are re-checked
+        with per-claim calls. A batch still running at the deadline is
+        reported as TIMEOUT and not retried, since it may yet finish (and
+        be billed); a batch that raised is reported as ERROR.
+        """
+        batches = self._batches(claims)
+        if not batches:
+            return []
+        
+        timeout = self._pool_deadline(len(batches), self.claim_timeout * self.batch_size)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = [executor.submit(self._request_batch, batch, research_text, metrics) for batch in batches]
+        
+        verified_claims = []
+        try:
+            done, _ = wait(futures, timeout=timeout)
+            for batch, future in zip(batches, futures):
+                if future not in done:
+                    future.cancel()
+                    verified_claims.extend(self._failed_claim(
+                        claim, "TIMEOUT", f"Verification timed out after {timeout:.0f}s"
+                    ) for claim in batch)
+                elif future.exception() is not None:
+                    verified_claims.extend(
+                        self._failed_claim(claim, "ERROR", str(future.exception())) for claim in batch
+                    )
+                else:
+                    metrics.record(future.result())
+                    verified_claims.extend(self._parse_batch(batch, future.result()))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        missing = [claim for claim, result in zip(claims, verified_claims) if result is None]
+        if missing:
+            rechecked = iter(self._verify_concurrently(missing, research_text, metrics))
+            verified_claims = [result if result is not None else next(rechecked) for result in verified_claims]
+        return verified_claims
+    
+    async def _averify_batch(self, claims: list, research_text: str, metrics: LLMCallMetrics,
+                             semaphore: asyncio.Semaphore, on_claim=None) -> list:
+        """Async batched verification with the same per-claim fallback for missing claims"""
+        timeout = self.claim_timeout * len(claims)
+        try:
+            async with semaphore:
+                batch_chain = BATCH_VERIFY_PROMPT | self.llm.for_prompt("fact_checker", "verify_claim")
+                response = await asyncio.wait_for(
+                    batch_chain.ainvoke(self._batch_inputs(claims, research_text, metrics)),
+                    timeout=timeout
+                )
+            metrics.record(response)
+            verified_claims = self._parse_batch(claims, response)
+        except asyncio.TimeoutError:
+            verified_claims = [
+                self._failed_claim(claim, "TIMEOUT", f"Verification timed out after {timeout:.0f}s")
+                for claim in claims
+            ]
+        except Exception as e:
+            verified_claims = [self._failed_claim(claim, "ERROR", str(e)) for claim in claims]
+        
+        if on_claim:
+            for result in verified_claims:
+                if result is not None:
+                    on_claim(result)
+        
+        missing = [claim for claim, result in zip(claims, verified_claims) if result is None]
+        if missing:
+            rechecked = iter(await self._averify_concurrently(missing, research_text, metrics, semaphore, on_claim))
+            verified_claims = [result if result is not None else next(rechecked) for result in verified_claims]
+        return verified_claims
+    
+    async def _averify_batched(self, claims: list, research_text: str, metrics: LLMCallMetrics,
+                               semaphore: asyncio.Semaphore, on_claim=None) -> list:
+        """Async variant of _verify_batched"""
+        results = await asyncio.gather(*[
+            self._averify_batch(batch, research_text, metrics, semaphore, on_claim) for batch in self._batches(claims)
+        ])
+        return [claim for batch in results for claim in batch]
+    
+    def _pool_deadline(self, tasks: int, task_timeout: float) -> float:
+        """Seconds for `tasks` jobs of up to `task_timeout` each on the worker pool"""
+        return task_timeout * math.ceil(tasks / self.max_workers)
+    
+    def _batches(self, claims: list) -> list:
+        """Split claims into batch_size chunks"""
+        return [claims[i:i + self.batch_size] for i in range(0, len(claims), self.batch_size)]
+    
+    def _failed_claim(self, claim: str, status: str, details: str) -> dict:
+        """Placeholder entry for a claim that could not be verified"""
+        return {
+            "claim": claim,
+            "status": status,
+            "confidence": 0.0,
+            "verification_details": details
         }
     
     def _extract_confidence(self, text: str) -> float:
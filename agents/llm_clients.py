@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from langchain_core.runnables import Runnable
+
+from agents.llm_scheduler import scheduler
+from agents.llm_utils import token_usage
+from tools.metrics import ERRORS, LLM_SECONDS, LLM_TOKENS
+
+load_dotenv()
+
+
+class ClientRegistry:
+    """
+    One ChatGoogleGenerativeAI client per (model, temperature), created on
+    first use and shared by every agent and request in the process
+    
+    Each client owns its own connection to the API, so reusing them keeps
+    the connection count at one per distinct model configuration.
+    """
+    
+    def __init__(self):
+        self._clients = {}
+        self._handles = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"handles_requested": 0, "handle_reuses": 0}
+    
+    def get_llm(self, model: str, temperature: float):
+        """
+        Shared, scheduled chat model handle for (model, temperature)
+        
+        Cheap to call: no client is created until the handle's first call.
+        """
+        key = (model, temperature)
+        with self._lock:
+            self.stats["handles_requested"] += 1
+            if key in self._handles:
+                self.stats["handle_reuses"] += 1
+                return self._handles[key]
+            handle = scheduled(PooledLLM(self, model, temperature), model=model)
+            self._handles[key] = handle
+            return handle
+    
+    def client(self, model: str, temperature: float):
+        """The shared client for (model, temperature), created if needed"""
+        key = (model, temperature)
+        with self._lock:
+            self._calls[key] = self._calls.get(key, 0) + 1
+            return self._get_or_create(key)
+    
+    def warm_up(self):
+        """Create the clients behind every handle handed out so far"""
+        import langchain_google_genai  # noqa: F401 (slow; loaded before taking the lock)
+        with self._lock:
+            for key in self._handles:
+                self._get_or_create(key)
+    
+    def _get_or_create(self, key: tuple):
+        if key not in self._clients:
+            # Imported here so importing the agents doesn't load the Gemini SDK
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            model, temperature = key
+            self._clients[key] = ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=os.getenv("GOOGLE_API_KEY"),
+                temperature=temperature
+            )
+        return self._clients[key]
+    
+    def get_stats(self) -> dict:
+        """Client (connection) count and reuse metrics"""
+        with self._lock:
+            calls = sum(self._calls.values())
+            return {
+                "clients_created": len(self._clients),
+                "handles_requested": self.stats["handles_requested"],
+                "handle_reuses": self.stats["handle_reuses"],
+                "calls": calls,
+                "client_reuses": calls - len(self._clients),
+                "clients": {f"{model}@{temperature}": count for (model, temperature), count in self._calls.items()}
+            }
+
+
+class PooledLLM(Runnable):
+    """Forwards calls to the registry's shared client for one (model, temperature)"""
+    
+    def __init__(self, registry: ClientRegistry, model: str, temperature: float):
+        self.registry = registry
+        self.model = model
+        self.temperature = temperature
+    
+    def invoke(self, input, config=None, **kwargs):
+        return self._client().invoke(input, config, **kwargs)
+    
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await self._client().ainvoke(input, config, **kwargs)
+    
+    def stream(self, input, config=None, **kwargs):
+        yield from self._client().stream(input, config, **kwargs)
+    
+    async def astream(self, input, config=None, **kwargs):
+        async for chunk in self._client().astream(input, config, **kwargs):
+            yield chunk
+    
+    def _client(self):
+        return self.registry.client(self.model, self.temperature)
+
+
+class ScheduledLLM(Runnable):
+    """
+    Wraps a chat model so every call goes through the shared scheduler
+    
+    Drop-in for the model in `prompt | llm` chains. Streaming calls are
+    retried only if they fail before the first chunk arrives. Each call's
+    latency (including rate-limit waits and retries) and tokens are recorded
+    under the handle's agent and prompt labels; see for_prompt.
+    """
+    
+    def __init__(self, llm, model: str = None, agent: str = "unknown", prompt: str = "unknown"):
+        self.llm = llm
+        self.model = (model or getattr(llm, "model", None) or "unknown").replace("models/", "")
+        self.agent = agent
+        self.prompt = prompt
+    
+    def for_prompt(self, agent: str, prompt: str) -> "ScheduledLLM":
+        """The same model, with its calls labelled by agent and prompt type in /metrics"""
+        return ScheduledLLM(self.llm, self.model, agent, prompt)
+    
+    def invoke(self, input, config=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = scheduler.call(self.model, lambda: self.llm.invoke(input, config, **kwargs))
+        except Exception:
+            self._record(start, "error")
+            raise
+        self._record(start, "ok", *token_usage(result))
+        return result
+    
+    async def ainvoke(self, input, config=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await scheduler.acall(self.model, lambda: self.llm.ainvoke(input, config, **kwargs))
+        except Exception:
+            self._record(start, "error")
+            raise
+        self._record(start, "ok", *token_usage(result))
+        return result
+    
+    def stream(self, input, config=None, **kwargs):
+        chunks = None
+        
+        def start():
+            nonlocal chunks
+            chunks = iter(self.llm.stream(input, config, **kwargs))
+            return next(chunks, None)
+        
+        started = time.perf_counter()
+        status = "error"
+        tokens = [0, 0]
+        try:
+            first = scheduler.call(self.model, start)
+            if first is not None:
+                self._add_tokens(tokens, first)
+                yield first
+            for chunk in chunks:
+                self._add_tokens(tokens, chunk)
+                yield chunk
+            status = "ok"
+        finally:
+            self._record(started, status, *tokens)
+    
+    async def astream(self, input, config=None, **kwargs):
+        chunks = None
+        
+        async def start():
+            nonlocal chunks
+            chunks = self.llm.astream(input, config, **kwargs).__aiter__()
+            try:
+                return await chunks.__anext__()
+            except StopAsyncIteration:
+                return None
+        
+        started = time.perf_counter()
+        status = "error"
+        tokens = [0, 0]
+        try:
+            first = await scheduler.acall(self.model, start)
+            if first is not None:
+                self._add_tokens(tokens, first)
+                yield first
+            async for chunk in chunks:
+                self._add_tokens(tokens, chunk)
+                yield chunk
+            status = "ok"
+        finally:
+            self._record(started, status, *tokens)
+    
+    def _add_tokens(self, tokens: list, chunk):
+        input_tokens, output_tokens = token_usage(chunk)
+        tokens[0] += input_tokens
+        tokens[1] += output_tokens
+    
+    def _record(self, start: float, status: str, input_tokens: int = 0, output_tokens: int = 0):
+        """Latency and token metrics for one call"""
+        LLM_SECONDS.observe(time.perf_counter() - start, agent=self.agent, model=self.model,
+                            prompt=self.prompt, status=status)
+        if status == "error":
+            ERRORS.inc(component="llm")
+        if input_tokens:
+            LLM_TOKENS.inc(input_tokens, agent=self.agent, model=self.model, direction="input")
+        if output_tokens:
+            LLM_TOKENS.inc(output_tokens, agent=self.agent, model=self.model, direction="output")
+
+
+def scheduled(llm, model: str = None) -> ScheduledLLM:
+    """Route a chat model's calls through the shared scheduler"""
+    return ScheduledLLM(llm, model)
+
+
+# One registry per process
+registry = ClientRegistry()
+
+
+def get_llm(model: str, temperature: float):
+    """Shared chat model for (model, temperature); see ClientRegistry.get_llm"""
+    return registry.get_llm(model, temperature)
+
+
+def get_client_stats() -> dict:
+    return registry.get_stats()
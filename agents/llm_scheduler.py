@@ -0,0 +1,244 @@
+import asyncio
+import contextlib
+import contextvars
+import os
+import random
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from tools.metrics import LLM_QUEUE_SECONDS, LLM_RETRIES
+
+load_dotenv()
+
+# Priority lanes: while an interactive call is waiting for a model's rate
+# limit, batch calls for that model hold back and let it go first
+LANES = ("interactive", "batch")
+llm_lane_var = contextvars.ContextVar("llm_lane", default="interactive")
+
+
+@contextlib.contextmanager
+def llm_lane(lane: str):
+    """Run the LLM calls made inside this block (and tasks it starts) in a priority lane"""
+    if lane not in LANES:
+        raise ValueError(f"Unknown LLM lane '{lane}'. Use one of {LANES}")
+    token = llm_lane_var.set(lane)
+    try:
+        yield
+    finally:
+        llm_lane_var.reset(token)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for provider quota errors (HTTP 429 / ResourceExhausted)"""
+    if getattr(error, "code", None) == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "ResourceExhausted" in message
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Errors worth retrying: rate limits and temporary unavailability (HTTP 503)"""
+    if is_rate_limit_error(error):
+        return True
+    if getattr(error, "code", None) == 503 or type(error).__name__ == "ServiceUnavailable":
+        return True
+    message = str(error)
+    return "503" in message or "UNAVAILABLE" in message
+
+
+class ModelLimiter:
+    """
+    Adaptive token bucket for one model
+    
+    The refill rate starts at `rpm` requests per minute. Each rate-limit
+    error halves it (down to 10% of `rpm`) and empties the bucket, so every
+    caller backs off together; each success wins back 5% of `rpm`.
+    """
+    
+    def __init__(self, rpm: float, burst: int):
+        self.rpm = rpm
+        self.burst = burst
+        self.current_rpm = rpm
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.waiting = {lane: 0 for lane in LANES}
+        self.stats = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "rate_limited": 0,
+                      "delayed_calls": 0, "total_wait_time": 0.0,
+                      "by_lane": {lane: 0 for lane in LANES}}
+    
+    def try_acquire(self, lane: str) -> float:
+        """Take a token; returns 0 on success, else seconds to wait before retrying"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.current_rpm / 60)
+        self.updated_at = now
+        
+        refill_time = (1 - self.tokens) * 60 / self.current_rpm
+        if lane == "batch" and self.waiting["interactive"] > 0:
+            return max(refill_time, 0.05)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return refill_time
+    
+    def on_success(self):
+        self.stats["succeeded"] += 1
+        self.current_rpm = min(self.rpm, self.current_rpm + self.rpm * 0.05)
+    
+    def on_rate_limited(self):
+        self.stats["rate_limited"] += 1
+        self.current_rpm = max(self.rpm * 0.1, self.current_rpm / 2)
+        self.tokens = 0.0
+
+
+class LLMScheduler:
+    """
+    Shared gate for every LLM call: per-model rate limits, priority lanes
+    and retries with jittered exponential backoff
+    
+    Configuration (environment variables):
+        LLM_RPM             requests per minute per model (default 60)
+        LLM_RPM_<MODEL>     override for one model, e.g. LLM_RPM_GEMINI_2_5_FLASH=10
+        LLM_BURST           requests allowed back to back (default 5)
+        LLM_MAX_RETRIES     retries after a 429/503 (default 4)
+        LLM_BACKOFF_BASE    first backoff in seconds (default 1.0)
+        LLM_BACKOFF_MAX     longest backoff in seconds (default 30)
+    """
+    
+    def __init__(self):
+        self.default_rpm = float(os.getenv("LLM_RPM", 60))
+        self.burst = int(os.getenv("LLM_BURST", 5))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", 4))
+        self.backoff_base = float(os.getenv("LLM_BACKOFF_BASE", 1.0))
+        self.backoff_max = float(os.getenv("LLM_BACKOFF_MAX", 30))
+        self._limiters = {}
+        self._lock = threading.Lock()
+    
+    def limiter(self, model: str) -> ModelLimiter:
+        with self._lock:
+            if model not in self._limiters:
+                rpm = float(os.getenv("LLM_RPM_" + re.sub(r"\W", "_", model).upper(), self.default_rpm))
+                self._limiters[model] = ModelLimiter(rpm, self.burst)
+            return self._limiters[model]
+    
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for retry number `attempt` (0-based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    def acquire(self, model: str):
+        """Block until the current lane may call model"""
+        limiter, lane = self._begin(model)
+        start = time.monotonic()
+        try:
+            while True:
+                with self._lock:
+                    wait = limiter.try_acquire(lane)
+                if not wait:
+                    return
+                time.sleep(wait)
+        finally:
+            self._end(model, limiter, lane, time.monotonic() - start)
+    
+    async def aacquire(self, model: str):
+        """Async variant of acquire"""
+        limiter, lane = self._begin(model)
+        start = time.monotonic()
+        try:
+            while True:
+                with self._lock:
+                    wait = limiter.try_acquire(lane)
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            self._end(model, limiter, lane, time.monotonic() - start)
+    
+    def call(self, model: str, func):
+        """Run func() under the rate limit, retrying transient errors"""
+        self._count_call(model)
+        for attempt in range(self.max_retries + 1):
+            self.acquire(model)
+            try:
+                result = func()
+            except Exception as e:
+                if not self._should_retry(model, e, attempt):
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+            self._succeeded(model)
+            return result
+    
+    async def acall(self, model: str, func):
+        """Async variant of call; func() returns an awaitable"""
+        self._count_call(model)
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(model)
+            try:
+                result = await func()
+            except Exception as e:
+                if not self._should_retry(model, e, attempt):
+                    raise
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            self._succeeded(model)
+            return result
+    
+    def get_stats(self) -> dict:
+        """Per-model quota counters"""
+        with self._lock:
+            return {
+                model: {
+                    "rpm_limit": limiter.rpm,
+                    "current_rpm": round(limiter.current_rpm, 2),
+                    "tokens_available": round(limiter.tokens, 2),
+                    "waiting": dict(limiter.waiting),
+                    **{key: value for key, value in limiter.stats.items() if key != "total_wait_time"},
+                    "by_lane": dict(limiter.stats["by_lane"]),
+                    "total_wait_time": f"{limiter.stats['total_wait_time']:.2f}s"
+                }
+                for model, limiter in self._limiters.items()
+            }
+    
+    def _begin(self, model: str):
+        limiter = self.limiter(model)
+        lane = llm_lane_var.get()
+        with self._lock:
+            limiter.waiting[lane] += 1
+        return limiter, lane
+    
+    def _count_call(self, model: str):
+        limiter = self.limiter(model)
+        with self._lock:
+            limiter.stats["calls"] += 1
+            limiter.stats["by_lane"][llm_lane_var.get()] += 1
+    
+    def _end(self, model: str, limiter: ModelLimiter, lane: str, waited: float):
+        with self._lock:
+            limiter.waiting[lane] -= 1
+            if waited > 0.001:
+                limiter.stats["delayed_calls"] += 1
+                limiter.stats["total_wait_time"] += waited
+        LLM_QUEUE_SECONDS.observe(waited, model=model, lane=lane)
+    
+    def _should_retry(self, model: str, error: Exception, attempt: int) -> bool:
+        limiter = self.limiter(model)
+        with self._lock:
+            if is_rate_limit_error(error):
+                limiter.on_rate_limited()
+            if is_transient_error(error) and attempt < self.max_retries:
+                limiter.stats["retries"] += 1
+                LLM_RETRIES.inc(model=model, reason="rate_limit" if is_rate_limit_error(error) else "unavailable")
+                return True
+            limiter.stats["failed"] += 1
+            return False
+    
+    def _succeeded(self, model: str):
+        limiter = self.limiter(model)
+        with self._lock:
+            limiter.on_success()
+
+
+# One scheduler per process, shared by every agent
+scheduler = LLMScheduler()
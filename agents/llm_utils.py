@@ -0,0 +1,77 @@
+import json
+import re
+import threading
+
+# Rough chars-per-token for English text, for estimates where no usage metadata exists
+CHARS_PER_TOKEN = 4
+
+
+def parse_json_response(text: str):
+    """
+    Parse JSON out of an LLM response
+    
+    Tolerates markdown code fences and leading/trailing chatter around
+    the JSON payload. Raises ValueError when nothing parseable is found.
+    """
+    cleaned = re.sub(r"```(?:json)?", "", text).strip()
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        pass
+    
+    # Fall back to the outermost object/array in the text
+    for open_char, close_char in (("[", "]"), ("{", "}")):
+        start, end = cleaned.find(open_char), cleaned.rfind(close_char)
+        if start != -1 and end > start:
+            try:
+                return json.loads(cleaned[start:end + 1])
+            except json.JSONDecodeError:
+                continue
+    
+    raise ValueError("No valid JSON found in LLM response")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def token_usage(message) -> tuple:
+    """Return (input_tokens, output_tokens) reported for an LLM message"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+
+class LLMCallMetrics:
+    """Thread-safe counter of LLM calls and tokens for a single request"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.llm_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.context_tokens_original = 0
+        self.context_tokens_sent = 0
+    
+    def record(self, message):
+        """Count one LLM response"""
+        input_tokens, output_tokens = token_usage(message)
+        with self._lock:
+            self.llm_calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+    
+    def record_context(self, original: str, sent: str):
+        """Count the research context of one prompt before and after compression"""
+        with self._lock:
+            self.context_tokens_original += estimate_tokens(original)
+            self.context_tokens_sent += estimate_tokens(sent)
+    
+    def as_dict(self) -> dict:
+        return {
+            "llm_calls": self.llm_calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.input_tokens + self.output_tokens,
+            "context_tokens_sent": self.context_tokens_sent,
+            "context_tokens_saved": self.context_tokens_original - self.context_tokens_sent
+        }
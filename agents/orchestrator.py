@@ -1,141 +1,434 @@
+import asyncio
+import logging
 import os
 import sys
 from datetime import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import all agents
-from agents.researcher import research
+from agents.researcher import research, aresearch
 from agents.summarizer import SummarizerAgent
 from agents.fact_checker import FactCheckerAgent
+from agents.pipeline import PipelineGraph, Stage
+from tools.log_events import get_event_logger
+from tools.metrics import ERRORS, REPORT_SECONDS, STAGE_SECONDS
 
 load_dotenv()
 
+events = get_event_logger("agents.orchestrator")
+
+SUMMARY_TYPES = ["brief", "detailed", "key_points", "executive"]
+
+# Report stages and the agent that runs each
+STAGE_AGENTS = {
+    "research": "Researcher",
+    "summaries": "Summarizer",
+    "verification": "Fact-Checker"
+}
+
 
 class OrchestratorAgent:
     """
     Orchestrates multiple AI agents to produce comprehensive research reports
     """
     
-    def __init__(self):
+    def __init__(self, summary_concurrency: int = None, summary_mode: str = None):
+        """
+        Args:
+            summary_concurrency: Max summary formats generated at once
+                (defaults to SUMMARY_CONCURRENCY env var, else all 4; 1 = sequential)
+            summary_mode: 'parallel' (one LLM call per format) or 'single_pass'
+                (all formats in one call); defaults to SUMMARY_MODE env var, else parallel
+        """
         self.summarizer = SummarizerAgent()
         self.fact_checker = FactCheckerAgent()
+        self.summary_concurrency = max(1, summary_concurrency or int(
+            os.getenv("SUMMARY_CONCURRENCY", len(SUMMARY_TYPES))
+        ))
+        self.summary_mode = summary_mode or os.getenv("SUMMARY_MODE", "parallel")
     
-    def research_complete(self, query: str) -> dict:
+    def expected_llm_calls(self, research_cached: bool = False) -> int:
         """
-        Execute complete research workflow with all agents
+        LLM calls one report makes when nothing fails
+        
+        Research (unless cached), the summaries (one call in single_pass
+        mode, else one per format) and the fact-check.
+        """
+        summaries = 1 if self.summary_mode == "single_pass" else len(SUMMARY_TYPES)
+        return (0 if research_cached else 1) + summaries + self.fact_checker.expected_llm_calls()
+    
+    def _timed_summary(self, research_text: str, summary_type: str):
+        """Run one summary format and measure its own latency"""
+        start = time.time()
+        try:
+            result = self.summarizer.summarize(research_text, summary_type)
+        except Exception as e:
+            result = {"error": str(e)}
+        return result, time.time() - start
+    
+    async def _atimed_summary(self, research_text: str, summary_type: str, semaphore: asyncio.Semaphore,
+                              on_summary=None):
+        """Async variant of _timed_summary, bounded by the shared semaphore"""
+        async with semaphore:
+            start = time.time()
+            try:
+                result = await self.summarizer.asummarize(research_text, summary_type)
+            except Exception as e:
+                result = {"error": str(e)}
+            elapsed = time.time() - start
+        
+        if on_summary:
+            on_summary(summary_type, result, elapsed)
+        return result, elapsed
+    
+    def _run_summaries(self, research_text: str):
+        """
+        Generate all summary formats, either in one single-pass call or
+        concurrently on a bounded thread pool
         
-        Args:
-            query: The research question
-            
         Returns:
-            Complete research report with all agent outputs
+            (summaries, format_times) dicts keyed by summary type
         """
-        start_time = time.time()
+        if self.summary_mode == "single_pass":
+            start = time.time()
+            summaries = self.summarizer.summarize_all(research_text)
+            elapsed = time.time() - start
+            return summaries, {summary_type: elapsed for summary_type in SUMMARY_TYPES}
         
-        print(f"\n{'='*60}")
-        print(f"🎯 ORCHESTRATING RESEARCH FOR: {query}")
-        print(f"{'='*60}\n")
+        summaries = {}
+        format_times = {}
+        
+        with ThreadPoolExecutor(max_workers=self.summary_concurrency) as executor:
+            futures = {
+                summary_type: executor.submit(self._timed_summary, research_text, summary_type)
+                for summary_type in SUMMARY_TYPES
+            }
+            for summary_type, future in futures.items():
+                summaries[summary_type], format_times[summary_type] = future.result()
         
-        report = {
+        return summaries, format_times
+    
+    async def _arun_summaries(self, research_text: str, on_summary=None):
+        """
+        Async variant of _run_summaries
+        
+        on_summary(summary_type, result, elapsed) is called as each format finishes.
+        """
+        if self.summary_mode == "single_pass":
+            start = time.time()
+            summaries = await self.summarizer.asummarize_all(research_text)
+            elapsed = time.time() - start
+            if on_summary:
+                for summary_type in SUMMARY_TYPES:
+                    on_summary(summary_type, summaries[summary_type], elapsed)
+            return summaries, {summary_type: elapsed for summary_type in SUMMARY_TYPES}
+        
+        semaphore = asyncio.Semaphore(self.summary_concurrency)
+        results = await asyncio.gather(*[
+            self._atimed_summary(research_text, summary_type, semaphore, on_summary)
+            for summary_type in SUMMARY_TYPES
+        ])
+        summaries = {summary_type: result for summary_type, (result, _) in zip(SUMMARY_TYPES, results)}
+        format_times = {summary_type: elapsed for summary_type, (_, elapsed) in zip(SUMMARY_TYPES, results)}
+        return summaries, format_times
+    
+    def _new_report(self, query: str) -> dict:
+        """Empty report skeleton for a query"""
+        events.info("report_started", query=query)
+        return {
             "query": query,
             "timestamp": datetime.now().isoformat(),
             "status": "success",
             "agents_executed": []
         }
+    
+    def _research_section(self, research_result: str, research_time: float) -> dict:
+        """
+        Report section for the Researcher stage
         
-        try:
-            # STEP 1: Research Agent
-            print("📊 STEP 1/3: Running Researcher Agent...")
-            research_start = time.time()
-            
-            research_result = research(query)
-            research_time = time.time() - research_start
-            
-            report["research"] = {
-                "content": research_result,
-                "processing_time": f"{research_time:.2f}s",
-                "status": "success"
-            }
-            report["agents_executed"].append("Researcher")
-            print(f"✅ Research complete ({research_time:.2f}s)\n")
-            
-        except Exception as e:
-            report["research"] = {"status": "failed", "error": str(e)}
-            print(f"❌ Research failed: {e}\n")
+        The researcher returns failures as "Research error: ..." text; raising
+        here fails the stage, so the dependent stages are skipped and neither
+        the research nor the report is cached as a success.
+        """
+        if research_result.startswith("Research error:"):
+            raise RuntimeError(research_result)
+        events.info("stage_done", stage="research", seconds=round(research_time, 2))
+        return {
+            "content": research_result,
+            "processing_time": f"{research_time:.2f}s",
+            "status": "success"
+        }
+    
+    def _cached_research_section(self, research_text: str) -> dict:
+        """Report section for a Researcher stage reused from cache"""
+        events.info("stage_done", stage="research", cached=True)
+        return {
+            "content": research_text,
+            "processing_time": "0.00s",
+            "cached": True,
+            "status": "success"
+        }
+    
+    def _summary_event(self, summary_type: str, result: dict, elapsed: float) -> dict:
+        """Streamed payload for one finished summary format"""
+        event = {
+            "summary_type": summary_type,
+            "summary": result.get("summary"),
+            "compression_ratio": result.get("compression_ratio", "N/A"),
+            "processing_time": f"{elapsed:.2f}s"
+        }
+        if "error" in result:
+            event["error"] = result["error"]
+        return event
+    
+    def _summaries_section(self, summaries: dict, format_times: dict, summary_time: float) -> dict:
+        """
+        Report section for the Summarizer stage
         
-        try:
-            # STEP 2: Summarizer Agent (all 4 formats)
-            print("📝 STEP 2/3: Running Summarizer Agent...")
-            summary_start = time.time()
-            
-            summaries = {}
-            for summary_type in ["brief", "detailed", "key_points", "executive"]:
-                result = self.summarizer.summarize(
-                    report["research"]["content"], 
-                    summary_type
-                )
-                summaries[summary_type] = result 
-            
-            summary_time = time.time() - summary_start
-            
-            report["summaries"] = {
-    "brief": summaries["brief"].get("summary", str(summaries["brief"])),
-    "detailed": summaries["detailed"].get("summary", str(summaries["detailed"])),
-    "key_points": summaries["key_points"].get("summary", str(summaries["key_points"])),
-    "executive": summaries["executive"].get("summary", str(summaries["executive"])),
-    "compression_stats": {
-        "brief": summaries["brief"].get("compression_ratio", "N/A"),
-        "detailed": summaries["detailed"].get("compression_ratio", "N/A"),
-        "key_points": summaries["key_points"].get("compression_ratio", "N/A"),
-        "executive": summaries["executive"].get("compression_ratio", "N/A")
-    },
-    "processing_time": f"{summary_time:.2f}s",
-    "status": "success"
-}
-
-            report["agents_executed"].append("Summarizer")
-            print(f"✅ Summaries complete ({summary_time:.2f}s)\n")
-            
-        except Exception as e:
-            report["summaries"] = {"status": "failed", "error": str(e)}
-            print(f"❌ Summarization failed: {e}\n")
+        Raises RuntimeError only when every summary format failed.
+        """
+        errors = {
+            summary_type: result["error"]
+            for summary_type, result in summaries.items()
+            if "error" in result
+        }
+        if len(errors) == len(SUMMARY_TYPES):
+            raise RuntimeError(f"All summary formats failed: {errors}")
         
-        try:
-            # STEP 3: Fact-Checker Agent
-            print("🔍 STEP 3/3: Running Fact-Checker Agent...")
-            fact_check_start = time.time()
-            
-            verification = self.fact_checker.verify_claims(
-                report["research"]["content"]
+        section = {
+            summary_type: summaries[summary_type].get("summary", str(summaries[summary_type]))
+            for summary_type in SUMMARY_TYPES
+        }
+        section.update({
+            "compression_stats": {
+                summary_type: summaries[summary_type].get("compression_ratio", "N/A")
+                for summary_type in SUMMARY_TYPES
+            },
+            "format_times": {
+                summary_type: f"{format_times[summary_type]:.2f}s"
+                for summary_type in SUMMARY_TYPES
+            },
+            "errors": errors,
+            "processing_time": f"{summary_time:.2f}s",
+            "status": "success"
+        })
+        events.info("stage_done", stage="summaries", seconds=round(summary_time, 2))
+        return section
+    
+    def _verification_section(self, verification: dict, fact_check_time: float) -> dict:
+        """Report section for the Fact-Checker stage"""
+        events.info("stage_done", stage="verification", seconds=round(fact_check_time, 2))
+        return {
+            "total_claims": verification["total_claims_checked"],
+            "supported_claims": verification["supported_claims"],
+            "average_confidence": verification["average_confidence"],
+            "reliability": verification["overall_reliability"],
+            "detailed_claims": verification["claims"],
+            "metrics": verification["metrics"],
+            "processing_time": f"{fact_check_time:.2f}s",
+            "status": "success"
+        }
+    
+    def _research_stage(self, query: str, research_text: str = None) -> dict:
+        """STEP 1: Researcher Agent (skipped when research_text is already known)"""
+        events.debug("stage_started", stage="research")
+        if research_text is not None:
+            return self._cached_research_section(research_text)
+        
+        research_start = time.time()
+        research_result = research(query)
+        return self._research_section(research_result, time.time() - research_start)
+    
+    async def _aresearch_stage(self, query: str, research_text: str = None) -> dict:
+        """Async variant of _research_stage"""
+        events.debug("stage_started", stage="research")
+        if research_text is not None:
+            return self._cached_research_section(research_text)
+        
+        research_start = time.time()
+        research_result = await aresearch(query)
+        return self._research_section(research_result, time.time() - research_start)
+    
+    def _summaries_stage(self, research: dict) -> dict:
+        """STEP 2: Summarizer Agent (all 4 formats, run concurrently)"""
+        events.debug("stage_started", stage="summaries")
+        summary_start = time.time()
+        
+        summaries, format_times = self._run_summaries(research["content"])
+        return self._summaries_section(summaries, format_times, time.time() - summary_start)
+    
+    async def _asummaries_stage(self, research: dict, emit) -> dict:
+        """Async variant of _summaries_stage, emitting each format as it finishes"""
+        events.debug("stage_started", stage="summaries")
+        summary_start = time.time()
+        
+        summaries, format_times = await self._arun_summaries(
+            research["content"],
+            on_summary=lambda summary_type, result, elapsed: emit(
+                "summary", self._summary_event(summary_type, result, elapsed)
             )
-            fact_check_time = time.time() - fact_check_start
-            
-            report["verification"] = {
-                "total_claims": verification["total_claims_checked"],
-                "supported_claims": verification["supported_claims"],
-                "average_confidence": verification["average_confidence"],
-                "reliability": verification["overall_reliability"],
-                "detailed_claims": verification["claims"],
-                "processing_time": f"{fact_check_time:.2f}s",
-                "status": "success"
-            }
-            report["agents_executed"].append("Fact-Checker")
-            print(f"✅ Fact-checking complete ({fact_check_time:.2f}s)\n")
-            
-        except Exception as e:
-            report["verification"] = {"status": "failed", "error": str(e)}
-            print(f"❌ Fact-checking failed: {e}\n")
+        )
+        return self._summaries_section(summaries, format_times, time.time() - summary_start)
+    
+    def _verification_stage(self, research: dict) -> dict:
+        """STEP 3: Fact-Checker Agent"""
+        events.debug("stage_started", stage="verification")
+        fact_check_start = time.time()
+        
+        verification = self.fact_checker.verify_claims(research["content"])
+        return self._verification_section(verification, time.time() - fact_check_start)
+    
+    async def _averification_stage(self, research: dict, emit) -> dict:
+        """Async variant of _verification_stage, emitting each claim as it is verified"""
+        events.debug("stage_started", stage="verification")
+        fact_check_start = time.time()
+        
+        verification = await self.fact_checker.averify_claims(
+            research["content"],
+            on_claim=lambda claim: emit("claim", {"claim": claim})
+        )
+        return self._verification_section(verification, time.time() - fact_check_start)
+    
+    async def _run_graph(self, query: str, stages: list, emit, start_time: float) -> dict:
+        """
+        Run the stage graph and assemble the report
         
-        # Calculate total time
-        total_time = time.time() - start_time
-        report["total_processing_time"] = f"{total_time:.2f}s"
+        Summaries and verification both depend only on the research stage,
+        so they run concurrently once research is done.
+        """
+        report = self._new_report(query)
+        
+        def on_stage_done(name, section, error):
+            if error is not None:
+                section = {"status": "failed", "error": error}
+                events.error("stage_failed", stage=name, agent=STAGE_AGENTS[name], error=error)
+            emit(name, {name: section})
+        
+        run = await PipelineGraph(stages).run(on_stage_done=on_stage_done)
+        
+        for name, agent in STAGE_AGENTS.items():
+            if name in run["results"]:
+                report[name] = run["results"][name]
+                report["agents_executed"].append(agent)
+            else:
+                report[name] = {"status": "failed", "error": run["errors"][name]}
         
+        for name, elapsed in run["stage_times"].items():
+            error = run["errors"].get(name)
+            status = "ok" if error is None else "skipped" if error.startswith("Skipped:") else "failed"
+            STAGE_SECONDS.observe(elapsed, stage=name, status=status)
+            if status == "failed":
+                ERRORS.inc(component=f"{name}_stage")
+        REPORT_SECONDS.observe(time.time() - start_time, status="partial" if run["errors"] else "ok")
+        
+        report["pipeline"] = {
+            "stage_times": {name: f"{elapsed:.2f}s" for name, elapsed in run["stage_times"].items()},
+            "sum_of_stage_times": f"{run['sum_of_stage_times']:.2f}s",
+            "wall_clock_time": f"{run['wall_time']:.2f}s"
+        }
+        report["total_processing_time"] = f"{time.time() - start_time:.2f}s"
         return report
     
+    def research_complete(self, query: str, research_text: str = None) -> dict:
+        """
+        Execute complete research workflow with all agents
+        
+        Safe to call from synchronous code running inside an event loop: the
+        stages then run on a fresh loop in a worker thread, blocking the
+        caller like before (async callers should await aresearch_complete).
+        
+        Args:
+            query: The research question
+            research_text: Previously computed research for this query; when
+                given, the Researcher stage (search + LLM) is skipped
+        
+        Returns:
+            Complete research report with all agent outputs
+        """
+        start_time = time.time()
+        stages = [
+            Stage("research", lambda: self._research_stage(query, research_text)),
+            Stage("summaries", self._summaries_stage, inputs=("research",)),
+            Stage("verification", self._verification_stage, inputs=("research",))
+        ]
+        run = lambda: asyncio.run(self._run_graph(query, stages, lambda event, data: None, start_time))
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return run()
+        # asyncio.run can't nest in a running loop (e.g. a notebook or a sync
+        # callback on the server's loop), so give the graph its own thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(run).result()
+    
+    async def aresearch_complete(self, query: str, research_text: str = None, on_event=None) -> dict:
+        """
+        Async variant of research_complete
+        
+        Runs the same stages without blocking the event loop, so many
+        reports can be in flight on a single worker.
+        
+        Args:
+            on_event: Optional callback called as on_event(event, data) whenever
+                a stage, summary format or claim finishes (see astream_complete)
+        """
+        start_time = time.time()
+        emit = on_event or (lambda event, data: None)
+        
+        async def research_stage():
+            return await self._aresearch_stage(query, research_text)
+        
+        async def summaries_stage(research):
+            return await self._asummaries_stage(research, emit)
+        
+        async def verification_stage(research):
+            return await self._averification_stage(research, emit)
+        
+        stages = [
+            Stage("research", research_stage),
+            Stage("summaries", summaries_stage, inputs=("research",)),
+            Stage("verification", verification_stage, inputs=("research",))
+        ]
+        return await self._run_graph(query, stages, emit, start_time)
+    
+    async def astream_complete(self, query: str, research_text: str = None):
+        """
+        Stream the research workflow as each part finishes
+        
+        Yields event dicts in order of completion (summary and claim events
+        interleave, since the Summarizer and Fact-Checker run concurrently):
+            research      - the Researcher stage section
+            summary       - one per summary format
+            summaries     - the full Summarizer stage section
+            claim         - one per verified claim
+            verification  - the full Fact-Checker stage section
+            complete      - the final report (same shape as aresearch_complete)
+        """
+        queue = asyncio.Queue()
+        task = asyncio.ensure_future(self.aresearch_complete(
+            query,
+            research_text=research_text,
+            on_event=lambda event, data: queue.put_nowait({"event": event, **data})
+        ))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+            yield {"event": "complete", "report": task.result()}
+        finally:
+            # Client went away mid-stream: stop the remaining agents
+            if not task.done():
+                task.cancel()
+    
     def print_report(self, report: dict):
         """Pretty print the complete research report"""
         
@@ -146,6 +439,9 @@ class OrchestratorAgent:
         print(f"Query: {report['query']}")
         print(f"Timestamp: {report['timestamp']}")
         print(f"Total Processing Time: {report['total_processing_time']}")
+        if "pipeline" in report:
+            print(f"Stage Time (sum): {report['pipeline']['sum_of_stage_times']} "
+                  f"(wall clock {report['pipeline']['wall_clock_time']})")
         print(f"Agents Executed: {', '.join(report['agents_executed'])}\n")
         
         # Research Section
@@ -185,6 +481,7 @@ class OrchestratorAgent:
 
 # Test the orchestrator
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
     orchestrator = OrchestratorAgent()
     
     # Test queries
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+
+class Stage:
+    """
+    A named unit of work in a PipelineGraph
+    
+    Args:
+        name: Unique stage name; its result is passed to dependents under this name
+        func: Callable taking one keyword argument per input stage. Coroutine
+            functions are awaited; plain functions run in a worker thread.
+        inputs: Names of the stages whose results this stage consumes
+    """
+    
+    def __init__(self, name: str, func, inputs: tuple = ()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+
+
+class PipelineGraph:
+    """
+    Runs stages as soon as their inputs are ready, so independent stages
+    run concurrently instead of in declaration order
+    """
+    
+    def __init__(self, stages: list):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage '{stage.name}'")
+            self.stages[stage.name] = stage
+        
+        for stage in stages:
+            missing = [name for name in stage.inputs if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s) {missing}")
+        
+        self.order = self._topological_order()
+    
+    def _topological_order(self) -> list:
+        """Stage names with every stage after its inputs; raises on cycles"""
+        order = []
+        visiting = set()
+        
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle in pipeline at stage '{name}'")
+            visiting.add(name)
+            for dependency in self.stages[name].inputs:
+                visit(dependency)
+            visiting.discard(name)
+            order.append(name)
+        
+        for name in self.stages:
+            visit(name)
+        return order
+    
+    async def run(self, on_stage_done=None) -> dict:
+        """
+        Execute the graph
+        
+        A stage whose inputs failed is skipped and reported as failed too.
+        
+        Args:
+            on_stage_done: Optional callback on_stage_done(name, result, error)
+                called as each stage finishes (error is None on success)
+        
+        Returns:
+            Dict with per-stage "results", "errors" and "stage_times" (seconds),
+            plus "wall_time" for the whole graph and "sum_of_stage_times"
+        """
+        results = {}
+        errors = {}
+        stage_times = {}
+        tasks = {}
+        graph_start = time.time()
+        
+        async def run_stage(stage: Stage):
+            if stage.inputs:
+                await asyncio.gather(*[tasks[name] for name in stage.inputs])
+            
+            failed_inputs = [name for name in stage.inputs if name in errors]
+            start = time.time()
+            if failed_inputs:
+                errors[stage.name] = f"Skipped: depends on failed stage(s) {', '.join(failed_inputs)}"
+            else:
+                kwargs = {name: results[name] for name in stage.inputs}
+                try:
+                    if asyncio.iscoroutinefunction(stage.func):
+                        results[stage.name] = await stage.func(**kwargs)
+                    else:
+                        results[stage.name] = await asyncio.to_thread(stage.func, **kwargs)
+                except Exception as e:
+                    errors[stage.name] = str(e)
+            stage_times[stage.name] = time.time() - start
+            
+            if on_stage_done:
+                on_stage_done(stage.name, results.get(stage.name), errors.get(stage.name))
+        
+        # Inputs come first in topological order, so their tasks already exist
+        for name in self.order:
+            tasks[name] = asyncio.ensure_future(run_stage(self.stages[name]))
+        
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        
+        return {
+            "results": results,
+            "errors": errors,
+            "stage_times": stage_times,
+            "wall_time": time.time() - graph_start,
+            "sum_of_stage_times": sum(stage_times.values())
+        }
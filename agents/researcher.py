@@ -12,73 +12,177 @@ def research_with_summary(self, query: str, summary_type: str = "brief"):
         "full_research": research_result,
         "summary": summary
     }
- 
-from langchain_google_genai import ChatGoogleGenerativeAI
+
 from langchain_core.tools import Tool
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
+import asyncio
+import logging
 import os
 import sys
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from tools.web_search import search_web
+from tools.page_fetcher import fetch_pages, fetch_pages_sync
+from agents.llm_clients import get_llm
+from tools.log_events import get_event_logger
 
 # Load environment variables
 load_dotenv()
 
-# Initialize LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.3
-)
+# Deep research reads the full pages of the top results instead of the
+# ~200-character search snippets
+# DEEP_RESEARCH_PAGES = result pages fetched per question (default 3)
+DEEP_RESEARCH_PAGES = int(os.getenv("DEEP_RESEARCH_PAGES", 3))
+
+events = get_event_logger("agents.researcher")
+
+# Shared LLM client (created on first call; rate limited and retried by the shared scheduler)
+llm = get_llm("gemini-2.5-flash", temperature=0.3)
+
+
+
+RESEARCH_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are a research assistant. Analyze the web search results and provide a comprehensive answer to the user's question. Cite sources by number."),
+    ("user", "Question: {question}\n\nSearch Results:\n{formatted_results}\n\nProvide a detailed answer based on these sources.")
+])
 
 
+def _prompt_inputs(question: str, search_results: list) -> dict:
+    """Format search results into the research prompt's inputs"""
+    formatted_results = "\n\n".join([
+        f"Source {i+1}: {r['title']}\nURL: {r['url']}\nContent: {r.get('content') or r['snippet']}"
+        for i, r in enumerate(search_results)
+    ])
+    return {"question": question, "formatted_results": formatted_results}
 
-def research(question: str):
+
+def _attach_pages(search_results: list, pages: list) -> list:
+    """Add fetched page text to the top results (failed fetches keep their snippet)"""
+    events.info("pages_fetched", fetched=sum(1 for page in pages if page), requested=len(pages))
+    return [
+        {**r, "content": pages[i]} if i < len(pages) and pages[i] else r
+        for i, r in enumerate(search_results)
+    ]
+
+
+def research(question: str, deep: bool = False):
     """
     Research a question using web search and LLM
     
     Args:
         question: The question to research
-        
+        deep: Read the full pages of the top DEEP_RESEARCH_PAGES results
+    
     Returns:
         Research results as a string
     """
     try:
         # Step 1: Search the web
-        print(f"🔍 Searching web for: {question}")
+        events.debug("search_started", question=question)
         search_results = search_web(question, max_results=5)
         
         if not search_results:
             return "No search results found."
         
+        if deep:
+            urls = [r["url"] for r in search_results[:DEEP_RESEARCH_PAGES]]
+            search_results = _attach_pages(search_results, fetch_pages_sync(urls))
+        
         # Step 2: Format results
-        formatted_results = "\n\n".join([
-            f"Source {i+1}: {r['title']}\nURL: {r['url']}\nContent: {r['snippet']}"
-            for i, r in enumerate(search_results)
-        ])
+        inputs = _prompt_inputs(question, search_results)
         
-        print(f"\n✅ Found {len(search_results)} sources")
-        print(f"\n📝 Analyzing results with LLM...\n")
+        events.debug("analysis_started", question=question, sources=len(search_results))
         
         # Step 3: Use LLM to analyze
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a research assistant. Analyze the web search results and provide a comprehensive answer to the user's question. Cite sources by number."),
-            ("user", f"Question: {question}\n\nSearch Results:\n{formatted_results}\n\nProvide a detailed answer based on these sources.")
-        ])
-        
-        chain = prompt | llm
-        response = chain.invoke({})
+        chain = RESEARCH_PROMPT | llm.for_prompt("researcher", "research")
+        response = chain.invoke(inputs)
         
         return response.content
+    
+    except Exception as e:
+        return f"Research error: {str(e)}"
+
+
+async def aresearch(question: str, deep: bool = False):
+    """
+    Async variant of research
+    
+    The blocking web search runs in a worker thread and the LLM call (and
+    page fetches in deep mode) are awaited, so the event loop stays free
+    while the request is in flight.
+    """
+    try:
+        events.debug("search_started", question=question)
+        search_results = await asyncio.to_thread(search_web, question, max_results=5)
         
+        if not search_results:
+            return "No search results found."
+        
+        if deep:
+            urls = [r["url"] for r in search_results[:DEEP_RESEARCH_PAGES]]
+            search_results = _attach_pages(search_results, await fetch_pages(urls))
+        
+        inputs = _prompt_inputs(question, search_results)
+        
+        events.debug("analysis_started", question=question, sources=len(search_results))
+        
+        chain = RESEARCH_PROMPT | llm.for_prompt("researcher", "research")
+        response = await chain.ainvoke(inputs)
+        
+        return response.content
+    
     except Exception as e:
         return f"Research error: {str(e)}"
 
+def stream_research(question: str):
+    """
+    Research a question, yielding the LLM's answer token by token
+    
+    Unlike research(), failures are raised instead of returned as text,
+    so callers can tell a finished answer from a broken stream.
+    
+    Args:
+        question: The question to research
+    
+    Yields:
+        Text chunks of the answer as the model produces them
+    """
+    events.debug("search_started", question=question)
+    search_results = search_web(question, max_results=5)
+    
+    if not search_results:
+        yield "No search results found."
+        return
+    
+    events.debug("analysis_started", question=question, sources=len(search_results), streaming=True)
+    
+    chain = RESEARCH_PROMPT | llm.for_prompt("researcher", "research")
+    for chunk in chain.stream(_prompt_inputs(question, search_results)):
+        if chunk.content:
+            yield chunk.content
+
+
+async def astream_research(question: str):
+    """Async variant of stream_research"""
+    events.debug("search_started", question=question)
+    search_results = await asyncio.to_thread(search_web, question, max_results=5)
+    
+    if not search_results:
+        yield "No search results found."
+        return
+    
+    events.debug("analysis_started", question=question, sources=len(search_results), streaming=True)
+    
+    chain = RESEARCH_PROMPT | llm.for_prompt("researcher", "research")
+    async for chunk in chain.astream(_prompt_inputs(question, search_results)):
+        if chunk.content:
+            yield chunk.content
+
 # Test it
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     question = "Who is Batman?"
     print(f"\n{'='*60}")
     print(f"RESEARCHING: {question}")
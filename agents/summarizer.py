@@ -1,75 +1,187 @@
+import asyncio
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import sys
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.context_compression import compressor
+from agents.llm_clients import get_llm
+from agents.llm_utils import estimate_tokens, parse_json_response
+
 load_dotenv(override=True)
 
-class SummarizerAgent:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.3  # Lower temp for factual summaries
-        )
-    
-    def summarize(self, research_text: str, summary_type: str = "brief") -> dict:
-        """
-        Generate different types of summaries
-        
-        Args:
-            research_text: The research output to summarize
-            summary_type: 'brief', 'detailed', 'key_points', or 'executive'
-        """
-        
-        prompts = {
-            "brief": """Summarize this research in 2-3 sentences. Focus on the most important findings only.
+# Prompt template per summary format
+SUMMARY_PROMPTS = {
+    "brief": """Summarize this research in 2-3 sentences. Focus on the most important findings only.
 
 Research:
 {research_text}
 
 Brief Summary:""",
-            
-            "detailed": """Provide a comprehensive paragraph summarizing this research. Include main findings, key statistics, and important context.
+    
+    "detailed": """Provide a comprehensive paragraph summarizing this research. Include main findings, key statistics, and important context.
 
 Research:
 {research_text}
 
 Detailed Summary:""",
-            
-            "key_points": """Extract 5-7 key points from this research as a bullet list. Each point should be one clear sentence.
+    
+    "key_points": """Extract 5-7 key points from this research as a bullet list. Each point should be one clear sentence.
 
 Research:
 {research_text}
 
 Key Points:""",
-            
-            "executive": """Create an executive summary suitable for business stakeholders. Focus on: What it means, Why it matters, What actions to consider.
+    
+    "executive": """Create an executive summary suitable for business stakeholders. Focus on: What it means, Why it matters, What actions to consider.
 
 Research:
 {research_text}
 
 Executive Summary:"""
-        }
+}
+
+SUMMARIZE_ALL_PROMPT = """Summarize this research in four formats at once:
+- "brief": 2-3 sentences covering the most important findings only
+- "detailed": a comprehensive paragraph with main findings, key statistics, and important context
+- "key_points": 5-7 key points as a bullet list, one clear sentence each
+- "executive": an executive summary for business stakeholders covering what it means, why it matters, and what actions to consider
+
+Respond with ONLY a JSON object with exactly the keys "brief", "detailed", "key_points" and "executive".
+
+Research:
+{research_text}
+
+JSON:"""
+
+
+class SummarizerAgent:
+    def __init__(self):
+        self.llm = get_llm("gemini-2.0-flash", temperature=0.3)  # Lower temp for factual summaries
+        self.compressor = compressor
+    
+    def summarize(self, research_text: str, summary_type: str = "brief") -> dict:
+        """
+        Generate different types of summaries
         
-        prompt_template = PromptTemplate(
-            input_variables=["research_text"],
-            template=prompts.get(summary_type, prompts["brief"])
-        )
+        Args:
+            research_text: The research output to summarize
+            summary_type: 'brief', 'detailed', 'key_points', or 'executive'
+        """
+        chain = self._summary_chain(summary_type)
+        
+        try:
+            result = chain.invoke({"research_text": self.compressor.document_context(research_text)})
+            return self._build_result(summary_type, result.content, research_text)
+        except Exception as e:
+            return {"error": str(e)}
+    
+    async def asummarize(self, research_text: str, summary_type: str = "brief") -> dict:
+        """Async variant of summarize"""
+        chain = self._summary_chain(summary_type)
+        
+        try:
+            result = await chain.ainvoke({"research_text": self.compressor.document_context(research_text)})
+            return self._build_result(summary_type, result.content, research_text)
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def summarize_all(self, research_text: str) -> dict:
+        """
+        Generate all four summary formats in a single structured LLM call
+        
+        The research text is sent (and billed) once instead of once per format.
+        Falls back to one summarize() call per format only if the response
+        can't be parsed; if the call itself fails (rate limit, outage, timeout)
+        every format reports the error, as summarize() does, rather than
+        sending four more calls to the same failing model.
+        
+        Args:
+            research_text: The research output to summarize
+            
+        Returns:
+            Dict keyed by summary type, each value shaped like summarize()'s result
+        """
+        chain = self._summary_chain("all")
+        context = self.compressor.document_context(research_text)
         
-        chain = prompt_template | self.llm
+        try:
+            result = chain.invoke({"research_text": context})
+        except Exception as e:
+            return {summary_type: {"error": str(e)} for summary_type in SUMMARY_PROMPTS}
         
         try:
-            result = chain.invoke({"research_text": research_text})
+            return self._parse_all(result.content, research_text, context)
+        except (ValueError, KeyError, TypeError):
             return {
-                "summary_type": summary_type,
-                "summary": result.content,
-                "original_length": len(research_text),
-                "summary_length": len(result.content),
-                "compression_ratio": f"{(1 - len(result.content)/len(research_text))*100:.1f}%"
+                summary_type: self.summarize(research_text, summary_type)
+                for summary_type in SUMMARY_PROMPTS
             }
+    
+    async def asummarize_all(self, research_text: str) -> dict:
+        """Async variant of summarize_all (fallback formats run concurrently)"""
+        chain = self._summary_chain("all")
+        context = self.compressor.document_context(research_text)
+        
+        try:
+            result = await chain.ainvoke({"research_text": context})
         except Exception as e:
-            return {"error": str(e)}
+            return {summary_type: {"error": str(e)} for summary_type in SUMMARY_PROMPTS}
+        
+        try:
+            return self._parse_all(result.content, research_text, context)
+        except (ValueError, KeyError, TypeError):
+            results = await asyncio.gather(*[
+                self.asummarize(research_text, summary_type) for summary_type in SUMMARY_PROMPTS
+            ])
+            return dict(zip(SUMMARY_PROMPTS, results))
+    
+    def _summary_chain(self, summary_type: str):
+        """Prompt | LLM chain for one summary format, or 'all' for the single-pass prompt"""
+        if summary_type == "all":
+            template = SUMMARIZE_ALL_PROMPT
+        else:
+            summary_type = summary_type if summary_type in SUMMARY_PROMPTS else "brief"
+            template = SUMMARY_PROMPTS[summary_type]
+        
+        prompt_template = PromptTemplate(
+            input_variables=["research_text"],
+            template=template
+        )
+        return prompt_template | self.llm.for_prompt("summarizer", summary_type)
+    
+    def _parse_all(self, content: str, research_text: str, context: str) -> dict:
+        """
+        Split a single-pass JSON response into per-format results
+        
+        Raises ValueError, KeyError or TypeError if the response isn't a JSON
+        object with every format.
+        """
+        summaries = parse_json_response(content)
+        return {
+            summary_type: self._build_result(summary_type, self._as_text(summaries[summary_type]), research_text, context)
+            for summary_type in SUMMARY_PROMPTS
+        }
+    
+    def _as_text(self, summary) -> str:
+        """Normalize a structured summary value (e.g. a list of key points) to text"""
+        if isinstance(summary, list):
+            return "\n".join(f"- {point}" for point in summary)
+        return str(summary)
+    
+    def _build_result(self, summary_type: str, summary: str, research_text: str, context: str = None) -> dict:
+        """Package a summary with its compression stats (context: the text sent to the LLM, if known)"""
+        if context is None:
+            context = self.compressor.document_context(research_text)
+        return {
+            "summary_type": summary_type,
+            "summary": summary,
+            "original_length": len(research_text),
+            "summary_length": len(summary),
+            "compression_ratio": f"{(1 - len(summary)/len(research_text))*100:.1f}%",
+            "context_tokens_saved": estimate_tokens(research_text) - estimate_tokens(context)
+        }
 
 # Test the agent
 if __name__ == "__main__":
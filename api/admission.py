@@ -0,0 +1,241 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+import asyncio
+import math
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_SHED, ADMISSION_WAIT_SECONDS
+
+# Admission control settings
+# Each expensive request costs the LLM calls it is expected to make and is
+# only started while the total cost in flight fits the budget. Requests over
+# budget wait in FIFO order until their deadline, or are shed right away
+# with 503 + Retry-After when the queue is already full.
+#
+# The budget is enforced in each worker process, not shared between them:
+# ADMISSION_BUDGET is the total for the server and every worker gets an
+# equal share of it, so set WEB_CONCURRENCY to the number of uvicorn
+# workers (uvicorn reads it too). Uneven load across workers can leave one
+# shedding while another has room.
+# ADMISSION_BUDGET = expected LLM calls in flight at once, all workers together (default 30)
+# WEB_CONCURRENCY = worker processes sharing that budget (default 1)
+# ADMISSION_QUEUE_TIMEOUT = seconds a request may wait for admission (default 10)
+# ADMISSION_MAX_QUEUE = expected LLM calls allowed to wait per worker (default 2x the worker's budget)
+# ADMISSION_COST_<NAME> = overrides the cost of an endpoint, e.g. ADMISSION_COST_COMPLETE=15
+ADMISSION_BUDGET = int(os.getenv("ADMISSION_BUDGET", 30))
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+WORKER_BUDGET = max(1, ADMISSION_BUDGET // WEB_CONCURRENCY)
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 2 * WORKER_BUDGET))
+
+# Expected LLM calls per request (cache hits are never charged). /verify and
+# /complete pass the agents' own count (FactCheckerAgent/OrchestratorAgent
+# .expected_llm_calls), so their entries are only the defaults at the
+# default settings, before the agents are loaded.
+ENDPOINT_COSTS = {
+    "research": 1,
+    "deep_research": 2,        # one call, but several full pages of context
+    "summarize": 1,
+    "verify_per_claim": 6,     # claim extraction + 5 claim checks
+    "verify_batched": 2,       # claim extraction + 1 batch
+    "complete": 11,            # research, 4 summaries, claim extraction + 5 claim checks
+    "research_batch": int(os.getenv("BATCH_CONCURRENCY", 4))
+}
+
+
+def endpoint_cost(name: str, default: int = None) -> int:
+    """The ADMISSION_COST_<NAME> override if set, else `default`, else ENDPOINT_COSTS[name]"""
+    override = os.getenv("ADMISSION_COST_" + re.sub(r"\W", "_", name).upper())
+    if override:
+        return int(override)
+    return default if default is not None else ENDPOINT_COSTS[name]
+
+
+class AdmissionRejected(HTTPException):
+    """503 for a request shed by admission control, with a Retry-After estimate"""
+    
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Server busy ({reason}). Try again in {retry_after} seconds.",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """An admitted request's share of the budget; release it exactly once"""
+    
+    __slots__ = ("endpoint", "cost", "queued_at", "granted_at", "released")
+    
+    def __init__(self, endpoint: str, cost: int):
+        self.endpoint = endpoint
+        self.cost = cost
+        self.queued_at = time.monotonic()
+        self.granted_at = None
+        self.released = False
+
+
+class AdmissionController:
+    """
+    In-flight budget for expensive requests, counted in expected LLM calls
+    
+    One controller per worker process, holding that worker's share of the
+    budget (see WORKER_BUDGET). Runs on the worker's event loop: admission
+    decisions are made between awaits, so no lock is needed. Waiters are
+    admitted strictly in arrival order, so a costly request is not starved
+    by a stream of cheap ones.
+    
+    Usage:
+        async with admission.admit("complete"):
+            report = await run_complete()
+    """
+    
+    def __init__(self, budget: int = WORKER_BUDGET, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+                 max_queue: int = ADMISSION_MAX_QUEUE):
+        self.budget = max(1, budget)
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self._waiters = deque()  # (ticket, future)
+        # Moving average of how long an admitted request holds its cost,
+        # used to estimate Retry-After
+        self._avg_hold = 5.0
+        self.stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_timeout": 0}
+    
+    def _fits(self, cost: int) -> bool:
+        return self.in_flight + cost <= self.budget
+    
+    def _grant(self, ticket: Ticket):
+        ticket.granted_at = time.monotonic()
+        self.in_flight += ticket.cost
+        self.stats["admitted"] += 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+    
+    def _retry_after(self, cost: int) -> int:
+        """Seconds until the work ahead of a request of `cost` should have drained"""
+        backlog = self.in_flight + self.queued + cost - self.budget
+        return max(1, math.ceil(self._avg_hold * max(backlog, 0) / self.budget + self._avg_hold))
+    
+    def _shed(self, ticket: Ticket, reason: str):
+        self.stats[f"shed_{reason}"] += 1
+        ADMISSION_SHED.inc(endpoint=ticket.endpoint, reason=reason)
+        raise AdmissionRejected(reason.replace("_", " "), self._retry_after(ticket.cost))
+    
+    async def acquire(self, endpoint: str, cost: int = None) -> Ticket:
+        """
+        Wait for budget for one request
+        
+        Args:
+            endpoint: Name used in metrics (and for the cost, if not given)
+            cost: Expected LLM calls; defaults to ENDPOINT_COSTS[endpoint].
+                  An ADMISSION_COST_<ENDPOINT> override wins over both.
+                  Capped at the budget so any request can run on an idle server.
+        
+        Raises:
+            AdmissionRejected: The queue is full, or the deadline passed first
+        """
+        cost = min(endpoint_cost(endpoint, cost), self.budget)
+        ticket = Ticket(endpoint, cost)
+        
+        if not self._waiters and self._fits(cost):
+            self._grant(ticket)
+            ADMISSION_WAIT_SECONDS.observe(0, endpoint=endpoint, result="admitted")
+            return ticket
+        
+        # Shed early rather than queue work that can't start before its deadline
+        if self.queued + cost > self.max_queue:
+            self._shed(ticket, "queue_full")
+        
+        future = asyncio.get_running_loop().create_future()
+        waiter = (ticket, future)
+        self._waiters.append(waiter)
+        self.queued += cost
+        self.stats["queued"] += 1
+        ADMISSION_QUEUED.set(self.queued)
+        
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # The grant can land just as the deadline passes (wait_for may
+            # still raise); give its budget back before shedding
+            if future.done() and not future.cancelled():
+                self.release(ticket)
+            else:
+                self._dequeue(waiter)
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - ticket.queued_at, endpoint=endpoint, result="shed")
+            self._shed(ticket, "timeout")
+        except asyncio.CancelledError:
+            # Client went away while waiting (or right after being admitted)
+            if future.done() and not future.cancelled():
+                self.release(ticket)
+            else:
+                self._dequeue(waiter)
+            raise
+        
+        ADMISSION_WAIT_SECONDS.observe(ticket.granted_at - ticket.queued_at, endpoint=endpoint, result="admitted")
+        return ticket
+    
+    def _dequeue(self, waiter: tuple):
+        """Remove a waiter that gave up, letting the ones behind it move up"""
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            return
+        self.queued -= waiter[0].cost
+        ADMISSION_QUEUED.set(self.queued)
+        self._wake()
+    
+    def _wake(self):
+        """Admit waiters from the front of the queue while they fit"""
+        while self._waiters and self._fits(self._waiters[0][0].cost):
+            ticket, future = self._waiters.popleft()
+            self.queued -= ticket.cost
+            if not future.done():
+                self._grant(ticket)
+                future.set_result(None)
+        ADMISSION_QUEUED.set(self.queued)
+    
+    def release(self, ticket: Ticket):
+        """Return a ticket's cost to the budget (repeat calls are ignored)"""
+        if ticket.released:
+            return
+        ticket.released = True
+        self.in_flight -= ticket.cost
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        self._avg_hold = 0.9 * self._avg_hold + 0.1 * (time.monotonic() - ticket.granted_at)
+        self._wake()
+    
+    @asynccontextmanager
+    async def admit(self, endpoint: str, cost: int = None):
+        """acquire() for the duration of a block"""
+        ticket = await self.acquire(endpoint, cost)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+    
+    def get_stats(self) -> dict:
+        return {
+            "budget": self.budget,
+            "total_budget": ADMISSION_BUDGET,
+            "workers": WEB_CONCURRENCY,
+            "in_flight_cost": self.in_flight,
+            "queued_cost": self.queued,
+            "queued_requests": len(self._waiters),
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "avg_hold_seconds": round(self._avg_hold, 2),
+            **self.stats
+        }
+
+
+# One controller per worker process, with its share of ADMISSION_BUDGET
+admission = AdmissionController()
@@ -1,8 +1,9 @@
 from fastapi import Security, HTTPException, status
 from fastapi.security import APIKeyHeader
-from datetime import datetime
 import os
 
+from counter_store import get_counter_store
+
 # API Key configuration
 API_KEY_NAME = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
@@ -13,11 +14,18 @@ VALID_API_KEYS = {
     os.getenv("API_KEY_2", "demo_key_456"): {"name": "Demo", "usage_limit": 50}
 }
 
-# Usage tracking (in-memory for demo, use Redis/DB in production)
-usage_tracker = {}
+# Usage is counted per key over a sliding window in the shared counter store
+# (see counter_store.create_counter_store), so every worker enforces one quota
+# USAGE_WINDOW_SECONDS = window usage_limit applies to (default 1 day)
+USAGE_WINDOW_SECONDS = int(os.getenv("USAGE_WINDOW_SECONDS", 86400))
 
-async def verify_api_key(api_key: str = Security(api_key_header)):
-    """Verify API key and track usage"""
+def verify_api_key(api_key: str = Security(api_key_header)):
+    """
+    Verify API key and track usage
+    
+    A plain function, so FastAPI runs it in the threadpool: with a shared
+    counter store the usage hit is a SQLite transaction or a Redis round trip.
+    """
     
     # Check if API key provided
     if api_key is None:
@@ -33,17 +41,11 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
             detail="Invalid API Key"
         )
     
-    # Track usage
-    if api_key not in usage_tracker:
-        usage_tracker[api_key] = {"count": 0, "first_used": datetime.now()}
-    
-    usage_tracker[api_key]["count"] += 1
-    
-    # Check usage limit
+    # Track usage and check the limit in one atomic step
     limit = VALID_API_KEYS[api_key]["usage_limit"]
-    current_usage = usage_tracker[api_key]["count"]
+    allowed, current_usage = get_counter_store().hit(f"usage/{api_key}", limit, USAGE_WINDOW_SECONDS)
     
-    if current_usage > limit:
+    if not allowed:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail=f"Usage limit exceeded. Limit: {limit} requests."
@@ -52,6 +54,30 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
     return {
         "api_key": api_key,
         "name": VALID_API_KEYS[api_key]["name"],
-        "usage": current_usage,
+        "usage": round(current_usage),
         "limit": limit
     }
+
+def charge_usage(api_key_info: dict, cost: int) -> dict:
+    """
+    Charge `cost` more requests to a verified key's quota, all or nothing
+    
+    For requests that do the work of many, e.g. the research runs of a batch.
+    
+    Returns:
+        api_key_info with the updated usage
+    """
+    if cost <= 0:
+        return api_key_info
+    
+    limit = api_key_info["limit"]
+    allowed, current_usage = get_counter_store().hit(
+        f"usage/{api_key_info['api_key']}", limit, USAGE_WINDOW_SECONDS, cost=cost
+    )
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Usage limit exceeded: this request needs {cost} more requests than the "
+                   f"remaining quota allows. Limit: {limit} requests."
+        )
+    return {**api_key_info, "usage": round(current_usage)}
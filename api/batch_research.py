@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.llm_scheduler import llm_lane
+from cache_manager import asave_to_cache, get_cache_key, get_from_cache, single_flight
+
+# Research runs (search + LLM) in flight at once for a batch
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+
+# Largest batch /research/batch accepts in one request
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 500))
+
+
+async def research_query(query: str, deep: bool = False, gate=None) -> dict:
+    """
+    Research one query, shared with any identical run already in flight
+    
+    Successful answers are cached; "Research error: ..." answers are
+    returned but not cached, so the next request retries. Deep research
+    (full pages of the top results) is cached separately from snippet research.
+    
+    Args:
+        gate: Optional factory for an async context manager entered around
+              the research run only, not by callers that join it (e.g.
+              admission control)
+    """
+    namespace = "deep_research" if deep else "research"
+    # Imported on first use so the API can start serving before langchain loads
+    from agents.researcher import aresearch
+    
+    async def run_research():
+        async with (gate or contextlib.nullcontext)():
+            result = await aresearch(query, deep=deep)
+        response = {
+            "status": "success",
+            "query": query,
+            "research": result
+        }
+        if result.startswith("Research error:"):
+            response["status"] = "error"
+            return response
+        return await asave_to_cache(query, response, namespace=namespace)
+    
+    return await single_flight(query, run_research, namespace=namespace)
+
+
+def plan_batch(queries: list) -> tuple:
+    """
+    Deduplicate a batch and look its queries up in the cache
+    
+    Blocks on the cache backend; async code should use aplan_batch.
+    
+    Returns:
+        (cached, misses): result dicts for cached queries, and the
+        {index, query, duplicates} entries that still need research
+    """
+    unique = {}
+    for index, query in enumerate(queries):
+        key = get_cache_key(query)
+        if key in unique:
+            unique[key]["duplicates"].append(index)
+        else:
+            unique[key] = {"index": index, "query": query, "duplicates": []}
+    
+    cached_results, misses = [], []
+    for entry in unique.values():
+        cached = get_from_cache(entry["query"])
+        if cached:
+            cached_results.append({**cached, "index": entry["index"], "duplicates": entry["duplicates"],
+                                   "cached": True, "processing_time": "0.00s"})
+        else:
+            misses.append(entry)
+    return cached_results, misses
+
+
+async def aplan_batch(queries: list) -> tuple:
+    """plan_batch on a worker thread, one hop for the whole batch"""
+    return await asyncio.to_thread(plan_batch, queries)
+
+
+async def run_batch(queries: list, concurrency: int = None, plan: tuple = None):
+    """
+    Research many queries, yielding each result as soon as it is ready
+    
+    Duplicate queries (after normalization) are researched once. Cached
+    queries are yielded first, then misses run at most `concurrency` at a time.
+    
+    Args:
+        queries: The research questions
+        concurrency: Max misses researched at once (default BATCH_CONCURRENCY)
+        plan: plan_batch(queries), if the caller already made it
+    
+    Yields:
+        Result dicts with "index" (position of the first occurrence in
+        queries), "duplicates" (positions of later repeats), "cached" and
+        "processing_time"
+    """
+    semaphore = asyncio.Semaphore(concurrency or BATCH_CONCURRENCY)
+    cached_results, misses = plan or await aplan_batch(queries)
+    for result in cached_results:
+        yield result
+    
+    async def run(entry):
+        async with semaphore:
+            start = time.time()
+            try:
+                result = await research_query(entry["query"])
+            except Exception as e:
+                result = {"status": "error", "query": entry["query"], "research": f"Research error: {str(e)}"}
+            return {**result, "index": entry["index"], "duplicates": entry["duplicates"],
+                    "cached": False, "processing_time": f"{time.time() - start:.2f}s"}
+    
+    # Tasks copy the current context, so batch research yields the LLM to interactive requests
+    with llm_lane("batch"):
+        tasks = [asyncio.ensure_future(run(entry)) for entry in misses]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop pending research if the consumer goes away (e.g. client disconnect)
+        for task in tasks:
+            task.cancel()
+
+
+async def _main(queries: list, concurrency: int, output):
+    start = time.time()
+    counts = {"success": 0, "error": 0, "cached": 0}
+    
+    async for result in run_batch(queries, concurrency=concurrency):
+        counts["cached" if result["cached"] else result["status"]] += 1
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+    
+    print(f"✅ {len(queries)} queries: {counts['success']} researched, {counts['cached']} cached, "
+          f"{counts['error']} failed in {time.time() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Research a list of queries, writing NDJSON results")
+    parser.add_argument("file", help="Text file with one query per line ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="NDJSON output file (default stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help=f"Queries researched at once (default {BATCH_CONCURRENCY})")
+    args = parser.parse_args()
+    
+    source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    with source:
+        queries = [line.strip() for line in source if line.strip()]
+    
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    # Agent progress (log events and any stray prints) goes to stderr so stdout stays valid NDJSON
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(name)s: %(message)s")
+    with output, contextlib.redirect_stdout(sys.stderr):
+        asyncio.run(_main(queries, args.concurrency, output))
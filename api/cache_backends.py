@@ -0,0 +1,287 @@
+from abc import ABC, abstractmethod
+from cachetools import LRUCache, FIFOCache, LFUCache
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Eviction policies supported by every backend
+EVICTION_POLICIES = ("lru", "fifo", "lfu")
+
+
+class CacheBackend(ABC):
+    """
+    Storage interface behind cache_manager.get_from_cache/save_to_cache
+    
+    Values are JSON-serializable dicts. Entries expire after `ttl` seconds
+    and, once `maxsize` entries are stored, are evicted by `eviction` policy.
+    """
+    name = "base"
+    
+    def __init__(self, maxsize: int = 100, ttl: int = 300, eviction: str = "lru"):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction}'. Use one of {EVICTION_POLICIES}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.eviction = eviction
+    
+    @abstractmethod
+    def get(self, key: str):
+        """Return the cached value, or None if missing/expired"""
+    
+    @abstractmethod
+    def set(self, key: str, value: dict):
+        """Store a value, evicting entries if the cache is full"""
+    
+    @abstractmethod
+    def clear(self):
+        """Remove every entry"""
+    
+    @abstractmethod
+    def size(self) -> int:
+        """Number of live entries"""
+    
+    @abstractmethod
+    def items(self) -> list:
+        """(key, value) for every live entry, e.g. to rebuild an index at startup"""
+    
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+    
+    def __len__(self) -> int:
+        return self.size()
+
+
+class MemoryBackend(CacheBackend):
+    """In-process cache (per worker, lost on restart)"""
+    name = "memory"
+    
+    _policies = {"lru": LRUCache, "fifo": FIFOCache, "lfu": LFUCache}
+    
+    def __init__(self, maxsize: int = 100, ttl: int = 300, eviction: str = "lru"):
+        super().__init__(maxsize, ttl, eviction)
+        self._cache = self._policies[eviction](maxsize=maxsize)
+        self._lock = threading.Lock()
+    
+    def get(self, key: str):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._cache[key]
+                return None
+            return value
+    
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._cache[key] = (time.time() + self.ttl, value)
+    
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+    
+    def size(self) -> int:
+        now = time.time()
+        with self._lock:
+            return sum(1 for expires_at, _ in self._cache.values() if expires_at > now)
+    
+    def items(self) -> list:
+        now = time.time()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._cache.items() if expires_at > now]
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    On-disk cache shared by every worker process on the host
+    
+    Uses WAL mode so readers in one worker don't block writers in another.
+    """
+    name = "sqlite"
+    
+    # Which rows go first when the cache is over maxsize
+    _eviction_order = {
+        "lru": "accessed_at ASC",
+        "fifo": "created_at ASC",
+        "lfu": "hits ASC, accessed_at ASC"
+    }
+    
+    def __init__(self, path: str = "research_cache.db", maxsize: int = 100, ttl: int = 300,
+                 eviction: str = "lru"):
+        super().__init__(maxsize, ttl, eviction)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+    
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0])
+    
+    def set(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at, expires_at, hits) "
+                    "VALUES (?, ?, ?, ?, ?, 0)",
+                    (key, json.dumps(value), now, now, now + self.ttl)
+                )
+                self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                self._conn.execute(
+                    f"DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                    f"ORDER BY {self._eviction_order[self.eviction]} "
+                    f"LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?))",
+                    (self.maxsize,)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+    
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+    
+    def items(self) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM cache WHERE expires_at > ? ORDER BY created_at", (time.time(),)
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+
+class RedisBackend(CacheBackend):
+    """
+    Cache on any Redis-protocol server, shared across hosts
+    
+    TTL is enforced by Redis itself. A sorted-set index per cache tracks
+    entry order so maxsize and the eviction policy are applied client-side,
+    independent of the server's maxmemory-policy.
+    
+    Pass `client` to use an existing connection or a local stand-in such
+    as fakeredis.FakeRedis().
+    """
+    name = "redis"
+    
+    def __init__(self, url: str = "redis://localhost:6379/0", maxsize: int = 100, ttl: int = 300,
+                 eviction: str = "lru", prefix: str = "research_cache:", client=None):
+        super().__init__(maxsize, ttl, eviction)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._index = f"{prefix}__index__"
+    
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.client.zrem(self._index, key)
+            return None
+        if self.eviction == "lru":
+            self.client.zadd(self._index, {key: time.time()})
+        elif self.eviction == "lfu":
+            self.client.zincrby(self._index, 1, key)
+        return json.loads(raw)
+    
+    def set(self, key: str, value: dict):
+        # fifo/lru score by time, lfu by hit count (new entries start at 0)
+        score = 0 if self.eviction == "lfu" else time.time()
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+        pipe.zadd(self._index, {key: score})
+        pipe.zcard(self._index)
+        overflow = pipe.execute()[-1] - self.maxsize
+        
+        if overflow > 0:
+            evicted = [k.decode() if isinstance(k, bytes) else k
+                       for k, _ in self.client.zpopmin(self._index, overflow)]
+            if evicted:
+                self.client.delete(*[self.prefix + k for k in evicted])
+    
+    def clear(self):
+        keys = self.client.zrange(self._index, 0, -1)
+        pipe = self.client.pipeline()
+        for k in keys:
+            pipe.delete(self.prefix + (k.decode() if isinstance(k, bytes) else k))
+        pipe.delete(self._index)
+        pipe.execute()
+    
+    def size(self) -> int:
+        """
+        Entries in the index (one ZCARD, whatever the cache size)
+        
+        Can include entries Redis already expired until they are next looked
+        up or evicted, so it may overcount by up to the expired entries.
+        """
+        return self.client.zcard(self._index)
+    
+    def items(self) -> list:
+        keys = [k.decode() if isinstance(k, bytes) else k for k in self.client.zrange(self._index, 0, -1)]
+        items = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            values = self.client.mget([self.prefix + k for k in chunk])
+            items.extend((k, json.loads(raw)) for k, raw in zip(chunk, values) if raw is not None)
+        return items
+
+
+def create_backend(backend: str = None) -> CacheBackend:
+    """
+    Build the cache backend selected by environment variables
+    
+    CACHE_BACKEND      memory (default) | sqlite | redis
+    CACHE_MAXSIZE      max entries (default 100)
+    CACHE_TTL          seconds before an entry expires (default 300)
+    CACHE_EVICTION     lru (default) | fifo | lfu
+    CACHE_SQLITE_PATH  database file for the sqlite backend
+    REDIS_URL          server URL for the redis backend
+    """
+    backend = backend or os.getenv("CACHE_BACKEND", "memory")
+    options = {
+        "maxsize": int(os.getenv("CACHE_MAXSIZE", 100)),
+        "ttl": int(os.getenv("CACHE_TTL", 300)),
+        "eviction": os.getenv("CACHE_EVICTION", "lru")
+    }
+    
+    if backend == "memory":
+        return MemoryBackend(**options)
+    if backend == "sqlite":
+        return SQLiteBackend(path=os.getenv("CACHE_SQLITE_PATH", "research_cache.db"), **options)
+    if backend == "redis":
+        return RedisBackend(url=os.getenv("REDIS_URL", "redis://localhost:6379/0"), **options)
+    raise ValueError(f"Unknown CACHE_BACKEND '{backend}'. Use memory, sqlite or redis")
@@ -1,58 +1,234 @@
-from cachetools import TTLCache
+import asyncio
 import hashlib
 import json
+import os
+import threading
 from datetime import datetime
 
-# Cache configuration
-# TTL = Time To Live (5 minutes = 300 seconds)
-# maxsize = Maximum number of cached items
-research_cache = TTLCache(maxsize=100, ttl=300)
-cache_stats = {"hits": 0, "misses": 0, "total_requests": 0}
+from cache_backends import create_backend
+from semantic_cache import SemanticIndex
+from tools.metrics import CACHE_REQUESTS
+
+# Cache configuration (see cache_backends.create_backend)
+# CACHE_BACKEND = memory (per worker), sqlite (shared on one host) or redis (shared cluster-wide)
+# CACHE_TTL = Time To Live (default 5 minutes = 300 seconds)
+# CACHE_MAXSIZE = Maximum number of cached items (default 100)
+# CACHE_EVICTION = Which entries go first when full: lru, fifo or lfu
+research_cache = create_backend()
+cache_stats = {"hits": 0, "misses": 0, "total_requests": 0, "coalesced": 0}
+# Lookups run on worker threads (see aget_from_cache), so counters are updated under a lock
+_stats_lock = threading.Lock()
+
+# Near-duplicate lookup: on an exact-key miss, reuse the entry for the most
+# similar cached query if its TF-IDF cosine similarity clears the threshold.
+# Only research answers are matched this way; whole reports (complete) and
+# other stages need an exact query match.
+# SEMANTIC_CACHE = on/off (default on)
+# SEMANTIC_CACHE_THRESHOLD = minimum similarity for a hit (default 0.9)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "on").lower() not in ("off", "false", "0")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.9))
+SEMANTIC_CACHE_NAMESPACES = ("research",)
+semantic_index = SemanticIndex(maxsize=research_cache.maxsize * 2)
+semantic_stats = {"hits": 0, "similarity_total": 0.0, "min_similarity": None}
+
+# Cached stages share research_cache under namespaced keys:
+#   research - /research responses, also reused as the first stage of /complete
+#   complete - full orchestrator reports from /complete
+stage_stats = {}
+
+# Computations currently in flight, keyed by namespace + cache key, so
+# concurrent identical requests share one run instead of each missing the cache
+in_flight = {}
 
 def get_cache_key(query: str) -> str:
     """Generate unique cache key from query"""
     return hashlib.md5(query.lower().strip().encode()).hexdigest()
 
-def get_from_cache(query: str):
-    """Get cached response if available"""
-    cache_stats["total_requests"] += 1
+def _namespaced_key(query: str, namespace: str) -> str:
+    """Cache key for a stage (research keeps the bare key for compatibility)"""
     key = get_cache_key(query)
-    
-    if key in research_cache:
+    return key if namespace == "research" else f"{namespace}:{key}"
+
+def _record(namespace: str, hit: bool, similarity: float = None):
+    """Update overall and per-stage hit/miss counters"""
+    result = "miss" if not hit else "hit" if similarity is None else "semantic_hit"
+    CACHE_REQUESTS.inc(cache=namespace, result=result)
+    with _stats_lock:
+        _count(namespace, hit, similarity)
+
+def _count(namespace: str, hit: bool, similarity: float = None):
+    stats = stage_stats.setdefault(namespace, {"hits": 0, "misses": 0, "semantic_hits": 0})
+    cache_stats["total_requests"] += 1
+    if hit:
         cache_stats["hits"] += 1
-        cached_item = research_cache[key]
+        stats["hits"] += 1
+        if similarity is not None:
+            stats["semantic_hits"] += 1
+            semantic_stats["hits"] += 1
+            semantic_stats["similarity_total"] += similarity
+            if semantic_stats["min_similarity"] is None or similarity < semantic_stats["min_similarity"]:
+                semantic_stats["min_similarity"] = similarity
+    else:
+        cache_stats["misses"] += 1
+        stats["misses"] += 1
+
+def get_from_cache(query: str, namespace: str = "research"):
+    """Get cached response for a stage if available"""
+    key = _namespaced_key(query, namespace)
+    cached_item = research_cache.get(key)
+    similarity = None
+    
+    if cached_item is None and SEMANTIC_CACHE_ENABLED and namespace in SEMANTIC_CACHE_NAMESPACES:
+        cached_item, similarity, matched_query = _semantic_lookup(query, namespace)
+    
+    if cached_item is not None:
+        _record(namespace, hit=True, similarity=similarity)
+        cached_item = dict(cached_item)
         cached_item["cached"] = True
         cached_item["cached_at"] = cached_item.get("timestamp", "unknown")
+        if similarity is not None:
+            cached_item["semantic_match"] = {
+                "matched_query": matched_query,
+                "similarity": round(similarity, 3)
+            }
         return cached_item
     
-    cache_stats["misses"] += 1
+    _record(namespace, hit=False)
     return None
 
-def save_to_cache(query: str, result: dict):
-    """Save response to cache"""
-    key = get_cache_key(query)
+def _semantic_lookup(query: str, namespace: str):
+    """
+    Find a cached entry for a near-duplicate query
+    
+    Returns:
+        (cached_item, similarity, matched_query), or (None, None, None)
+    """
+    match = semantic_index.find(namespace, query, SEMANTIC_CACHE_THRESHOLD)
+    if match is None:
+        return None, None, None
+    
+    key, matched_query, similarity = match
+    cached_item = research_cache.get(key)
+    if cached_item is None:
+        # Expired or evicted from the backend since it was indexed
+        semantic_index.discard(namespace, key)
+        return None, None, None
+    return cached_item, similarity, matched_query
+
+def rebuild_semantic_index() -> int:
+    """
+    Index the queries of research answers already in the backend
+    
+    With a shared backend (sqlite/redis) this lets a worker that just
+    started match entries cached by other workers or before a restart.
+    
+    Returns:
+        The number of queries indexed
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return 0
+    indexed = 0
+    for key, value in research_cache.items():
+        # research keeps the bare key; other stages are "namespace:key"
+        namespace = key.rpartition(":")[0] or "research"
+        if namespace in SEMANTIC_CACHE_NAMESPACES and isinstance(value, dict) and value.get("query"):
+            semantic_index.add(namespace, value["query"], key)
+            indexed += 1
+    return indexed
+
+def save_to_cache(query: str, result: dict, namespace: str = "research"):
+    """Save response for a stage to cache"""
+    key = _namespaced_key(query, namespace)
     result["timestamp"] = datetime.now().isoformat()
     result["cached"] = False
-    research_cache[key] = result
+    research_cache.set(key, result)
+    if SEMANTIC_CACHE_ENABLED and namespace in SEMANTIC_CACHE_NAMESPACES:
+        semantic_index.add(namespace, query, key)
     return result
 
+async def aget_from_cache(query: str, namespace: str = "research"):
+    """
+    get_from_cache on a worker thread
+    
+    The sqlite and redis backends do blocking I/O (a locked database can
+    wait up to 30s), so async code must not call them on the event loop.
+    """
+    return await asyncio.to_thread(get_from_cache, query, namespace)
+
+async def asave_to_cache(query: str, result: dict, namespace: str = "research"):
+    """save_to_cache on a worker thread (see aget_from_cache)"""
+    return await asyncio.to_thread(save_to_cache, query, result, namespace)
+
+async def single_flight(query: str, compute, namespace: str = "research") -> dict:
+    """
+    Run compute() once for all concurrent requests with the same normalized query
+    
+    Args:
+        query: The query (normalized with get_cache_key)
+        compute: Zero-argument coroutine function producing the result dict
+        namespace: Keeps different endpoints for the same query apart
+    
+    Returns:
+        A shallow copy of the shared result, so callers can add per-request fields
+    """
+    key = f"{namespace}:{get_cache_key(query)}"
+    task = in_flight.get(key)
+    
+    if task is not None:
+        cache_stats["coalesced"] += 1
+    else:
+        task = asyncio.ensure_future(compute())
+        in_flight[key] = task
+        task.add_done_callback(lambda _: in_flight.pop(key, None))
+    
+    # Shield so one client disconnecting doesn't cancel the run for everyone else
+    result = await asyncio.shield(task)
+    return dict(result)
+
 def get_cache_stats():
     """Get cache statistics"""
     hit_rate = (cache_stats["hits"] / cache_stats["total_requests"] * 100) if cache_stats["total_requests"] > 0 else 0
+    stages = {}
+    for namespace, stats in stage_stats.items():
+        lookups = stats["hits"] + stats["misses"]
+        stages[namespace] = {
+            "cache_hits": stats["hits"],
+            "cache_misses": stats["misses"],
+            "semantic_hits": stats["semantic_hits"],
+            "hit_rate": f"{(stats['hits'] / lookups * 100) if lookups > 0 else 0:.2f}%"
+        }
     return {
-        "cache_size": len(research_cache),
+        "backend": research_cache.name,
+        "cache_size": research_cache.size(),
         "max_size": research_cache.maxsize,
         "ttl_seconds": research_cache.ttl,
+        "eviction_policy": research_cache.eviction,
         "total_requests": cache_stats["total_requests"],
         "cache_hits": cache_stats["hits"],
         "cache_misses": cache_stats["misses"],
-        "hit_rate": f"{hit_rate:.2f}%"
+        "hit_rate": f"{hit_rate:.2f}%",
+        "stages": stages,
+        "semantic": {
+            "enabled": SEMANTIC_CACHE_ENABLED,
+            "threshold": SEMANTIC_CACHE_THRESHOLD,
+            "indexed_queries": len(semantic_index),
+            "hits": semantic_stats["hits"],
+            "average_similarity": round(semantic_stats["similarity_total"] / semantic_stats["hits"], 3) if semantic_stats["hits"] else None,
+            "min_similarity": round(semantic_stats["min_similarity"], 3) if semantic_stats["min_similarity"] is not None else None
+        },
+        "coalesced_requests": cache_stats["coalesced"],
+        "in_flight": len(in_flight)
     }
 
 def clear_cache():
     """Clear all cached data"""
     research_cache.clear()
-    cache_stats["hits"] = 0
-    cache_stats["misses"] = 0
-    cache_stats["total_requests"] = 0
+    with _stats_lock:
+        cache_stats["hits"] = 0
+        cache_stats["misses"] = 0
+        cache_stats["total_requests"] = 0
+        cache_stats["coalesced"] = 0
+        stage_stats.clear()
+    semantic_index.clear()
+    semantic_stats.update({"hits": 0, "similarity_total": 0.0, "min_similarity": None})
     return {"message": "Cache cleared successfully"}
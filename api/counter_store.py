@@ -0,0 +1,330 @@
+from abc import ABC, abstractmethod
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport
+
+
+class CounterStore(ABC):
+    """
+    Sliding-window request counters shared by the API key quota and the rate limiter
+    
+    Each key has one counter per fixed window of `window` seconds. A hit is
+    weighed against the current window's count plus the previous window's
+    count scaled by how much of it still overlaps the sliding window, so
+    every hit reads two counters and writes one, whatever the limit.
+    
+    Window boundaries come from the wall clock, so hosts sharing a store
+    need synchronized clocks (NTP).
+    """
+    name = "base"
+    
+    @abstractmethod
+    def hit(self, key: str, limit: float, window: int, cost: int = 1) -> tuple:
+        """
+        Count `cost` hits against `key` if that keeps it within `limit`
+        
+        Returns:
+            (allowed, count): whether the hits were counted, and the
+            weighted count in the sliding window afterwards
+        """
+    
+    @abstractmethod
+    def get_window(self, key: str, window: int) -> tuple:
+        """(previous count, previous TTL, current count, current TTL) for `key`"""
+    
+    @abstractmethod
+    def clear(self, key: str):
+        """Remove every counter of `key`"""
+    
+    @abstractmethod
+    def reset(self):
+        """Remove every counter"""
+    
+    def check(self) -> bool:
+        """Whether the store is reachable"""
+        return True
+    
+    @staticmethod
+    def _windows(key: str, window: int, now: float) -> tuple:
+        """Previous and current bucket keys, plus the previous window's weight and TTL"""
+        index = int(now // window)
+        elapsed = now - index * window
+        previous_ttl = window - elapsed
+        return f"{key}/{index - 1}", f"{key}/{index}", previous_ttl / window, previous_ttl
+
+
+class MemoryCounterStore(CounterStore):
+    """
+    Per-process counters (single worker only: every process keeps its own counts)
+    
+    Buckets of keys that stop being hit (e.g. one-off client IPs) are
+    dropped by a sweep at most every `sweep_interval` seconds.
+    """
+    name = "memory"
+    
+    def __init__(self, sweep_interval: float = 60):
+        self._counts = {}  # bucket key -> [count, expires_at]
+        self._lock = threading.Lock()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+    
+    def _count(self, bucket: str, now: float) -> int:
+        entry = self._counts.get(bucket)
+        return entry[0] if entry is not None and entry[1] > now else 0
+    
+    def _sweep(self, now: float):
+        self._next_sweep = now + self.sweep_interval
+        for bucket in [k for k, (_, expires_at) in self._counts.items() if expires_at <= now]:
+            del self._counts[bucket]
+    
+    def hit(self, key: str, limit: float, window: int, cost: int = 1) -> tuple:
+        now = time.time()
+        previous_key, current_key, weight, previous_ttl = self._windows(key, window, now)
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            count = self._count(previous_key, now) * weight + self._count(current_key, now)
+            if count + cost > limit:
+                return False, count
+            entry = self._counts.get(current_key)
+            if entry is None or entry[1] <= now:
+                # A bucket is needed until the end of the window after its own
+                entry = self._counts[current_key] = [0, now + previous_ttl + window]
+            entry[0] += cost
+        return True, count + cost
+    
+    def get_window(self, key: str, window: int) -> tuple:
+        now = time.time()
+        previous_key, current_key, _, previous_ttl = self._windows(key, window, now)
+        with self._lock:
+            return (self._count(previous_key, now), previous_ttl,
+                    self._count(current_key, now), previous_ttl + window)
+    
+    def size(self) -> int:
+        """Buckets held, including expired ones not swept yet"""
+        with self._lock:
+            return len(self._counts)
+    
+    def clear(self, key: str):
+        with self._lock:
+            for bucket in [k for k in self._counts if k.rpartition("/")[0] == key]:
+                del self._counts[bucket]
+    
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class SQLiteCounterStore(CounterStore):
+    """
+    Counters in a SQLite file shared by every worker process on the host
+    
+    Each hit is one BEGIN IMMEDIATE transaction, so the read of both
+    windows and the increment are atomic across processes.
+    """
+    name = "sqlite"
+    
+    def __init__(self, path: str = "counters.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS counters (
+                key TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS counters_expires ON counters (expires_at)")
+    
+    def _read(self, previous_key: str, current_key: str) -> tuple:
+        counts = dict(self._conn.execute(
+            "SELECT key, count FROM counters WHERE key IN (?, ?)", (previous_key, current_key)
+        ).fetchall())
+        return counts.get(previous_key, 0), counts.get(current_key, 0)
+    
+    def hit(self, key: str, limit: float, window: int, cost: int = 1) -> tuple:
+        now = time.time()
+        previous_key, current_key, weight, _ = self._windows(key, window, now)
+        # A bucket is needed until the end of the window after its own
+        expires_at = (int(now // window) + 2) * window
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                previous, current = self._read(previous_key, current_key)
+                count = previous * weight + current
+                allowed = count + cost <= limit
+                if allowed:
+                    self._conn.execute(
+                        "INSERT INTO counters (key, count, expires_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET count = count + excluded.count",
+                        (current_key, cost, expires_at)
+                    )
+                    count += cost
+                self._conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return allowed, count
+    
+    def get_window(self, key: str, window: int) -> tuple:
+        previous_key, current_key, _, previous_ttl = self._windows(key, window, time.time())
+        with self._lock:
+            previous, current = self._read(previous_key, current_key)
+        return previous, previous_ttl, current, previous_ttl + window
+    
+    def clear(self, key: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM counters WHERE substr(key, 1, ?) = ?", (len(key) + 1, key + "/")
+            )
+    
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM counters")
+    
+    def check(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1").fetchone() is not None
+
+
+class RedisCounterStore(CounterStore):
+    """
+    Counters on any Redis-protocol server, shared across hosts
+    
+    A hit is one pipelined round trip: read the previous window, INCRBY the
+    current one and refresh its expiry. A hit that turns out to be over the
+    limit is taken back with DECRBY, so under contention near the limit a
+    request can be refused that would have fit, but the limit is never
+    exceeded. Works without server-side scripting.
+    
+    Pass `client` to use an existing connection or a local stand-in such
+    as fakeredis.FakeRedis().
+    """
+    name = "redis"
+    
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "counters:", client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("COUNTER_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+    
+    def hit(self, key: str, limit: float, window: int, cost: int = 1) -> tuple:
+        previous_key, current_key, weight, previous_ttl = self._windows(key, window, time.time())
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self.prefix + previous_key)
+        pipe.incrby(self.prefix + current_key, cost)
+        pipe.expire(self.prefix + current_key, math.ceil(previous_ttl + window))
+        previous, current, _ = pipe.execute()
+        count = int(previous or 0) * weight + current
+        if count > limit:
+            self.client.decrby(self.prefix + current_key, cost)
+            return False, count - cost
+        return True, count
+    
+    def get_window(self, key: str, window: int) -> tuple:
+        previous_key, current_key, _, previous_ttl = self._windows(key, window, time.time())
+        previous, current = self.client.mget(self.prefix + previous_key, self.prefix + current_key)
+        return int(previous or 0), previous_ttl, int(current or 0), previous_ttl + window
+    
+    def clear(self, key: str):
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", self.prefix + key) + "/*"
+        keys = list(self.client.scan_iter(match=pattern))
+        if keys:
+            self.client.delete(*keys)
+    
+    def reset(self):
+        keys = list(self.client.scan_iter(match=re.sub(r"([*?\[\]\\])", r"\\\1", self.prefix) + "*"))
+        if keys:
+            self.client.delete(*keys)
+    
+    def check(self) -> bool:
+        return bool(self.client.ping())
+
+
+def create_counter_store(backend: str = None) -> CounterStore:
+    """
+    Build the counter store selected by environment variables
+    
+    COUNTER_BACKEND      memory (default, one worker) | sqlite (workers on one host) | redis (cluster)
+    COUNTER_SQLITE_PATH  database file for the sqlite backend
+    REDIS_URL            server URL for the redis backend
+    """
+    backend = backend or os.getenv("COUNTER_BACKEND", "memory")
+    
+    if backend == "memory":
+        return MemoryCounterStore()
+    if backend == "sqlite":
+        return SQLiteCounterStore(path=os.getenv("COUNTER_SQLITE_PATH", "counters.db"))
+    if backend == "redis":
+        return RedisCounterStore(url=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown COUNTER_BACKEND '{backend}'. Use memory, sqlite or redis")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_counter_store() -> CounterStore:
+    """The process-wide counter store (created on first use)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_counter_store()
+        return _store
+
+
+class CounterStoreStorage(Storage, SlidingWindowCounterSupport):
+    """
+    `limits` storage backed by the counter store, for slowapi's
+    sliding-window-counter strategy (storage_uri="counterstore://")
+    """
+    STORAGE_SCHEME = ["counterstore"]
+    
+    def __init__(self, uri: str = None, wrap_exceptions: bool = False, store: CounterStore = None, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.store = store or get_counter_store()
+    
+    @property
+    def base_exceptions(self):
+        return Exception
+    
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        return self.store.hit(key, limit, expiry, amount)[0]
+    
+    def get_sliding_window(self, key: str, expiry: int) -> tuple:
+        return self.store.get_window(key, expiry)
+    
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        self.store.clear(key)
+    
+    # Fixed and moving windows aren't supported
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        raise NotImplementedError("counterstore:// only supports the sliding-window-counter strategy")
+    
+    def get(self, key: str) -> int:
+        raise NotImplementedError("counterstore:// only supports the sliding-window-counter strategy")
+    
+    def get_expiry(self, key: str) -> float:
+        raise NotImplementedError("counterstore:// only supports the sliding-window-counter strategy")
+    
+    def check(self) -> bool:
+        return self.store.check()
+    
+    def reset(self):
+        self.store.reset()
+    
+    def clear(self, key: str) -> None:
+        self.store.clear(key)
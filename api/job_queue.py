@@ -0,0 +1,309 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from cache_manager import get_cache_key
+from tools.log_events import get_event_logger
+
+events = get_event_logger("API.jobs")
+
+# Job lifecycle: queued -> running -> done | failed
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+JOB_COLUMNS = "id, query, query_key, status, result, error, created_at, started_at, finished_at"
+
+
+class JobQueue:
+    """
+    SQLite-backed queue of long-running report jobs with an asyncio worker pool
+    
+    Jobs and their results are stored on disk, so finished reports can still
+    be fetched after a restart and jobs interrupted mid-run are re-queued.
+    Submitting a query that already has a queued or running job returns
+    that job instead of adding a duplicate.
+    
+    Several queues (e.g. one per uvicorn worker) can share the database:
+    a job is claimed with a conditional UPDATE, so it runs exactly once.
+    Running jobs carry their queue's owner id and a heartbeat; another
+    queue only re-queues a running job once its heartbeat is stale.
+    Finished jobs are deleted after `retention` seconds.
+    """
+    
+    def __init__(self, path: str = "jobs.db", workers: int = 2, heartbeat: float = 10,
+                 stale_after: float = 60, retention: float = 7 * 86400):
+        self.path = path
+        self.workers = workers
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self.retention = retention
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                query_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        # Added after the first release; older databases are migrated in place
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column in ("owner TEXT", "heartbeat_at REAL"):
+            if column.split()[0] not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (query_key, status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, finished_at)")
+        self._queue = None
+        self._tasks = []
+        self.stats = {"submitted": 0, "deduplicated": 0, "started": 0, "completed": 0, "failed": 0,
+                      "recovered": 0, "pruned": 0, "total_wait_time": 0.0, "total_run_time": 0.0}
+    
+    async def start(self, handler):
+        """
+        Re-queue abandoned jobs, then start the workers and the heartbeat
+        
+        Args:
+            handler: Coroutine function handler(query) returning the result dict
+        """
+        self._queue = asyncio.Queue()
+        recovered, pending = await asyncio.to_thread(self._maintain, starting=True)
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        
+        self._tasks = [asyncio.ensure_future(self._worker(handler)) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._heartbeat_loop()))
+        events.info("job_queue_started", owner=self.owner, workers=self.workers,
+                    pending=len(pending), recovered=recovered)
+    
+    def _maintain(self, starting: bool) -> tuple:
+        """
+        Heartbeat this queue's running jobs, re-queue abandoned ones and prune old results
+        
+        A running job is abandoned if its owner's heartbeat is stale or, when
+        starting, if this queue owns it (it was interrupted by stop()).
+        
+        Returns:
+            (number of jobs re-queued, ids to put on the local queue: every
+            queued job when starting, else just the re-queued ones)
+        """
+        now = time.time()
+        abandoned = "status = 'running' AND (owner IS NULL OR heartbeat_at IS NULL OR heartbeat_at < ?"
+        abandoned += " OR owner = ?)" if starting else ")"
+        params = (now - self.stale_after, self.owner) if starting else (now - self.stale_after,)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ?",
+                    (now, self.owner)
+                )
+                recovered = [job_id for (job_id,) in self._conn.execute(
+                    f"SELECT id FROM jobs WHERE {abandoned} ORDER BY created_at", params
+                ).fetchall()]
+                self._conn.execute(
+                    f"UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, heartbeat_at = NULL "
+                    f"WHERE {abandoned}", params
+                )
+                pruned = self._conn.execute(
+                    "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                    (now - self.retention,)
+                ).rowcount
+                pending = recovered
+                if starting:
+                    pending = [job_id for (job_id,) in self._conn.execute(
+                        "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+                    ).fetchall()]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.stats["recovered"] += len(recovered)
+        self.stats["pruned"] += pruned
+        return len(recovered), pending
+    
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                _, recovered = await asyncio.to_thread(self._maintain, starting=False)
+            except sqlite3.Error as e:
+                events.warning("job_heartbeat_error", error=str(e))
+                continue
+            for job_id in recovered:
+                self._queue.put_nowait(job_id)
+    
+    async def stop(self):
+        """Cancel the workers; their running jobs are re-queued on the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def submit(self, query: str):
+        """
+        Queue a job for query, or return the pending job for the same query
+        
+        Returns:
+            (job dict, deduplicated) where deduplicated is True if an existing
+            queued or running job was returned
+        """
+        job, deduplicated = await asyncio.to_thread(self._insert, query)
+        if not deduplicated and self._queue is not None:
+            self._queue.put_nowait(job["job_id"])
+        return job, deduplicated
+    
+    def _insert(self, query: str):
+        query_key = get_cache_key(query)
+        with self._lock:
+            # One write transaction, so another process can't insert the same
+            # query between the check and the insert
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {JOB_COLUMNS} FROM jobs WHERE query_key = ? AND status IN ('queued', 'running') "
+                    "ORDER BY created_at LIMIT 1",
+                    (query_key,)
+                ).fetchone()
+                deduplicated = row is not None
+                if not deduplicated:
+                    job_id = uuid.uuid4().hex
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, query, query_key, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                        (job_id, query, query_key, time.time())
+                    )
+                    row = self._conn.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        
+        self.stats["deduplicated" if deduplicated else "submitted"] += 1
+        return self._as_dict(row), deduplicated
+    
+    def get(self, job_id: str):
+        """Return the job (with its result once done), or None if unknown"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._as_dict(row) if row else None
+    
+    def get_stats(self) -> dict:
+        """Queue depth, job counts and wait/run times"""
+        now = time.time()
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+        
+        started = self.stats["started"]
+        finished = self.stats["completed"] + self.stats["failed"]
+        return {
+            "workers": self.workers,
+            "queue_depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "jobs": {status: counts.get(status, 0) for status in JOB_STATUSES},
+            "submitted": self.stats["submitted"],
+            "deduplicated": self.stats["deduplicated"],
+            "recovered": self.stats["recovered"],
+            "pruned": self.stats["pruned"],
+            "average_wait_time": f"{(self.stats['total_wait_time'] / started) if started else 0:.2f}s",
+            "average_run_time": f"{(self.stats['total_run_time'] / finished) if finished else 0:.2f}s",
+            "oldest_queued_wait": f"{(now - oldest) if oldest else 0:.2f}s"
+        }
+    
+    async def _worker(self, handler):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id, handler)
+            finally:
+                self._queue.task_done()
+    
+    def _claim(self, job_id: str, started_at: float):
+        """Atomically move a queued job to running; None if another queue (or worker) got it first"""
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, owner = ?, heartbeat_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (started_at, self.owner, started_at, job_id)
+            ).rowcount == 1
+            if not claimed:
+                return None
+            return self._conn.execute("SELECT query, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    
+    def _finish(self, job_id: str, status: str, result, error, finished_at: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND owner = ?",
+                (status, result, error, finished_at, job_id, self.owner)
+            )
+    
+    async def _run(self, job_id: str, handler):
+        started_at = time.time()
+        row = await asyncio.to_thread(self._claim, job_id, started_at)
+        if row is None:
+            return  # already picked up (queued twice, or claimed by another worker)
+        query, created_at = row
+        self.stats["started"] += 1
+        self.stats["total_wait_time"] += started_at - created_at
+        
+        try:
+            result = await handler(query)
+            status, result, error = "done", json.dumps(result), None
+            self.stats["completed"] += 1
+        except Exception as e:
+            status, result, error = "failed", None, str(e)
+            self.stats["failed"] += 1
+        
+        finished_at = time.time()
+        self.stats["total_run_time"] += finished_at - started_at
+        await asyncio.to_thread(self._finish, job_id, status, result, error, finished_at)
+    
+    def _as_dict(self, row) -> dict:
+        job_id, query, _, status, result, error, created_at, started_at, finished_at = row
+        job = {
+            "job_id": job_id,
+            "query": query,
+            "status": status,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at
+        }
+        if started_at:
+            job["wait_time"] = f"{started_at - created_at:.2f}s"
+        if result is not None:
+            job["result"] = json.loads(result)
+        if error is not None:
+            job["error"] = error
+        return job
+
+
+def create_job_queue() -> JobQueue:
+    """
+    Build the job queue from environment variables
+    
+    JOB_DB_PATH            database file for jobs and their results (default jobs.db)
+    JOB_WORKERS            reports generated concurrently per process (default 2)
+    JOB_HEARTBEAT_SECONDS  how often running jobs are marked alive (default 10)
+    JOB_STALE_SECONDS      heartbeat age after which a running job is re-queued (default 60)
+    JOB_RETENTION_SECONDS  how long finished jobs are kept (default 7 days)
+    """
+    return JobQueue(
+        path=os.getenv("JOB_DB_PATH", "jobs.db"),
+        workers=int(os.getenv("JOB_WORKERS", 2)),
+        heartbeat=float(os.getenv("JOB_HEARTBEAT_SECONDS", 10)),
+        stale_after=float(os.getenv("JOB_STALE_SECONDS", 60)),
+        retention=float(os.getenv("JOB_RETENTION_SECONDS", 7 * 86400))
+    )
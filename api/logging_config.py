@@ -1,26 +1,106 @@
+import atexit
 import logging
-from datetime import datetime
-import json
+import logging.handlers
+import os
+import queue
+import random
+import sys
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('api_requests.log'),
-        logging.StreamHandler()
-    ]
-)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.log_events import get_event_logger
+
+# Logging settings
+# Records are put on an in-memory queue by the request thread and written
+# (formatted, then to file and console) by a background listener thread.
+# LOG_LEVEL = minimum level (default INFO; DEBUG turns on sampled debug events)
+# LOG_DEBUG_SAMPLE_RATE = share of DEBUG records kept (default 0.1)
+# LOG_FILE = log file (default api_requests.log)
+# LOG_ROTATION = size or time (default size)
+# LOG_MAX_BYTES = size at which the file rotates, for LOG_ROTATION=size (default 10 MB)
+# LOG_ROTATE_WHEN = interval for LOG_ROTATION=time, e.g. midnight or H (default midnight)
+# LOG_BACKUP_COUNT = rotated files kept (default 5)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0.1))
+LOG_FILE = os.getenv("LOG_FILE", "api_requests.log")
+LOG_ROTATION = os.getenv("LOG_ROTATION", "size").lower()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "midnight")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class DebugSampler(logging.Filter):
+    """Keep every record at INFO and above, and a random share of DEBUG records"""
+    
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread
+    
+    The stock prepare() renders the message on the calling thread; the
+    listener's handlers format records themselves, so the record is
+    queued as is.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _file_handler() -> logging.Handler:
+    if LOG_ROTATION == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    return logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+
+
+_listener = None
+
+
+def setup_logging():
+    """Route the root logger through a queue to a rotating file and the console (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+    
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [_file_handler(), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampler(LOG_DEBUG_SAMPLE_RATE))
+    
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush what's still queued on shutdown
+    atexit.register(_listener.stop)
+
+
+setup_logging()
+
+events = get_event_logger("API")
 
-logger = logging.getLogger("API")
 
 def log_request(endpoint: str, api_key_info: dict, query: str = None):
     """Log API requests"""
-    log_data = {
-        "timestamp": datetime.now().isoformat(),
-        "endpoint": endpoint,
-        "user": api_key_info.get("name", "Unknown"),
-        "usage": f"{api_key_info.get('usage', 0)}/{api_key_info.get('limit', 0)}",
-        "query": query[:100] if query else None  # Truncate long queries
-    }
-    logger.info(json.dumps(log_data))
+    events.info(
+        "request",
+        endpoint=endpoint,
+        user=api_key_info.get("name", "Unknown"),
+        usage=f"{api_key_info.get('usage', 0)}/{api_key_info.get('limit', 0)}",
+        query=query[:100] if query else None  # Truncate long queries
+    )
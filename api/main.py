@@ -1,30 +1,40 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from slowapi.errors import RateLimitExceeded
 import sys
 import os
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from starlette.background import BackgroundTask
+import json
+import asyncio
+import threading
+import time
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.researcher import research
-from agents.summarizer import SummarizerAgent
-from agents.fact_checker import FactCheckerAgent
-from agents.orchestrator import OrchestratorAgent
-from auth import verify_api_key
-from logging_config import log_request
-from rate_limiter import limiter, rate_limit_handler
-from cache_manager import get_from_cache, save_to_cache, get_cache_stats, clear_cache
+from agents.llm_scheduler import scheduler, llm_lane
+from tools.web_search import get_search_cache_stats, clear_search_cache
+from tools.page_fetcher import get_page_cache_stats
+from tools.metrics import CONTENT_TYPE, ERRORS, HTTP_SECONDS, render_metrics
+from admission import admission
+from auth import charge_usage, verify_api_key
+from logging_config import events, log_request
+from rate_limiter import check_rate_limit, limiter, rate_limit_handler
+from cache_manager import (aget_from_cache, asave_to_cache, get_cache_stats, clear_cache, rebuild_semantic_index,
+                           single_flight)
+from job_queue import create_job_queue
+from batch_research import aplan_batch, research_query, run_batch, BATCH_MAX_QUERIES
 
 # Initialize FastAPI with rate limiter
 app = FastAPI(
     title="AI Research Assistant API",
     description="Production-ready multi-agent AI system",
-    version="3.0.0"
+    version="3.0.0",
+    dependencies=[Depends(check_rate_limit)]
 )
 
 # Add rate limiter state
@@ -42,21 +52,100 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize agents
-summarizer = SummarizerAgent()
-fact_checker = FactCheckerAgent()
-orchestrator = OrchestratorAgent()
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Request latency by route template (streamed responses: time to first byte)"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    except Exception:
+        ERRORS.inc(component="http")
+        raise
+    finally:
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                             route=route.path if route else "unmatched", status=status)
+
+# Agents (and langchain behind them) are loaded on first use, so a cold
+# start serves /health right away. WARMUP_AGENTS=on loads them, and creates
+# their LLM clients, in the background at startup instead.
+# The standalone /summarize and /verify endpoints reuse the orchestrator's agents.
+WARMUP_AGENTS = os.getenv("WARMUP_AGENTS", "off").lower() in ("on", "true", "1")
+orchestrator = None
+_agents_lock = threading.Lock()
+
+def get_orchestrator():
+    """The shared OrchestratorAgent, built on first call"""
+    global orchestrator
+    with _agents_lock:
+        if orchestrator is None:
+            from agents.orchestrator import OrchestratorAgent
+            orchestrator = OrchestratorAgent()
+    return orchestrator
+
+async def load_agents():
+    """get_orchestrator without blocking the event loop on the first (slow) call"""
+    if orchestrator is None:
+        await asyncio.to_thread(get_orchestrator)
+    return orchestrator
+
+def warm_up():
+    """Build the agents and their LLM clients before the first request needs them"""
+    start = time.time()
+    get_orchestrator()
+    from agents.llm_clients import registry
+    from tools.web_search import warm_up as warm_up_search
+    registry.warm_up()
+    warm_up_search()
+    events.info("agents_warmed_up", seconds=round(time.time() - start, 2))
+
+# Background queue for /jobs (see job_queue.create_job_queue)
+job_queue = create_job_queue()
 
 # Request models
 class ResearchRequest(BaseModel):
+    # Unknown options (e.g. deep on /complete) are rejected, not silently ignored
+    model_config = ConfigDict(extra="forbid")
+    
     query: str
 
+class DeepResearchRequest(ResearchRequest):
+    deep: bool = False  # read the full pages of the top results, not just snippets (/research only)
+
+class BatchResearchRequest(BaseModel):
+    queries: list[str]
+
 class SummaryRequest(BaseModel):
     text: str
-    summary_type: str = "brief"
+    summary_type: str = "brief"  # or "all" for every format in one call
 
 class VerifyRequest(BaseModel):
     text: str
+    mode: str = None  # 'per_claim' or 'batched' (defaults to FACT_CHECK_MODE)
+
+def admitted_stream(body, ticket=None) -> StreamingResponse:
+    """
+    NDJSON response that returns an admission ticket when the stream ends
+    
+    The background task also covers a client that disconnects before the
+    body starts (the generator's own cleanup never runs then).
+    """
+    async def stream():
+        try:
+            async for line in body:
+                yield line
+        finally:
+            if ticket:
+                admission.release(ticket)
+    
+    async def release():
+        admission.release(ticket)
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson",
+                             background=BackgroundTask(release) if ticket else None)
 
 # API Endpoints
 # Serve static files
@@ -73,49 +162,131 @@ def root():
         "test_key": "dev_key_123",
         "endpoints": {
             "research": "/research (Protected, Cached, Rate Limited)",
+            "research_stream": "/research/stream (Protected, Cached, Rate Limited, NDJSON tokens)",
+            "research_batch": "/research/batch (Protected, Cached, Rate Limited, NDJSON results)",
             "summarize": "/summarize (Protected, Rate Limited)",
             "verify": "/verify (Protected, Rate Limited)",
-            "complete": "/complete (Protected, Rate Limited)",
+            "complete": "/complete (Protected, Cached, Rate Limited)",
+            "complete_stream": "/complete/stream (Protected, Cached, Rate Limited, NDJSON)",
+            "jobs": "POST /jobs (Protected, Rate Limited), GET /jobs/{job_id} (Public)",
             "stats": "/stats (Public)",
+            "metrics": "/metrics (Public, Prometheus text format)",
             "health": "/health (Public)"
         }
     }
 
 @app.post("/research")
 @limiter.limit("10/minute")  # 10 requests per minute per IP
-def research_endpoint(
+async def research_endpoint(
     request: Request,
-    research_req: ResearchRequest,
+    research_req: DeepResearchRequest,
     api_key_info: dict = Depends(verify_api_key)
 ):
     """Research with caching, rate limiting, and authentication"""
     log_request("/research", api_key_info, research_req.query)
     
     # Check cache first
-    cached_result = get_from_cache(research_req.query)
+    namespace = "deep_research" if research_req.deep else "research"
+    cached_result = await aget_from_cache(research_req.query, namespace=namespace)
     if cached_result:
         cached_result["usage"] = f"{api_key_info['usage']}/{api_key_info['limit']}"
         return cached_result
     
-    # If not cached, perform research
+    # If not cached, perform research (shared with identical in-flight requests)
     try:
-        result = research(research_req.query)
-        response = {
-            "status": "success",
-            "query": research_req.query,
-            "research": result,
-            "usage": f"{api_key_info['usage']}/{api_key_info['limit']}"
-        }
-        
-        # Save to cache
-        return save_to_cache(research_req.query, response)
-        
+        await load_agents()
+        # Charged once per research run, not per caller joining it
+        response = await research_query(research_req.query, deep=research_req.deep,
+                                        gate=lambda: admission.admit(namespace))
+        response["usage"] = f"{api_key_info['usage']}/{api_key_info['limit']}"
+        return response
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/research/stream")
+@limiter.limit("10/minute")
+async def research_stream_endpoint(
+    request: Request,
+    research_req: ResearchRequest,
+    api_key_info: dict = Depends(verify_api_key)
+):
+    """Research streamed token by token as NDJSON; the finished answer is cached"""
+    log_request("/research/stream", api_key_info, research_req.query)
+    usage = f"{api_key_info['usage']}/{api_key_info['limit']}"
+    cached_result = await aget_from_cache(research_req.query)
+    # Admitted before the response starts, so a busy server can still answer 503
+    ticket = None if cached_result else await admission.acquire("research")
+    
+    async def events():
+        if cached_result:
+            yield json.dumps({"event": "token", "text": cached_result["research"]}) + "\n"
+            yield json.dumps({"event": "done", **cached_result, "usage": usage}) + "\n"
+            return
+        
+        chunks = []
+        try:
+            await load_agents()
+            from agents.researcher import astream_research
+            async for text in astream_research(research_req.query):
+                chunks.append(text)
+                yield json.dumps({"event": "token", "text": text}) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "detail": f"Research error: {str(e)}"}) + "\n"
+            return
+        
+        # Only a stream that ran to completion is cached
+        response = await asave_to_cache(research_req.query, {
+            "status": "success",
+            "query": research_req.query,
+            "research": "".join(chunks)
+        })
+        yield json.dumps({"event": "done", **response, "usage": usage}) + "\n"
+    
+    return admitted_stream(events(), ticket)
+
+@app.post("/research/batch")
+@limiter.limit("2/minute")
+async def research_batch_endpoint(
+    request: Request,
+    batch_req: BatchResearchRequest,
+    api_key_info: dict = Depends(verify_api_key)
+):
+    """Research many queries, streaming one NDJSON result line per query as it finishes"""
+    log_request("/research/batch", api_key_info, f"{len(batch_req.queries)} queries")
+    if not batch_req.queries:
+        raise HTTPException(status_code=400, detail="queries must not be empty")
+    if len(batch_req.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUERIES} queries per batch")
+    
+    plan = await aplan_batch(batch_req.queries)
+    ticket = await admission.acquire("research_batch")
+    # Each unique uncached query is a research run and counts against the
+    # quota like a /research request; verify_api_key already charged one.
+    # Charged only once admitted, so a shed batch costs nothing extra
+    try:
+        api_key_info = await asyncio.to_thread(charge_usage, api_key_info, len(plan[1]) - 1)
+    except BaseException:
+        admission.release(ticket)
+        raise
+    usage = f"{api_key_info['usage']}/{api_key_info['limit']}"
+    
+    async def events():
+        counts = {"success": 0, "error": 0, "cached": 0}
+        await load_agents()
+        async for result in run_batch(batch_req.queries, plan=plan):
+            counts["cached" if result["cached"] else result["status"]] += 1
+            yield json.dumps({"event": "result", **result}) + "\n"
+        yield json.dumps({"event": "done", "total_queries": len(batch_req.queries),
+                          "unique_queries": sum(counts.values()), **counts, "usage": usage}) + "\n"
+    
+    return admitted_stream(events(), ticket)
+
 @app.post("/summarize")
 @limiter.limit("20/minute")
-def summarize_endpoint(
+async def summarize_endpoint(
     request: Request,
     summary_req: SummaryRequest,
     api_key_info: dict = Depends(verify_api_key)
@@ -124,18 +295,25 @@ def summarize_endpoint(
     log_request("/summarize", api_key_info)
     
     try:
-        result = summarizer.summarize(summary_req.text, summary_req.summary_type)
+        summarizer = (await load_agents()).summarizer
+        async with admission.admit("summarize"):
+            if summary_req.summary_type == "all":
+                result = await summarizer.asummarize_all(summary_req.text)
+            else:
+                result = await summarizer.asummarize(summary_req.text, summary_req.summary_type)
         return {
             "status": "success",
             "result": result,
             "usage": f"{api_key_info['usage']}/{api_key_info['limit']}"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/verify")
 @limiter.limit("15/minute")
-def verify_endpoint(
+async def verify_endpoint(
     request: Request,
     verify_req: VerifyRequest,
     api_key_info: dict = Depends(verify_api_key)
@@ -144,18 +322,97 @@ def verify_endpoint(
     log_request("/verify", api_key_info)
     
     try:
-        result = fact_checker.verify_claims(verify_req.text)
+        fact_checker = (await load_agents()).fact_checker
+        from agents.fact_checker import VERIFICATION_MODES
+        mode = verify_req.mode or fact_checker.mode
+        if mode not in VERIFICATION_MODES:
+            raise HTTPException(status_code=400,
+                                detail=f"Unknown verification mode '{mode}'. Use one of {VERIFICATION_MODES}")
+        async with admission.admit("verify_" + mode, fact_checker.expected_llm_calls(mode=mode)):
+            result = await fact_checker.averify_claims(verify_req.text, mode=mode)
         return {
             "status": "success",
             "verification": result,
             "usage": f"{api_key_info['usage']}/{api_key_info['limit']}"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def get_cached_research(query: str):
+    """Research text cached by /research or an earlier /complete, if any"""
+    cached_research = await aget_from_cache(query, namespace="research")
+    return cached_research["research"] if cached_research else None
+
+async def cache_report(query: str, report: dict, research_was_cached: bool) -> dict:
+    """Save a finished orchestrator report and its research stage to cache"""
+    if not research_was_cached and report["research"].get("status") == "success":
+        await asave_to_cache(query, {
+            "status": "success",
+            "query": query,
+            "research": report["research"]["content"]
+        })
+    
+    # Only cache reports where every agent succeeded
+    if len(report["agents_executed"]) == 3:
+        await asave_to_cache(query, report, namespace="complete")
+    return report
+
+async def complete_report(query: str, admit: bool = True) -> dict:
+    """
+    Full report for query, from cache or shared with an identical in-flight run
+    
+    Only a run that actually starts is charged to admission control; queued
+    jobs pass admit=False, since the job queue already bounds them.
+    """
+    # Check full-report cache first
+    cached_report = await aget_from_cache(query, namespace="complete")
+    if cached_report:
+        return cached_report
+    
+    async def run_complete():
+        # Stage-level reuse: cached research skips search + research LLM call
+        research_text = await get_cached_research(query)
+        agent = await load_agents()
+        if admit:
+            cost = agent.expected_llm_calls(research_cached=research_text is not None)
+            async with admission.admit("complete", cost):
+                report = await agent.aresearch_complete(query, research_text=research_text)
+        else:
+            report = await agent.aresearch_complete(query, research_text=research_text)
+        return await cache_report(query, report, research_was_cached=research_text is not None)
+    
+    return await single_flight(query, run_complete, namespace="complete")
+
+async def run_job(query: str) -> dict:
+    """Queued jobs yield the LLM to interactive requests"""
+    with llm_lane("batch"):
+        return await complete_report(query, admit=False)
+
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start(run_job)
+
+@app.on_event("startup")
+async def load_semantic_index():
+    # A shared cache backend may already hold research from other workers or a previous run
+    indexed = await asyncio.to_thread(rebuild_semantic_index)
+    events.info("semantic_index_rebuilt", queries=indexed)
+
+@app.on_event("startup")
+async def start_warm_up():
+    if WARMUP_AGENTS:
+        # Keep a reference so the task isn't garbage collected mid-run
+        app.state.warm_up = asyncio.ensure_future(asyncio.to_thread(warm_up))
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
 @app.post("/complete")
 @limiter.limit("5/minute")
-def complete_endpoint(
+async def complete_endpoint(
     request: Request,
     research_req: ResearchRequest,
     api_key_info: dict = Depends(verify_api_key)
@@ -164,28 +421,116 @@ def complete_endpoint(
     log_request("/complete", api_key_info, research_req.query)
     
     try:
-        result = orchestrator.research_complete(research_req.query)
+        result = await complete_report(research_req.query)
         result["usage"] = f"{api_key_info['usage']}/{api_key_info['limit']}"
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/complete/stream")
+@limiter.limit("5/minute")
+async def complete_stream_endpoint(
+    request: Request,
+    research_req: ResearchRequest,
+    api_key_info: dict = Depends(verify_api_key)
+):
+    """Complete workflow streamed as NDJSON, one line per finished stage, summary and claim"""
+    log_request("/complete/stream", api_key_info, research_req.query)
+    usage = f"{api_key_info['usage']}/{api_key_info['limit']}"
+    
+    cached_report = await aget_from_cache(research_req.query, namespace="complete")
+    research_text = None if cached_report else await get_cached_research(research_req.query)
+    ticket = None
+    if not cached_report:
+        agent = await load_agents()
+        ticket = await admission.acquire("complete", agent.expected_llm_calls(research_cached=research_text is not None))
+    
+    async def events():
+        if cached_report:
+            cached_report["usage"] = usage
+            yield json.dumps({"event": "complete", "report": cached_report}) + "\n"
+            return
+        
+        try:
+            async for event in agent.astream_complete(research_req.query, research_text=research_text):
+                if event["event"] == "complete":
+                    report = await cache_report(research_req.query, event["report"], research_was_cached=research_text is not None)
+                    event = {"event": "complete", "report": {**report, "usage": usage}}
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+    
+    return admitted_stream(events(), ticket)
+
+@app.post("/jobs", status_code=202)
+@limiter.limit("5/minute")
+async def submit_job_endpoint(
+    request: Request,
+    research_req: ResearchRequest,
+    api_key_info: dict = Depends(verify_api_key)
+):
+    """Queue a complete report and return immediately; poll GET /jobs/{job_id} for the result"""
+    log_request("/jobs", api_key_info, research_req.query)
+    
+    job, deduplicated = await job_queue.submit(research_req.query)
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "deduplicated": deduplicated,
+        "poll_url": f"/jobs/{job['job_id']}",
+        "usage": f"{api_key_info['usage']}/{api_key_info['limit']}"
+    }
+
+@app.get("/jobs/{job_id}")
+@limiter.limit("60/minute")
+def get_job_endpoint(request: Request, job_id: str):
+    """Job status, and the report once done (public: job ids are unguessable, polling doesn't use quota)"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/metrics")
+async def metrics():
+    """Latency histograms and counters in the Prometheus text exposition format"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
 @app.get("/stats")
 def stats_endpoint():
     """Get API statistics (public endpoint)"""
     return {
         "cache_stats": get_cache_stats(),
+        "search_cache_stats": get_search_cache_stats(),
+        "page_fetch_stats": get_page_cache_stats(),
+        "job_queue_stats": job_queue.get_stats(),
+        "admission_stats": admission.get_stats(),
+        "llm_quota_stats": scheduler.get_stats(),
+        "llm_client_stats": llm_client_stats(),
         "rate_limits": {
             "research": "10 requests/minute",
             "summarize": "20 requests/minute",
             "verify": "15 requests/minute",
-            "complete": "5 requests/minute"
+            "complete": "5 requests/minute",
+            "research_batch": "2 requests/minute",
+            "complete_stream": "5 requests/minute",
+            "jobs": "5 requests/minute",
+            "job_status": "60 requests/minute"
         }
     }
 
+def llm_client_stats() -> dict:
+    """Client registry stats, without loading langchain if no agent has been built yet"""
+    if orchestrator is None:
+        return {"clients_created": 0, "agents_loaded": False}
+    from agents.llm_clients import get_client_stats
+    return {**get_client_stats(), "agents_loaded": True}
+
 @app.delete("/cache")
 def clear_cache_endpoint(api_key_info: dict = Depends(verify_api_key)):
     """Clear cache (protected endpoint)"""
+    clear_search_cache()
     return clear_cache()
 
 @app.get("/health")
@@ -195,20 +540,11 @@ def health_check(request: Request):
     return {
         "status": "healthy",
         "version": "3.0.0",
-        "features": ["auth", "rate_limiting", "caching"]
+        "features": ["auth", "rate_limiting", "caching"],
+        "agents_loaded": orchestrator is not None
     }
 
 if __name__ == "__main__":
     import uvicorn
-    import os
-port = int(os.getenv("PORT", 8000))
-uvicorn.run(app, host="0.0.0.0", port=port)
-app = FastAPI(
-    docs_url="/docs" if os.getenv("ENVIRONMENT") == "dev" else None,
-    redoc_url="/redoc" if os.getenv("ENVIRONMENT") == "dev" else None
-)
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
-
-
+    port = int(os.getenv("PORT", 8000))
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -3,18 +3,57 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
+import math
+import time
+
+# Registers the counterstore:// storage scheme with `limits`
+import counter_store  # noqa: F401
 
 # Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
+# Per-IP sliding-window limits kept in the shared counter store, so the
+# limits hold across workers (COUNTER_BACKEND=sqlite or redis)
+limiter = Limiter(
+    key_func=get_remote_address,
+    strategy="sliding-window-counter",
+    storage_uri="counterstore://"
+)
+
+def check_rate_limit(request: Request):
+    """
+    Enforce the route's @limiter.limit before the endpoint runs (app-wide dependency)
+    
+    slowapi checks async endpoints inline on the event loop, and with a shared
+    counter store every check is a SQLite transaction or a Redis round trip.
+    As a plain-function dependency the check runs in the threadpool instead;
+    slowapi's wrapper then sees the request as already checked and skips it.
+    
+    slowapi has no public way to run the check by itself, so this calls its
+    internal Limiter._check_request_limit; requirements.txt pins slowapi to
+    the version this was written against, and tests/test_api.py covers it.
+    """
+    if not limiter.enabled or getattr(request.state, "_rate_limiting_complete", False):
+        return
+    endpoint = request.scope.get("endpoint")
+    if endpoint is not None:
+        limiter._check_request_limit(request, endpoint, False)
+        request.state._rate_limiting_complete = True
+
+def retry_after(request: Request) -> int:
+    """Seconds until the limit the request hit lets it through again"""
+    limit, args = request.state.view_rate_limit
+    reset_at, _ = limiter.limiter.get_window_stats(limit, *args)
+    return max(1, math.ceil(reset_at - time.time()))
 
 # Custom rate limit handler
 def rate_limit_handler(request: Request, exc: RateLimitExceeded) -> Response:
-    """Custom response for rate limit exceeded"""
+    """Custom response for rate limit exceeded, with a Retry-After header"""
+    seconds = retry_after(request)
     return JSONResponse(
         status_code=429,
         content={
             "error": "Rate limit exceeded",
-            "message": f"Too many requests. Try again in {exc.detail} seconds.",
-            "retry_after": exc.detail
-        }
+            "message": f"Too many requests (limit {exc.detail}). Try again in {seconds} seconds.",
+            "retry_after": seconds
+        },
+        headers={"Retry-After": str(seconds)}
     )
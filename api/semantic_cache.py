@@ -0,0 +1,156 @@
+"""
+Near-duplicate query matching for the response cache
+
+The index lives in each worker process while cached values may live in a
+shared backend (sqlite or redis): a worker matches entries cached before
+it started (cache_manager.rebuild_semantic_index, run at API startup) and
+entries it cached itself since, but not entries other workers cache after
+it started. Exact-key hits are shared by every worker as usual.
+"""
+from collections import OrderedDict
+import math
+import re
+import threading
+
+# General English function words (articles, pronouns, auxiliaries,
+# prepositions, question words); content words are never dropped
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "in", "on", "at", "to", "for", "with", "by",
+    "from", "about", "as", "into", "is", "are", "was", "were", "be", "been", "being", "do",
+    "does", "did", "what", "which", "who", "whom", "how", "why", "when", "where", "they",
+    "them", "their", "it", "its", "this", "that", "these", "those", "can", "could", "should",
+    "would", "will", "me", "i", "you", "we"
+}
+
+
+# Follow-up framing that only refers back to the question's subject
+# ("what are AI agents and how do they work"), so it adds no topic of its
+# own. A "work" that names the subject ("how does photosynthesis work") is kept.
+FRAMING = re.compile(
+    r"\b(?:and\s+)?(?:how|why)\s+(?:do|does|did)\s+(?:it|they|this|that|these|those)\s+(?:work|matter)s?\b"
+)
+
+
+def tokenize(text: str) -> list:
+    """Lowercase content words with a light plural stem"""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", FRAMING.sub(" ", text.lower())):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _numbers(terms: dict) -> set:
+    """Terms containing a digit"""
+    return {term for term in terms if any(ch.isdigit() for ch in term)}
+
+
+class SemanticIndex:
+    """
+    TF-IDF index of cached queries for near-duplicate lookup
+    
+    An inverted index limits scoring to queries that share at least one
+    term, so lookups stay cheap as the index grows. Entries are evicted
+    oldest-first past `maxsize`.
+    
+    Queries whose numbers differ (years, versions, quantities) never match,
+    however similar the rest: "GDP 2024" and "GDP 2025" are different questions.
+    """
+    
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # entry_id -> (namespace, query, cache_key, term counts)
+        self._postings = {}            # term -> set of entry_ids
+        self._lock = threading.Lock()
+    
+    def add(self, namespace: str, query: str, cache_key: str):
+        """Index a cached query"""
+        terms = self._term_counts(query)
+        if not terms:
+            return
+        
+        entry_id = f"{namespace}:{cache_key}"
+        with self._lock:
+            self._remove(entry_id)
+            self._entries[entry_id] = (namespace, query, cache_key, terms)
+            for term in terms:
+                self._postings.setdefault(term, set()).add(entry_id)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+    
+    def discard(self, namespace: str, cache_key: str):
+        """Forget an entry whose cached value is gone"""
+        with self._lock:
+            self._remove(f"{namespace}:{cache_key}")
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+    
+    def find(self, namespace: str, query: str, threshold: float):
+        """
+        Find the most similar cached query in a namespace
+        
+        Returns:
+            (cache_key, matched_query, similarity), or None below threshold
+        """
+        terms = self._term_counts(query)
+        if not terms:
+            return None
+        
+        with self._lock:
+            candidates = set()
+            for term in terms:
+                candidates |= self._postings.get(term, set())
+            
+            query_vector = self._vector(terms)
+            query_numbers = _numbers(terms)
+            best = None
+            for entry_id in candidates:
+                entry_namespace, entry_query, cache_key, entry_terms = self._entries[entry_id]
+                if entry_namespace != namespace or _numbers(entry_terms) != query_numbers:
+                    continue
+                similarity = self._cosine(query_vector, self._vector(entry_terms))
+                if best is None or similarity > best[2]:
+                    best = (cache_key, entry_query, similarity)
+        
+        if best is None or best[2] < threshold:
+            return None
+        return best
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for term in entry[3]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.discard(entry_id)
+                if not postings:
+                    del self._postings[term]
+    
+    def _term_counts(self, text: str) -> dict:
+        counts = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        return counts
+    
+    def _vector(self, terms: dict) -> dict:
+        """TF-IDF weights (smoothed IDF over the indexed queries)"""
+        n = len(self._entries)
+        return {
+            term: count * (math.log((1 + n) / (1 + len(self._postings.get(term, ())))) + 1)
+            for term, count in terms.items()
+        }
+    
+    def _cosine(self, a: dict, b: dict) -> float:
+        dot = sum(weight * b.get(term, 0.0) for term, weight in a.items())
+        norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+        return dot / norm if norm else 0.0
@@ -0,0 +1,192 @@
+"""
+Fixed evaluation set for research-context compression
+
+For every claim in the set, checks that the passages compression keeps
+still contain the sentences needed to verify it (evidence recall), and
+reports how many context tokens are saved for the claim-extraction and
+per-claim/batched verification prompts.
+
+Usage:
+    python benchmarks/context_eval.py [--claim-tokens N] [--max-tokens N] [--live]
+
+--live also runs FactCheckerAgent on the set with compression on and off
+and compares verification statuses against the gold labels (requires
+GOOGLE_API_KEY and makes real LLM calls).
+
+Exits with status 1 if evidence recall is below 100%.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.context_compression import ContextCompressor
+from agents.llm_utils import LLMCallMetrics, estimate_tokens
+
+QUANTUM_RESEARCH = """## Quantum Computing in 2025
+
+Quantum computing moved from laboratory demonstrations toward early commercial use in 2025 [1]. Several hardware vendors published roadmaps that target fault-tolerant machines before 2030 [2].
+
+### Hardware progress
+
+IBM unveiled its Heron r2 processor with 156 qubits and reported a twofold reduction in two-qubit gate errors compared with the previous generation [1]. Google's Willow chip, announced in December 2024, demonstrated that adding more physical qubits to a surface code lowered the logical error rate, a milestone known as operating below threshold [3]. Quantinuum's H2 trapped-ion system reached 56 fully connected qubits with two-qubit gate fidelity above 99.9% [4]. Neutral-atom companies such as QuEra and Atom Computing scaled arrays past 1,000 atoms, although gate fidelities remain lower than trapped ions [5].
+
+### Error correction
+
+Error correction is the central challenge. Physical qubits lose their state within microseconds to milliseconds, so logical qubits must be encoded across many physical qubits [3]. Microsoft and Quantinuum jointly reported 12 logical qubits with error rates 800 times lower than the underlying physical qubits [4]. Quantum computing moved from laboratory demonstrations toward early commercial use in 2025 [1].
+
+### Applications
+
+- Chemistry: pharmaceutical companies are testing quantum simulations of catalyst molecules, but no simulation has yet outperformed classical methods on a commercially relevant problem [6].
+- Optimization: logistics firms run pilot projects on quantum annealers from D-Wave, whose Advantage2 system has more than 4,400 qubits [7].
+- Cryptography: NIST finalized its first three post-quantum cryptography standards in August 2024, including ML-KEM for key encapsulation [8].
+
+### Investment
+
+Private investment in quantum startups exceeded $1.5 billion in 2024 [9]. Governments also increased funding; the United States National Quantum Initiative was reauthorized with expanded research budgets [9]. Error correction is the central challenge.
+
+### Outlook
+
+Most experts expect useful quantum advantage for specific scientific problems within five to ten years, while breaking RSA-2048 is considered at least a decade away [2]. Several hardware vendors published roadmaps that target fault-tolerant machines before 2030 [2]. Quantum computing moved from laboratory demonstrations toward early commercial use in 2025 [1].
+"""
+
+AGENTS_RESEARCH = """AI agents are software systems that use a large language model to plan and carry out multi-step tasks by calling external tools such as search engines, code interpreters and APIs [1].
+
+**How they work**
+
+An agent typically runs a loop: the model reads the goal and the current state, decides on an action, calls a tool, observes the result and repeats until the task is done [2]. Frameworks such as LangChain, LlamaIndex and Microsoft AutoGen provide building blocks for tool calling, memory and multi-agent coordination [3]. The ReAct prompting pattern, introduced in a 2022 paper, interleaves reasoning traces with actions and remains a common design [2].
+
+**Adoption in 2025**
+
+Enterprise adoption accelerated in 2025. Salesforce launched Agentforce to automate customer service workflows [4]. Google introduced Vertex AI Agent Builder for building agents on its cloud platform [5]. IBM released BeeAI as an open-source platform for discovering and running agents [6]. A Gartner survey found that 15% of day-to-day work decisions could be made autonomously by agentic AI by 2028, up from 0% in 2024 [7]. Enterprise adoption accelerated in 2025.
+
+**Limitations**
+
+Agents still make compounding errors over long tasks because a mistake in an early step propagates to later steps [8]. Evaluations such as SWE-bench show that the best agents resolve roughly half of real GitHub issues in the verified subset [9]. Security researchers warn that prompt injection through tool outputs can cause agents to take unintended actions [10]. Costs can also grow quickly, since each step of the loop is a separate model call [8].
+
+**Multi-agent systems**
+
+Some systems split work across specialized agents, for example a researcher, a summarizer and a fact checker coordinated by an orchestrator [3]. This division makes each prompt simpler but adds coordination overhead and latency [3]. Agents still make compounding errors over long tasks because a mistake in an early step propagates to later steps [8].
+
+**Conclusion**
+
+AI agents are moving from demos to production, led by enterprise software vendors, but reliability, security and cost remain open problems [1]. Enterprise adoption accelerated in 2025.
+"""
+
+# (research text, claim, sentences the claim needs as evidence, gold status)
+EVAL_SET = [
+    (QUANTUM_RESEARCH, "IBM's Heron r2 processor has 156 qubits.",
+     ["Heron r2 processor with 156 qubits"], "SUPPORTED"),
+    (QUANTUM_RESEARCH, "Google's Willow chip operated below the error-correction threshold.",
+     ["Willow chip", "operating below threshold"], "SUPPORTED"),
+    (QUANTUM_RESEARCH, "Quantinuum's H2 system has 56 qubits with two-qubit fidelity above 99.9%.",
+     ["56 fully connected qubits with two-qubit gate fidelity above 99.9%"], "SUPPORTED"),
+    (QUANTUM_RESEARCH, "Microsoft and Quantinuum demonstrated 12 logical qubits.",
+     ["12 logical qubits with error rates 800 times lower"], "SUPPORTED"),
+    (QUANTUM_RESEARCH, "Quantum chemistry simulations have already beaten classical methods on commercial problems.",
+     ["no simulation has yet outperformed classical methods"], "UNSUPPORTED"),
+    (QUANTUM_RESEARCH, "NIST finalized post-quantum cryptography standards in August 2024.",
+     ["NIST finalized its first three post-quantum cryptography standards in August 2024"], "SUPPORTED"),
+    (QUANTUM_RESEARCH, "Private investment in quantum startups exceeded $1.5 billion in 2024.",
+     ["exceeded $1.5 billion in 2024"], "SUPPORTED"),
+    (QUANTUM_RESEARCH, "Breaking RSA-2048 with a quantum computer is expected within two years.",
+     ["breaking RSA-2048 is considered at least a decade away"], "UNSUPPORTED"),
+    (QUANTUM_RESEARCH, "D-Wave's Advantage2 system has more than 4,400 qubits.",
+     ["Advantage2 system has more than 4,400 qubits"], "SUPPORTED"),
+    (AGENTS_RESEARCH, "Salesforce launched Agentforce to automate customer service.",
+     ["Salesforce launched Agentforce"], "SUPPORTED"),
+    (AGENTS_RESEARCH, "The ReAct pattern was introduced in a 2022 paper.",
+     ["introduced in a 2022 paper"], "SUPPORTED"),
+    (AGENTS_RESEARCH, "Gartner predicts 15% of day-to-day work decisions will be made by agentic AI by 2028.",
+     ["15% of day-to-day work decisions could be made autonomously by agentic AI by 2028"], "SUPPORTED"),
+    (AGENTS_RESEARCH, "The best agents resolve nearly all real GitHub issues on SWE-bench Verified.",
+     ["resolve roughly half of real GitHub issues"], "UNSUPPORTED"),
+    (AGENTS_RESEARCH, "Prompt injection through tool outputs is a security risk for agents.",
+     ["prompt injection through tool outputs"], "SUPPORTED"),
+    (AGENTS_RESEARCH, "IBM released BeeAI as an open-source agent platform.",
+     ["IBM released BeeAI"], "SUPPORTED"),
+    (AGENTS_RESEARCH, "Multi-agent systems reduce coordination overhead and latency.",
+     ["adds coordination overhead and latency"], "UNSUPPORTED"),
+]
+
+
+def contains(context: str, evidence: str) -> bool:
+    return evidence.lower() in context.lower()
+
+
+def evaluate(compressor: ContextCompressor) -> dict:
+    metrics = LLMCallMetrics()
+    hits = 0
+    misses = []
+    for research_text, claim, evidence, _ in EVAL_SET:
+        context = compressor.claim_context(research_text, claim)
+        metrics.record_context(research_text, context)
+        if all(contains(context, e) for e in evidence):
+            hits += 1
+        else:
+            misses.append(claim)
+
+    # Batched verification: all of a text's claims in one prompt
+    batch_hits = 0
+    for research_text in (QUANTUM_RESEARCH, AGENTS_RESEARCH):
+        items = [item for item in EVAL_SET if item[0] is research_text]
+        context = compressor.claim_context(research_text, [claim for _, claim, _, _ in items])
+        metrics.record_context(research_text, context)
+        batch_hits += sum(all(contains(context, e) for e in evidence) for _, _, evidence, _ in items)
+
+    extraction_saved = sum(
+        estimate_tokens(text) - estimate_tokens(compressor.document_context(text))
+        for text in (QUANTUM_RESEARCH, AGENTS_RESEARCH)
+    )
+    stats = metrics.as_dict()
+    return {
+        "claims": len(EVAL_SET),
+        "evidence_recall": hits / len(EVAL_SET),
+        "batched_evidence_recall": batch_hits / len(EVAL_SET),
+        "missed_claims": misses,
+        "verification_context_tokens_sent": stats["context_tokens_sent"],
+        "verification_context_tokens_saved": stats["context_tokens_saved"],
+        "extraction_context_tokens_saved": extraction_saved
+    }
+
+
+def live_accuracy(compress: bool) -> float:
+    """Share of claims whose verification status matches the gold label"""
+    from agents.fact_checker import FactCheckerAgent
+
+    agent = FactCheckerAgent()
+    agent.compressor = ContextCompressor(enabled=compress)
+    correct = 0
+    for research_text, claim, _, gold in EVAL_SET:
+        result = agent._verify_claim(claim, research_text, LLMCallMetrics())
+        correct += result["status"] == gold
+    return correct / len(EVAL_SET)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate research-context compression")
+    parser.add_argument("--claim-tokens", type=int, help="Per-claim context budget (default CLAIM_CONTEXT_TOKENS)")
+    parser.add_argument("--max-tokens", type=int, help="Whole-document budget (default CONTEXT_MAX_TOKENS)")
+    parser.add_argument("--live", action="store_true", help="Also compare real verification accuracy")
+    args = parser.parse_args()
+
+    compressor = ContextCompressor(enabled=True, max_tokens=args.max_tokens, claim_tokens=args.claim_tokens)
+    results = evaluate(compressor)
+
+    print(f"\n📏 Context compression eval ({results['claims']} claims, "
+          f"claim budget {compressor.claim_chars // 4} tokens, document budget {compressor.max_chars // 4} tokens)\n")
+    print(f"Evidence recall (per claim):  {results['evidence_recall']:.0%}")
+    print(f"Evidence recall (batched):    {results['batched_evidence_recall']:.0%}")
+    print(f"Verification tokens sent:     {results['verification_context_tokens_sent']}")
+    print(f"Verification tokens saved:    {results['verification_context_tokens_saved']}")
+    print(f"Extraction tokens saved:      {results['extraction_context_tokens_saved']}")
+    for claim in results["missed_claims"]:
+        print(f"  ❌ evidence dropped for: {claim}")
+
+    if args.live:
+        uncompressed = live_accuracy(compress=False)
+        compressed = live_accuracy(compress=True)
+        print(f"\nVerification accuracy: {uncompressed:.0%} uncompressed, {compressed:.0%} compressed")
+
+    if results["evidence_recall"] < 1 or results["batched_evidence_recall"] < 1:
+        sys.exit(1)
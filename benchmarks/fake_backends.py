@@ -0,0 +1,247 @@
+"""
+Offline stand-ins for Gemini and DuckDuckGo used by the benchmarks
+
+FakeChatModel answers each agent prompt with a well-formed response of
+realistic size after a sampled delay, and fails a configurable share of
+calls with the 429/503 errors the real API returns. fake_search replaces
+the DuckDuckGo request behind tools.web_search, so the search cache still
+runs as it does in production.
+
+Call install() before the first LLM call; the shared client registry
+builds its clients through langchain_google_genai.ChatGoogleGenerativeAI.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+_FACTS = [
+    "Adoption grew by {n}% year over year according to industry surveys [{s}].",
+    "Researchers reported a {n}-fold improvement over the previous generation [{s}].",
+    "Several vendors announced commercial products aimed at enterprise customers [{s}].",
+    "Costs fell to about ${n} per unit as production scaled [{s}].",
+    "Analysts expect the market to reach ${n} billion within five years [{s}].",
+    "Critics point out that reliability and security remain open problems [{s}].",
+    "Regulators in the EU and US published draft guidance on the technology [{s}].",
+    "Open-source projects now account for {n}% of published benchmarks [{s}].",
+]
+
+
+class LatencyModel:
+    """
+    Log-normal latency with a given median and 95th percentile, plus an error rate
+    
+    Log-normal matches the long right tail of real API latencies. The 95th
+    percentile defaults to 2.5x the median.
+    """
+    
+    def __init__(self, median: float, p95: float = None, error_rate: float = 0.0, seed: int = None):
+        self.median = median
+        p95 = max(p95 or median * 2.5, median)
+        self.sigma = math.log(p95 / median) / 1.645 if median > 0 else 0.0
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def sample(self) -> tuple:
+        """(delay in seconds, whether this call fails)"""
+        with self._lock:
+            if self.median <= 0:
+                delay = 0.0
+            else:
+                delay = self.median * math.exp(self.random.gauss(0, self.sigma))
+            return delay, self.random.random() < self.error_rate
+
+
+class FakeAPIError(Exception):
+    """Raised for injected failures; carries an HTTP-style code like the Google client errors"""
+    
+    def __init__(self, code: int):
+        self.code = code
+        reason = "RESOURCE_EXHAUSTED: quota exceeded" if code == 429 else "UNAVAILABLE: model overloaded"
+        super().__init__(f"{code} {reason} (injected by benchmark)")
+
+
+def _prompt_text(input) -> str:
+    if hasattr(input, "to_string"):
+        return input.to_string()
+    if isinstance(input, list):
+        return "\n".join(getattr(m, "content", str(m)) for m in input)
+    return str(input)
+
+
+def prompt_kind(text: str) -> str:
+    """Which agent prompt this is, from its fixed wording"""
+    if "Search Results:" in text:
+        return "research"
+    if "Extract all factual claims" in text:
+        return "extract_claims"
+    if "Verify each numbered claim" in text:
+        return "verify_batch"
+    if "Verify this claim" in text:
+        return "verify_claim"
+    if "in four formats at once" in text:
+        return "summarize_all"
+    return "summarize"
+
+
+class FakeBackendStats:
+    """Call, error and token counters shared by all fake clients"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.llm_calls = 0
+            self.llm_errors = 0
+            self.by_kind = {}
+            self.by_model = {}
+            self.input_tokens = 0
+            self.output_tokens = 0
+            self.search_calls = 0
+            self.search_errors = 0
+    
+    def record_llm(self, model: str, kind: str, failed: bool, input_tokens: int, output_tokens: int):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_errors += failed
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+            self.by_model[model] = self.by_model.get(model, 0) + 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+    
+    def record_search(self, failed: bool):
+        with self._lock:
+            self.search_calls += 1
+            self.search_errors += failed
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "llm_calls": self.llm_calls,
+                "llm_errors": self.llm_errors,
+                "llm_calls_by_prompt": dict(self.by_kind),
+                "llm_calls_by_model": dict(self.by_model),
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "search_calls": self.search_calls,
+                "search_errors": self.search_errors
+            }
+
+
+stats = FakeBackendStats()
+
+
+class FakeChatModel(Runnable):
+    """Chat model stand-in that answers the agents' prompts offline"""
+    
+    def __init__(self, model: str, latency: LatencyModel, research_sentences: int = 12, claims: int = 8):
+        self.model = model
+        self.latency = latency
+        self.research_sentences = research_sentences
+        self.claims = claims
+    
+    def invoke(self, input, config=None, **kwargs):
+        delay, failed = self.latency.sample()
+        time.sleep(delay)
+        return self._respond(input, failed)
+    
+    async def ainvoke(self, input, config=None, **kwargs):
+        delay, failed = self.latency.sample()
+        await asyncio.sleep(delay)
+        return self._respond(input, failed)
+    
+    def _respond(self, input, failed: bool) -> AIMessage:
+        text = _prompt_text(input)
+        kind = prompt_kind(text)
+        input_tokens = len(text) // 4
+        if failed:
+            stats.record_llm(self.model, kind, True, input_tokens, 0)
+            raise FakeAPIError(random.choice((429, 503)))
+        
+        content = self._content(kind, text)
+        output_tokens = len(content) // 4
+        stats.record_llm(self.model, kind, False, input_tokens, output_tokens)
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        })
+    
+    def _content(self, kind: str, text: str) -> str:
+        if kind == "research":
+            question = re.search(r"Question: (.*)", text)
+            topic = question.group(1).strip() if question else "the topic"
+            facts = [
+                _FACTS[i % len(_FACTS)].format(n=10 + 7 * i, s=i % 5 + 1)
+                for i in range(self.research_sentences)
+            ]
+            paragraphs = [" ".join(facts[i:i + 4]) for i in range(0, len(facts), 4)]
+            return f"## {topic}\n\n" + "\n\n".join(paragraphs)
+        if kind == "extract_claims":
+            return "\n".join(
+                f"{i + 1}. " + _FACTS[i % len(_FACTS)].format(n=10 + 7 * i, s=i % 5 + 1)
+                for i in range(self.claims)
+            )
+        if kind == "verify_batch":
+            claims = text.split("Claims:")[-1].split("Research Context")[0]
+            count = len(re.findall(r"^\d+\. ", claims, re.M))
+            return json.dumps([
+                {"id": i + 1, "status": "SUPPORTED", "confidence": 85,
+                 "evidence": "Stated in the research.", "concerns": "None"}
+                for i in range(count)
+            ])
+        if kind == "verify_claim":
+            return ("1. Verification status: SUPPORTED\n2. Confidence score: 85%\n"
+                    "3. Evidence: Stated in the research.\n4. Concerns: None")
+        if kind == "summarize_all":
+            return json.dumps({
+                "brief": "The research finds steady progress with open reliability questions.",
+                "detailed": " ".join(_FACTS[:4]).format(n=20, s=1),
+                "key_points": ["Adoption is growing.", "Costs are falling.", "Reliability is still an issue."],
+                "executive": "Progress is real but uneven; pilot before committing to large deployments."
+            })
+        return "The research describes steady progress, falling costs and open reliability questions. " * 2
+
+
+def fake_search(latency: LatencyModel):
+    """A stand-in for the DuckDuckGo request behind tools.web_search (raises on injected errors)"""
+    def fetch(query: str, max_results: int) -> list:
+        delay, failed = latency.sample()
+        time.sleep(delay)
+        stats.record_search(failed)
+        if failed:
+            raise FakeAPIError(503)
+        return [
+            {
+                "title": f"Result {i + 1} for {query}",
+                "url": f"https://example.com/{i + 1}",
+                "snippet": _FACTS[i % len(_FACTS)].format(n=10 + i, s=i + 1)
+            }
+            for i in range(max_results)
+        ]
+    return fetch
+
+
+def install(llm_latency: LatencyModel, search_latency: LatencyModel, patch=setattr):
+    """
+    Route every Gemini client and web search in this process to the fakes
+    
+    Args:
+        patch: Called as patch(module, name, fake) for each replacement;
+               tests pass monkeypatch.setattr so the patches are undone
+    """
+    import langchain_google_genai
+    from tools import web_search
+    
+    patch(langchain_google_genai, "ChatGoogleGenerativeAI",
+          lambda model, **kwargs: FakeChatModel(model, llm_latency))
+    patch(web_search, "_fetch", fake_search(search_latency))
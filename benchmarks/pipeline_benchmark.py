@@ -0,0 +1,260 @@
+"""
+Offline load benchmark for the agent pipeline and API
+
+Replaces Gemini and DuckDuckGo with the latency-injected fakes in
+fake_backends.py, then drives each scenario with a fixed number of
+requests at a fixed concurrency and reports throughput, p50/p95/p99
+latency, LLM calls and retries. Needs no network or API key, so results
+are comparable across machines and commits.
+
+Scenarios:
+    research        agents.researcher.aresearch
+    summarize       SummarizerAgent.asummarize_all
+    fact_check      FactCheckerAgent.averify_claims
+    complete        OrchestratorAgent.aresearch_complete
+    api_research    POST /research
+    api_summarize   POST /summarize
+    api_verify      POST /verify
+    api_complete    POST /complete
+
+Usage:
+    python benchmarks/pipeline_benchmark.py [--scenarios research,complete]
+        [--requests 20] [--concurrency 4] [--llm-latency 0.8] [--llm-p95 2.0]
+        [--llm-error-rate 0.0] [--search-latency 0.4] [--search-p95 1.0]
+        [--search-error-rate 0.0]
+        [--rpm N] [--seed 1] [--json]
+
+LLM_RPM defaults to 100000 here so results measure the code rather than the
+quota; pass --rpm to include the scheduler's rate limiting. Injected errors
+are retried with the scheduler's usual backoff (see LLM_BACKOFF_BASE).
+Agent and API log events are suppressed during runs.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, "api")
+sys.path.append(ROOT)
+
+import fake_backends
+from fake_backends import LatencyModel
+
+SCENARIOS = ("research", "summarize", "fact_check", "complete",
+             "api_research", "api_summarize", "api_verify", "api_complete")
+
+BENCHMARK_API_KEY = "benchmark_key"
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of values (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def research_text(index: int) -> str:
+    """A research answer like the fake LLM's, unique per request so nothing is cached"""
+    model = fake_backends.FakeChatModel("benchmark", LatencyModel(0))
+    return model._content("research", f"Question: benchmark topic {index}") + f"\n\nReport {index}."
+
+
+def scheduler_retries() -> int:
+    from agents.llm_scheduler import scheduler
+    return sum(model["retries"] for model in scheduler.get_stats().values())
+
+
+class AgentTargets:
+    """Request functions for the agent-level scenarios; each returns True on success"""
+    
+    def __init__(self, run_id: str):
+        from agents.fact_checker import FactCheckerAgent
+        from agents.orchestrator import OrchestratorAgent
+        from agents.summarizer import SummarizerAgent
+        
+        self.run_id = run_id
+        self.summarizer = SummarizerAgent()
+        self.fact_checker = FactCheckerAgent()
+        self.orchestrator = OrchestratorAgent()
+    
+    async def research(self, index: int) -> bool:
+        from agents.researcher import aresearch
+        result = await aresearch(f"research question {self.run_id}-{index}")
+        return not result.startswith(("Research error:", "No search results"))
+    
+    async def summarize(self, index: int) -> bool:
+        results = await self.summarizer.asummarize_all(research_text(index))
+        return all("summary" in result for result in results.values())
+    
+    async def fact_check(self, index: int) -> bool:
+        report = await self.fact_checker.averify_claims(research_text(index))
+        return report.get("total_claims_checked", 0) > 0 and not report.get("failed_claims")
+    
+    async def complete(self, index: int) -> bool:
+        report = await self.orchestrator.aresearch_complete(f"complete question {self.run_id}-{index}")
+        return not report.get("errors")
+
+
+class APITargets:
+    """Request functions for the API scenarios, sent in-process over ASGI"""
+    
+    def __init__(self, run_id: str):
+        import httpx
+        
+        sys.path.insert(0, API_DIR)
+        os.chdir(API_DIR)  # main.py mounts static/ relative to the working directory
+        import auth
+        import main
+        
+        self.run_id = run_id
+        # Benchmark traffic skips the per-IP rate limits and per-key usage caps
+        main.limiter.enabled = False
+        auth.VALID_API_KEYS[BENCHMARK_API_KEY] = {"name": "Benchmark", "usage_limit": 10 ** 9}
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app), base_url="http://benchmark",
+            headers={"X-API-Key": BENCHMARK_API_KEY}, timeout=None
+        )
+    
+    async def _post(self, path: str, body: dict) -> bool:
+        response = await self.client.post(path, json=body)
+        return response.status_code == 200 and response.json().get("status") != "error"
+    
+    async def api_research(self, index: int) -> bool:
+        return await self._post("/research", {"query": f"api research {self.run_id}-{index}"})
+    
+    async def api_summarize(self, index: int) -> bool:
+        return await self._post("/summarize", {"text": research_text(index), "summary_type": "all"})
+    
+    async def api_verify(self, index: int) -> bool:
+        return await self._post("/verify", {"text": research_text(index)})
+    
+    async def api_complete(self, index: int) -> bool:
+        return await self._post("/complete", {"query": f"api complete {self.run_id}-{index}"})
+
+
+async def run_scenario(request, requests: int, concurrency: int) -> dict:
+    """Send `requests` requests, at most `concurrency` at once, and summarize them"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    
+    async def one(index: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await request(index)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+    
+    fake_backends.stats.reset()
+    retries_before = scheduler_retries()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+    backend = fake_backends.stats.snapshot()
+    
+    return {
+        "requests": requests,
+        "errors": errors,
+        "wall_time": round(wall, 3),
+        "throughput_rps": round(requests / wall, 2) if wall else 0.0,
+        "p50": round(percentile(latencies, 50), 3),
+        "p95": round(percentile(latencies, 95), 3),
+        "p99": round(percentile(latencies, 99), 3),
+        "llm_calls": backend["llm_calls"],
+        "llm_calls_per_request": round(backend["llm_calls"] / requests, 2),
+        "llm_errors_injected": backend["llm_errors"],
+        "llm_retries": scheduler_retries() - retries_before,
+        "llm_calls_by_prompt": backend["llm_calls_by_prompt"],
+        "input_tokens": backend["input_tokens"],
+        "output_tokens": backend["output_tokens"],
+        "search_calls": backend["search_calls"]
+    }
+
+
+async def run(args) -> dict:
+    # Per-call agent and request log events would swamp the report (and the API log file)
+    for name in ("agents", "tools", "API"):
+        logging.getLogger(name).setLevel(logging.CRITICAL)
+    run_id = str(int(time.time()))
+    agent_targets = None
+    api_targets = None
+    results = {}
+    
+    for name in args.scenarios:
+        if name.startswith("api_"):
+            api_targets = api_targets or APITargets(run_id)
+            request = getattr(api_targets, name)
+        else:
+            agent_targets = agent_targets or AgentTargets(run_id)
+            request = getattr(agent_targets, name)
+        results[name] = await run_scenario(request, args.requests, args.concurrency)
+        print(f"  {name} done in {results[name]['wall_time']:.2f}s", file=sys.stderr)
+    
+    if api_targets:
+        await api_targets.client.aclose()
+    return results
+
+
+def print_table(results: dict, args):
+    print(f"\n🏁 Pipeline benchmark: {args.requests} requests per scenario, concurrency {args.concurrency}")
+    print(f"   LLM {args.llm_latency}s median / {args.llm_p95 or args.llm_latency * 2.5:g}s p95, "
+          f"{args.llm_error_rate:.0%} errors; "
+          f"search {args.search_latency}s median, {args.search_error_rate:.0%} errors\n")
+    header = f"{'scenario':<15}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}{'LLM/req':>9}{'retries':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<15}{r['throughput_rps']:>8.2f}{r['p50']:>8.2f}s{r['p95']:>8.2f}s{r['p99']:>8.2f}s"
+              f"{r['errors']:>8}{r['llm_calls_per_request']:>9.2f}{r['llm_retries']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load benchmark for the agents and API")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario (default 20)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once (default 4)")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Median LLM latency in seconds")
+    parser.add_argument("--llm-p95", type=float, help="95th percentile LLM latency (default 2.5x median)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of LLM calls failing with 429/503")
+    parser.add_argument("--search-latency", type=float, default=0.4, help="Median search latency in seconds")
+    parser.add_argument("--search-p95", type=float, help="95th percentile search latency (default 2.5x median)")
+    parser.add_argument("--search-error-rate", type=float, default=0.0, help="Share of searches failing")
+    parser.add_argument("--rpm", type=float, help="Per-model LLM rate limit (default: effectively unlimited)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for latencies and errors")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+    
+    # Must be set before the scheduler and API modules are imported
+    os.environ["LLM_RPM"] = str(args.rpm) if args.rpm else os.getenv("LLM_RPM", "100000")
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("SEMANTIC_CACHE", "off")
+    os.environ.setdefault("JOB_DB_PATH", os.path.join(tempfile.mkdtemp(), "jobs.db"))
+    
+    fake_backends.install(
+        llm_latency=LatencyModel(args.llm_latency, args.llm_p95, args.llm_error_rate, seed=args.seed),
+        search_latency=LatencyModel(args.search_latency, args.search_p95, args.search_error_rate, seed=args.seed + 1)
+    )
+    results = asyncio.run(run(args))
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, args)
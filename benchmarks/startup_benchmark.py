@@ -0,0 +1,112 @@
+"""
+Cold-start benchmark for the API
+
+Starts the app in fresh Python processes and reports how long it takes to
+import api/main.py, answer the first /health request, build the agents on
+first use and serve the first /stats request.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [--warmup] [--json]
+        [--max-import SECONDS] [--max-first-request SECONDS]
+
+Exits with status 1 if a median exceeds a --max-* threshold, so it can
+guard against cold-start regressions in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+
+# Runs inside a fresh interpreter; prints one JSON line of timings
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, ".")
+timings = {}
+
+start = time.perf_counter()
+import main
+timings["import"] = time.perf_counter() - start
+
+from fastapi.testclient import TestClient
+start = time.perf_counter()
+with TestClient(main.app) as client:
+    client.get("/health")
+    timings["first_health"] = time.perf_counter() - start
+    
+    if main.WARMUP_AGENTS:
+        start = time.perf_counter()
+        while not main.app.state.warm_up.done():
+            time.sleep(0.01)
+        timings["warm_up"] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    main.get_orchestrator()
+    timings["agent_init"] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    client.get("/stats")
+    timings["first_stats"] = time.perf_counter() - start
+
+print(json.dumps(timings))
+"""
+
+
+def run_once(warmup: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "WARMUP_AGENTS": "on" if warmup else "off",
+            "JOB_DB_PATH": os.path.join(tmp, "jobs.db"),
+            "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "benchmark"),
+        }
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD], cwd=API_DIR, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs: list) -> dict:
+    return {
+        name: {
+            "median": statistics.median(run[name] for run in runs),
+            "min": min(run[name] for run in runs),
+            "max": max(run[name] for run in runs)
+        }
+        for name in runs[0]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure API cold-start latency")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to start (default 5)")
+    parser.add_argument("--warmup", action="store_true", help="Start with WARMUP_AGENTS=on")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--max-import", type=float, help="Fail if median import time exceeds this (s)")
+    parser.add_argument("--max-first-request", type=float,
+                        help="Fail if median first /health latency exceeds this (s)")
+    args = parser.parse_args()
+    
+    results = summarize([run_once(args.warmup) for _ in range(args.runs)])
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"\n🚀 Startup benchmark ({args.runs} runs, warm-up {'on' if args.warmup else 'off'})\n")
+        print(f"{'stage':<14}{'median':>10}{'min':>10}{'max':>10}")
+        for name, stats in results.items():
+            print(f"{name:<14}{stats['median']:>9.3f}s{stats['min']:>9.3f}s{stats['max']:>9.3f}s")
+    
+    failures = []
+    if args.max_import is not None and results["import"]["median"] > args.max_import:
+        failures.append(f"import {results['import']['median']:.3f}s > {args.max_import}s")
+    if args.max_first_request is not None and results["first_health"]["median"] > args.max_first_request:
+        failures.append(f"first /health {results['first_health']['median']:.3f}s > {args.max_first_request}s")
+    if failures:
+        print(f"\n❌ Regression: {'; '.join(failures)}")
+        sys.exit(1)
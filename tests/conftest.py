@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+# API modules import each other by bare name (run from api/), agents and tools from the root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+
+@pytest.fixture(scope="session")
+def api_main(tmp_path_factory):
+    """api/main.py, imported once with its log and job files in a temp dir"""
+    tmp = tmp_path_factory.mktemp("api")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("LOG_FILE", str(tmp / "api.log"))
+        patch.setenv("JOB_DB_PATH", str(tmp / "jobs.db"))
+        # StaticFiles resolves its directory when the app is built
+        patch.chdir(os.path.join(ROOT, "api"))
+        import main
+    return main
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Gemini and DuckDuckGo replaced by the offline fakes, without LLM rate limits
+    
+    Everything is patched with monkeypatch, and the clients, rate limiters
+    and search results created meanwhile are dropped, so nothing leaks
+    into later tests.
+    """
+    from agents.llm_clients import registry
+    from agents.llm_scheduler import scheduler
+    from benchmarks import fake_backends
+    from tools.web_search import clear_search_cache
+    
+    latency = fake_backends.LatencyModel(0.001)
+    fake_backends.install(latency, latency, patch=monkeypatch.setattr)
+    monkeypatch.setattr(registry, "_clients", {})
+    # The scheduler read LLM_RPM when it was imported; lift the limit directly
+    monkeypatch.setattr(scheduler, "default_rpm", 1_000_000)
+    monkeypatch.setattr(scheduler, "_limiters", {})
+    clear_search_cache()
+    yield
+    clear_search_cache()
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+import admission as admission_module
+from admission import AdmissionController, AdmissionRejected
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_requests_over_budget_queue_in_order():
+    async def scenario():
+        controller = AdmissionController(budget=4, queue_timeout=5, max_queue=10)
+        first = await controller.acquire("complete", 3)
+        large = asyncio.ensure_future(controller.acquire("complete", 3))
+        small = asyncio.ensure_future(controller.acquire("summarize", 1))
+        await asyncio.sleep(0)
+        # The small request fits but waits behind the large one (FIFO)
+        assert not small.done() and controller.queued == 4
+        controller.release(first)
+        await asyncio.gather(large, small)
+        assert controller.in_flight == 4
+        controller.release(large.result())
+        controller.release(small.result())
+        return controller
+    
+    controller = run(scenario())
+    assert (controller.in_flight, controller.queued) == (0, 0)
+
+
+def test_full_queue_is_shed_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(budget=2, queue_timeout=5, max_queue=1)
+        await controller.acquire("complete", 2)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("complete", 2)
+        return rejected.value
+    
+    rejected = run(scenario())
+    assert rejected.status_code == 503
+    assert int(rejected.headers["Retry-After"]) >= 1
+
+
+def test_deadline_sheds_and_frees_the_queue():
+    async def scenario():
+        controller = AdmissionController(budget=1, queue_timeout=0.05, max_queue=5)
+        await controller.acquire("summarize", 1)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("summarize", 1)
+        return controller
+    
+    controller = run(scenario())
+    assert (controller.in_flight, controller.queued, controller.stats["shed_timeout"]) == (1, 0, 1)
+
+
+def test_grant_racing_the_deadline_is_released(monkeypatch):
+    async def wait_for_then_time_out(future, timeout):
+        # wait_for raising TimeoutError after the future was already granted
+        await future
+        raise asyncio.TimeoutError
+    
+    monkeypatch.setattr(admission_module.asyncio, "wait_for", wait_for_then_time_out)
+    
+    async def scenario():
+        controller = AdmissionController(budget=1, queue_timeout=1, max_queue=5)
+        first = await controller.acquire("summarize", 1)
+        waiting = asyncio.ensure_future(controller.acquire("summarize", 1))
+        await asyncio.sleep(0)
+        controller.release(first)
+        with pytest.raises(AdmissionRejected):
+            await waiting
+        return controller
+    
+    controller = run(scenario())
+    assert controller.in_flight == 0
+
+
+def test_costs_are_capped_at_the_budget():
+    async def scenario():
+        controller = AdmissionController(budget=5)
+        ticket = await controller.acquire("complete")
+        return ticket.cost
+    
+    assert run(scenario()) == 5
+
+
+def test_cost_override_wins_over_the_passed_cost(monkeypatch):
+    assert admission_module.endpoint_cost("complete") == admission_module.ENDPOINT_COSTS["complete"]
+    assert admission_module.endpoint_cost("complete", 8) == 8
+    monkeypatch.setenv("ADMISSION_COST_COMPLETE", "15")
+    assert admission_module.endpoint_cost("complete", 8) == 15
@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+from admission import AdmissionRejected
+from counter_store import get_counter_store
+
+API_KEY = "test_key"
+
+
+@pytest.fixture
+def client(api_main, monkeypatch):
+    monkeypatch.setitem(auth.VALID_API_KEYS, API_KEY, {"name": "Test", "usage_limit": 100})
+    get_counter_store().reset()
+    api_main.clear_cache()
+    return TestClient(api_main.app)
+
+
+def usage():
+    return get_counter_store().get_window(f"usage/{API_KEY}", auth.USAGE_WINDOW_SECONDS)[2]
+
+
+def test_shed_batch_is_not_charged(client, api_main, monkeypatch):
+    async def shed(endpoint, cost=None):
+        raise AdmissionRejected("queue full", 5)
+    monkeypatch.setattr(api_main.admission, "acquire", shed)
+    
+    response = client.post("/research/batch", json={"queries": ["a", "b", "c"]}, headers={"X-API-Key": API_KEY})
+    assert response.status_code == 503
+    assert usage() == 1  # just the request itself, not its three research runs
+
+
+def test_batch_over_quota_releases_its_admission(client, api_main, monkeypatch):
+    monkeypatch.setitem(auth.VALID_API_KEYS, API_KEY, {"name": "Test", "usage_limit": 2})
+    
+    response = client.post("/research/batch", json={"queries": ["a", "b", "c"]}, headers={"X-API-Key": API_KEY})
+    assert response.status_code == 429
+    assert usage() == 1
+    assert api_main.admission.in_flight == 0
+
+
+def test_rate_limited_request_gets_429_with_retry_after(client):
+    # GET /jobs/{job_id} allows 60/minute per IP and needs no API key or LLM
+    statuses = [client.get("/jobs/unknown").status_code for _ in range(60)]
+    assert statuses == [404] * 60
+    
+    response = client.get("/jobs/unknown")
+    assert response.status_code == 429
+    retry_after = int(response.headers["Retry-After"])
+    assert 1 <= retry_after <= 120
+    assert response.json()["retry_after"] == retry_after
+
+
+def test_rate_limit_is_checked_before_the_endpoint_runs(client):
+    # Body validation fails (422) after the limit check, so those requests still count
+    headers = {"X-API-Key": API_KEY}
+    statuses = [client.post("/research", json={}, headers=headers).status_code for _ in range(10)]
+    assert statuses == [422] * 10
+    assert client.post("/research", json={}, headers=headers).status_code == 429
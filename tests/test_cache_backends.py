@@ -0,0 +1,58 @@
+import pytest
+
+from cache_backends import CacheBackend, MemoryBackend, RedisBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_backend(request, tmp_path):
+    def make(**options):
+        if request.param == "memory":
+            return MemoryBackend(**options)
+        if request.param == "sqlite":
+            return SQLiteBackend(str(tmp_path / "cache.db"), **options)
+        fakeredis = pytest.importorskip("fakeredis")
+        return RedisBackend(client=fakeredis.FakeRedis(), **options)
+    return make
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_values_round_trip(make_backend):
+    backend = make_backend()
+    backend.set("q", {"result": "answer", "n": 1})
+    assert backend.get("q") == {"result": "answer", "n": 1}
+    assert "q" in backend and "other" not in backend
+    backend.clear()
+    assert backend.get("q") is None and len(backend) == 0
+
+
+def test_lru_evicts_least_recently_used(make_backend):
+    backend = make_backend(maxsize=2, eviction="lru")
+    backend.set("a", {"v": 1})
+    backend.set("b", {"v": 2})
+    backend.get("a")
+    backend.set("c", {"v": 3})
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1} and backend.get("c") == {"v": 3}
+    assert backend.size() == 2
+
+
+def test_redis_size_is_one_command():
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisBackend(client=fakeredis.FakeRedis())
+    for i in range(20):
+        backend.set(f"q{i}", {"v": i})
+    calls = []
+    backend.client.zrange = lambda *args, **kwargs: calls.append("zrange")
+    backend.client.exists = lambda *args, **kwargs: calls.append("exists")
+    assert backend.size() == 20 and calls == []
+
+
+def test_items_lists_live_entries(make_backend):
+    backend = make_backend(maxsize=10)
+    backend.set("a", {"query": "first"})
+    backend.set("b", {"query": "second"})
+    assert sorted(backend.items()) == [("a", {"query": "first"}), ("b", {"query": "second"})]
@@ -0,0 +1,33 @@
+import asyncio
+import threading
+
+import cache_manager
+from batch_research import aplan_batch
+
+
+def record_backend_threads(monkeypatch):
+    threads = []
+    backend = cache_manager.research_cache
+    for name in ("get", "set"):
+        method = getattr(backend, name)
+        def recorded(*args, _method=method):
+            threads.append(threading.current_thread())
+            return _method(*args)
+        monkeypatch.setattr(backend, name, recorded)
+    return threads
+
+
+def test_async_cache_calls_run_off_the_event_loop(monkeypatch):
+    cache_manager.clear_cache()
+    threads = record_backend_threads(monkeypatch)
+    
+    async def scenario():
+        await cache_manager.asave_to_cache("what are AI agents?", {"research": "agents"})
+        cached = await cache_manager.aget_from_cache("what are AI agents?")
+        cached_results, misses = await aplan_batch(["what are AI agents?", "new question", "new question"])
+        return cached, cached_results, misses
+    
+    cached, cached_results, misses = asyncio.run(scenario())
+    assert cached["research"] == "agents"
+    assert len(cached_results) == 1 and [m["query"] for m in misses] == ["new question"]
+    assert threads and threading.main_thread() not in threads
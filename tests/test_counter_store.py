@@ -0,0 +1,98 @@
+import pytest
+from limits import parse
+from limits.strategies import SlidingWindowCounterRateLimiter
+
+import counter_store
+from counter_store import CounterStoreStorage, MemoryCounterStore, RedisCounterStore, SQLiteCounterStore
+
+WINDOW = 60
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCounterStore()
+    if request.param == "sqlite":
+        return SQLiteCounterStore(str(tmp_path / "counters.db"))
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisCounterStore(client=fakeredis.FakeRedis())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen wall clock for the store; set clock.now to move it"""
+    class Clock:
+        now = 1_000_000 * WINDOW  # start of a window
+        
+        def time(self):
+            return self.now
+    
+    fake = Clock()
+    monkeypatch.setattr(counter_store.time, "time", fake.time)
+    return fake
+
+
+def test_hits_are_refused_past_the_limit(store, clock):
+    results = [store.hit("key", 5, WINDOW) for _ in range(7)]
+    assert [allowed for allowed, _ in results] == [True] * 5 + [False] * 2
+    assert results[4] == (True, 5)
+    assert store.get_window("key", WINDOW)[2] == 5
+
+
+def test_cost_is_all_or_nothing(store, clock):
+    assert store.hit("key", 10, WINDOW, cost=8) == (True, 8)
+    assert store.hit("key", 10, WINDOW, cost=3) == (False, 8)
+    assert store.hit("key", 10, WINDOW, cost=2) == (True, 10)
+
+
+def test_previous_window_is_weighted_by_overlap(store, clock):
+    for _ in range(10):
+        store.hit("key", 10, WINDOW)
+    # A quarter into the next window, 3/4 of the previous count still applies
+    clock.now += WINDOW * 1.25
+    assert store.hit("key", 10, WINDOW, cost=3) == (False, 7.5)
+    assert store.hit("key", 10, WINDOW, cost=2) == (True, 9.5)
+    previous, previous_ttl, current, current_ttl = store.get_window("key", WINDOW)
+    assert (previous, current) == (10, 2)
+    assert previous_ttl == pytest.approx(WINDOW * 0.75)
+    assert current_ttl == pytest.approx(WINDOW * 1.75)
+    # Two windows later nothing is left
+    clock.now += WINDOW * 2
+    assert store.hit("key", 10, WINDOW) == (True, 1)
+
+
+def test_keys_are_independent_and_clearable(store, clock):
+    store.hit("a", 1, WINDOW)
+    store.hit("ab", 1, WINDOW)
+    assert store.hit("a", 1, WINDOW)[0] is False
+    store.clear("a")
+    assert store.hit("a", 1, WINDOW)[0] is True
+    assert store.hit("ab", 1, WINDOW)[0] is False
+    store.reset()
+    assert store.hit("ab", 1, WINDOW)[0] is True
+    assert store.check()
+
+
+def test_limits_strategy_on_the_store(store, clock):
+    limiter = SlidingWindowCounterRateLimiter(CounterStoreStorage(store=store))
+    item = parse("3/minute")
+    assert [limiter.hit(item, "127.0.0.1") for _ in range(4)] == [True, True, True, False]
+    assert limiter.test(item, "10.0.0.1")
+    assert limiter.get_window_stats(item, "127.0.0.1").remaining == 0
+
+
+def test_memory_store_sweeps_keys_that_are_not_hit_again(clock):
+    store = MemoryCounterStore(sweep_interval=WINDOW)
+    for i in range(100):
+        store.hit(f"ip-{i}", 10, WINDOW)
+    assert store.size() == 100
+    clock.now += WINDOW * 3
+    store.hit("another", 10, WINDOW)
+    assert store.size() == 1
+
+
+def test_shared_sqlite_store_counts_across_connections(tmp_path, clock):
+    path = str(tmp_path / "counters.db")
+    first, second = SQLiteCounterStore(path), SQLiteCounterStore(path)
+    assert first.hit("key", 2, WINDOW)[0] and second.hit("key", 2, WINDOW)[0]
+    assert first.hit("key", 2, WINDOW)[0] is False
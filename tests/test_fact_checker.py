@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def agent_class(fake_llm):
+    from agents.fact_checker import FactCheckerAgent
+    return FactCheckerAgent
+
+
+def slow_claims(agent, seconds):
+    def verify_claim(claim, research_text, metrics):
+        time.sleep(seconds)
+        return {"claim": claim, "status": "SUPPORTED", "confidence": 90.0, "verification_details": ""}
+    agent._verify_claim = verify_claim
+
+
+def test_claims_share_one_deadline(agent_class):
+    agent = agent_class(max_workers=4, claim_timeout=0.2)
+    slow_claims(agent, 0.5)
+    start = time.monotonic()
+    results = agent._verify_concurrently([f"{i}. claim" for i in range(4)], "text", None)
+    assert time.monotonic() - start < 0.4
+    assert [r["status"] for r in results] == ["TIMEOUT"] * 4
+
+
+def test_deadline_covers_queued_claims(agent_class):
+    agent = agent_class(max_workers=2, claim_timeout=0.3)
+    slow_claims(agent, 0.1)
+    results = agent._verify_concurrently([f"{i}. claim" for i in range(4)], "text", None)
+    assert [r["status"] for r in results] == ["SUPPORTED"] * 4
+
+
+def test_explicit_zero_max_claims_is_kept(agent_class):
+    agent = agent_class(max_claims=0)
+    assert agent.max_claims == 0
+    report = agent.verify_claims("Batteries are improving.")
+    assert report["total_claims_checked"] == 0 and report["claims"] == []
+    report = agent_class().verify_claims("Batteries are improving.", max_claims=0)
+    assert report["claims"] == []
+
+
+def test_batch_falls_back_only_for_missing_claims(agent_class):
+    from langchain_core.messages import AIMessage
+    from agents.llm_utils import LLMCallMetrics
+    
+    agent = agent_class(mode="batched", batch_size=3)
+    agent._request_batch = lambda claims, research_text, metrics: AIMessage(
+        content='[{"id": 1, "status": "SUPPORTED", "confidence": 90}, {"id": 3, "status": "UNSUPPORTED", "confidence": 20}]'
+    )
+    rechecked = []
+    def verify_claim(claim, research_text, metrics):
+        rechecked.append(claim)
+        return {"claim": claim, "status": "PARTIALLY SUPPORTED", "confidence": 60.0, "verification_details": ""}
+    agent._verify_claim = verify_claim
+    
+    metrics = LLMCallMetrics()
+    results = agent._verify_batched(["1. a", "2. b", "3. c"], "text", metrics)
+    assert [r["status"] for r in results] == ["SUPPORTED", "PARTIALLY SUPPORTED", "UNSUPPORTED"]
+    assert rechecked == ["2. b"]
+    assert metrics.llm_calls == 1
+
+
+def test_timed_out_batch_is_not_rerun_or_counted(agent_class):
+    from agents.llm_utils import LLMCallMetrics
+    
+    agent = agent_class(mode="batched", batch_size=2, claim_timeout=0.1)
+    def slow_batch(claims, research_text, metrics):
+        time.sleep(0.5)
+        raise AssertionError("abandoned batch should not be used")
+    agent._request_batch = slow_batch
+    agent._verify_claim = lambda *args: pytest.fail("timed out batch was re-run per claim")
+    
+    metrics = LLMCallMetrics()
+    results = agent._verify_batched(["1. a", "2. b"], "text", metrics)
+    assert [r["status"] for r in results] == ["TIMEOUT", "TIMEOUT"]
+    assert metrics.llm_calls == 0
+
+
+def test_expected_llm_calls(agent_class):
+    from admission import ENDPOINT_COSTS
+    
+    agent = agent_class(max_claims=5, batch_size=10)
+    assert agent.expected_llm_calls(mode="per_claim") == ENDPOINT_COSTS["verify_per_claim"]
+    assert agent.expected_llm_calls(mode="batched") == ENDPOINT_COSTS["verify_batched"]
+    assert agent_class(max_claims=25, batch_size=10).expected_llm_calls(mode="batched") == 1 + 3
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+
+from job_queue import JobQueue
+
+
+async def wait_for_status(queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}: {queue.get(job_id)}")
+
+
+def test_two_queues_on_one_db_run_each_job_once(tmp_path):
+    """Two workers (own thread, event loop and connection) share one database"""
+    path = str(tmp_path / "jobs.db")
+    queries = [f"question {i}" for i in range(40)]
+    runs = []
+    
+    async def handler(query):
+        runs.append(query)
+        await asyncio.sleep(0.001)
+        return {"report": query}
+    
+    submitter = JobQueue(path)
+    job_ids = [asyncio.run(submitter.submit(query))[0]["job_id"] for query in queries]
+    
+    def worker():
+        async def run():
+            # Every queued job is on both workers' local queues
+            queue = JobQueue(path, workers=4)
+            await queue.start(handler)
+            while any(queue.get(job_id)["status"] != "done" for job_id in job_ids):
+                await asyncio.sleep(0.01)
+            await queue.stop()
+        asyncio.run(run())
+    
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    
+    assert sorted(runs) == sorted(queries)
+    assert submitter.get(job_ids[0])["result"] == {"report": queries[0]}
+
+
+def test_running_job_of_a_live_queue_is_not_recovered(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    started = []
+    
+    async def slow_handler(query):
+        started.append(query)
+        await asyncio.sleep(0.5)
+        return {}
+    
+    async def scenario():
+        first = JobQueue(path, workers=1, heartbeat=0.05, stale_after=0.3)
+        job, _ = await first.submit("q")
+        await first.start(slow_handler)
+        await wait_for_status(first, job["job_id"], "running")
+        # A second worker starting up leaves the live job alone
+        second = JobQueue(path, workers=1, heartbeat=0.05, stale_after=0.3)
+        await second.start(slow_handler)
+        await wait_for_status(first, job["job_id"], "done")
+        await first.stop()
+        await second.stop()
+        return second.stats["recovered"]
+    
+    assert asyncio.run(scenario()) == 0
+    assert started == ["q"]
+
+
+def test_stale_job_is_recovered_and_finished_jobs_pruned(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    
+    async def handler(query):
+        return {"ok": True}
+    
+    async def scenario():
+        dead = JobQueue(path)
+        job, _ = await dead.submit("q")
+        # Simulate a worker that claimed the job and then died
+        dead._claim(job["job_id"], time.time() - 120)
+        with dead._lock:
+            dead._conn.execute("UPDATE jobs SET heartbeat_at = ?", (time.time() - 120,))
+        
+        live = JobQueue(path, stale_after=60, retention=0)
+        await live.start(handler)
+        await wait_for_status(live, job["job_id"], "done")
+        assert live.stats["recovered"] == 1
+        
+        live._maintain(starting=False)
+        await live.stop()
+        return live.get(job["job_id"]), live.stats["pruned"]
+    
+    job, pruned = asyncio.run(scenario())
+    assert job is None and pruned == 1
+
+
+def test_concurrent_submits_from_two_queues_are_deduplicated(tmp_path):
+    """Each queue has its own connection and lock, like separate worker processes"""
+    path = str(tmp_path / "jobs.db")
+    queues = [JobQueue(path), JobQueue(path)]
+    queries = [f"question {i}" for i in range(50)]
+    barrier = threading.Barrier(len(queues))
+    job_ids = [[] for _ in queues]
+    
+    def submit_all(index):
+        barrier.wait()
+        for query in queries:
+            job, _ = queues[index]._insert(query)
+            job_ids[index].append(job["job_id"])
+    
+    threads = [threading.Thread(target=submit_all, args=(i,)) for i in range(len(queues))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    
+    assert job_ids[0] == job_ids[1]
+    assert queues[0].get_stats()["jobs"]["queued"] == len(queries)
+    assert sum(queue.stats["submitted"] for queue in queues) == len(queries)
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def orchestrator(fake_llm):
+    from agents.orchestrator import OrchestratorAgent
+    return OrchestratorAgent()
+
+
+def test_research_complete_without_a_loop(orchestrator):
+    report = orchestrator.research_complete("solid state batteries", research_text="Batteries are improving.")
+    assert report["agents_executed"] == ["Researcher", "Summarizer", "Fact-Checker"]
+
+
+def test_research_complete_inside_a_running_loop(orchestrator):
+    async def sync_caller_on_the_loop():
+        return orchestrator.research_complete("solid state batteries", research_text="Batteries are improving.")
+    
+    report = asyncio.run(sync_caller_on_the_loop())
+    assert report["agents_executed"] == ["Researcher", "Summarizer", "Fact-Checker"]
+
+
+def test_expected_llm_calls_follow_the_settings(orchestrator):
+    from admission import ENDPOINT_COSTS
+    
+    assert orchestrator.expected_llm_calls() == ENDPOINT_COSTS["complete"]
+    assert orchestrator.expected_llm_calls(research_cached=True) == ENDPOINT_COSTS["complete"] - 1
+    orchestrator.summary_mode = "single_pass"
+    orchestrator.fact_checker.max_claims = 8
+    assert orchestrator.expected_llm_calls() == 1 + 1 + 1 + 8
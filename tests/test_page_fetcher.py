@@ -0,0 +1,31 @@
+import asyncio
+
+import httpx
+
+from tools.page_fetcher import PageFetcher
+
+
+def test_per_host_limit_holds_and_idle_hosts_are_dropped():
+    fetcher = PageFetcher(per_host=2)
+    active, peak = {}, {}
+    
+    async def handler(request):
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.01)
+        active[host] -= 1
+        return httpx.Response(200, text="page text", headers={"content-type": "text/plain"})
+    
+    async def scenario():
+        state = fetcher._loop_state()
+        state["client"] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        urls = [f"https://host{i % 5}.example/page{i}" for i in range(30)]
+        texts = await fetcher.fetch_many(urls)
+        await fetcher.aclose()
+        return texts, state
+    
+    texts, state = asyncio.run(scenario())
+    assert texts == ["page text"] * 30
+    assert peak == {f"host{i}.example": 2 for i in range(5)}
+    assert state["host_limits"] == {}
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from pipeline_benchmark import percentile
+
+
+@pytest.mark.parametrize("values, pct, expected", [
+    (list(range(1, 21)), 95, 19),
+    (list(range(1, 101)), 99, 99),
+    (list(range(1, 101)), 50, 50),
+    (list(range(1, 11)), 50, 5),
+    (list(range(1, 11)), 51, 6),
+    (list(range(1, 11)), 100, 10),
+    (list(range(1, 11)), 0, 1),
+    ([3.0], 99, 3.0),
+    ([], 95, 0.0),
+])
+def test_nearest_rank(values, pct, expected):
+    assert percentile(values, pct) == expected
+
+
+def test_order_does_not_matter():
+    assert percentile([5, 1, 4, 2, 3], 60) == 3
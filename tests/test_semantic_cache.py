@@ -0,0 +1,101 @@
+import pytest
+
+import cache_manager
+from cache_manager import SEMANTIC_CACHE_THRESHOLD, get_from_cache, save_to_cache
+from semantic_cache import SemanticIndex
+
+
+@pytest.fixture
+def index():
+    index = SemanticIndex()
+    for i, query in enumerate([
+        "latest developments in quantum computing 2024",
+        "Python list comprehension",
+        "What is machine learning?",
+        "How does photosynthesis work",
+        "benefits of electric cars"
+    ]):
+        index.add("research", query, str(i))
+    return index
+
+
+@pytest.mark.parametrize("query", [
+    "What is machine learning",
+    "what is machine learning?",
+    "benefits of electric car"
+])
+def test_rephrasings_match(index, query):
+    assert index.find("research", query, SEMANTIC_CACHE_THRESHOLD) is not None
+
+
+@pytest.mark.parametrize("query", [
+    "latest developments in quantum computing 2025",  # different year
+    "Python list comprehension performance",          # narrower question
+    "explain photosynthesis",                         # 'work' is a content word
+    "What is machine learning in 2024?"              # adds a number
+])
+def test_different_questions_do_not_match(index, query):
+    assert index.find("research", query, SEMANTIC_CACHE_THRESHOLD) is None
+
+
+def test_only_research_answers_are_matched_semantically():
+    cache_manager.clear_cache()
+    save_to_cache("what are AI agents?", {"research": "agents"})
+    save_to_cache("what are AI agents?", {"report": "full report"}, namespace="complete")
+    
+    assert get_from_cache("What are AI agents", namespace="research")["semantic_match"]
+    assert get_from_cache("What are AI agents", namespace="complete") is None
+    assert get_from_cache("what are AI agents?", namespace="complete")["report"] == "full report"
+
+
+@pytest.fixture
+def agents_index():
+    index = SemanticIndex()
+    for i, query in enumerate([
+        "what are AI agents?",
+        "Python list comprehension",
+        "climate change effects on agriculture",
+        "How does photosynthesis work",
+        "history of the roman empire"
+    ]):
+        index.add("research", query, str(i))
+    return index
+
+
+# The threshold behaviour the cache is tuned for: rewordings and follow-ups
+# that only refer back to the subject match; anything that adds or drops a
+# topic word is a different question
+@pytest.mark.parametrize("query, matched", [
+    ("What are AI agents and how do they work", "what are AI agents?"),
+    ("what are ai agents", "what are AI agents?"),
+    ("AI agents", "what are AI agents?"),
+    ("how does photosynthesis work?", "How does photosynthesis work"),
+    ("the history of the Roman Empire", "history of the roman empire")
+])
+def test_threshold_matches_paraphrases(agents_index, query, matched):
+    match = agents_index.find("research", query, SEMANTIC_CACHE_THRESHOLD)
+    assert match is not None and match[1] == matched
+
+
+@pytest.mark.parametrize("query", [
+    "how do AI agents work",                 # 'work' is the subject here
+    "what are AI agent frameworks",
+    "Python list comprehension performance",
+    "climate change effects",                # drops 'agriculture'
+    "history of the roman empire fall",
+    "why does photosynthesis matter"
+])
+def test_threshold_rejects_different_questions(agents_index, query):
+    assert agents_index.find("research", query, SEMANTIC_CACHE_THRESHOLD) is None
+
+
+def test_index_is_rebuilt_from_the_backend(monkeypatch):
+    cache_manager.clear_cache()
+    save_to_cache("what are AI agents?", {"query": "what are AI agents?", "research": "agents"})
+    save_to_cache("what are AI agents?", {"query": "what are AI agents?", "report": "r"}, namespace="complete")
+    # A fresh worker: same backend, empty index
+    monkeypatch.setattr(cache_manager, "semantic_index", SemanticIndex())
+    assert get_from_cache("What are AI agents and how do they work") is None
+    
+    assert cache_manager.rebuild_semantic_index() == 1
+    assert get_from_cache("What are AI agents and how do they work")["research"] == "agents"
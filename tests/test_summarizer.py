@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agents.context_compression import compressor
+from agents.summarizer import SUMMARY_PROMPTS, SummarizerAgent
+
+RESEARCH = "Solid state batteries store more energy. Costs are falling as production scales."
+
+
+class FakeChain:
+    """Stands in for prompt | llm, answering every call with `reply` (raised if an exception)"""
+    
+    def __init__(self, reply, calls):
+        self.reply = reply
+        self.calls = calls
+    
+    def invoke(self, inputs):
+        self.calls.append(inputs)
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return AIMessage(content=self.reply)
+    
+    async def ainvoke(self, inputs):
+        return self.invoke(inputs)
+
+
+def make_agent(all_reply, single_reply="A summary."):
+    calls = {"all": [], "single": []}
+    agent = SummarizerAgent.__new__(SummarizerAgent)
+    agent.compressor = compressor
+    agent._summary_chain = lambda summary_type: (
+        FakeChain(all_reply, calls["all"]) if summary_type == "all" else FakeChain(single_reply, calls["single"])
+    )
+    return agent, calls
+
+
+@pytest.fixture(params=["sync", "async"])
+def summarize_all(request):
+    if request.param == "sync":
+        return lambda agent: agent.summarize_all(RESEARCH)
+    return lambda agent: asyncio.run(agent.asummarize_all(RESEARCH))
+
+
+def test_single_pass_response_is_split(summarize_all):
+    agent, calls = make_agent(json.dumps({t: f"{t} text" for t in SUMMARY_PROMPTS}))
+    results = summarize_all(agent)
+    assert {t: r["summary"] for t, r in results.items()} == {t: f"{t} text" for t in SUMMARY_PROMPTS}
+    assert len(calls["all"]) == 1 and calls["single"] == []
+
+
+@pytest.mark.parametrize("reply", ["not json at all", '["a list"]', '{"brief": "only one format"}'])
+def test_unparseable_response_falls_back_per_format(summarize_all, reply):
+    agent, calls = make_agent(reply)
+    results = summarize_all(agent)
+    assert all(r["summary"] == "A summary." for r in results.values())
+    assert len(calls["single"]) == len(SUMMARY_PROMPTS)
+
+
+def test_failed_call_is_not_retried_per_format(summarize_all):
+    agent, calls = make_agent(RuntimeError("429 Resource exhausted"))
+    results = summarize_all(agent)
+    assert results == {t: {"error": "429 Resource exhausted"} for t in SUMMARY_PROMPTS}
+    assert len(calls["all"]) == 1 and calls["single"] == []
@@ -0,0 +1,59 @@
+import json
+import logging
+
+
+class Event:
+    """
+    A structured log message: an event name plus fields
+    
+    Rendered as `name {"field": ...}` only when a handler formats the
+    record, so with queued logging the JSON encoding happens on the log
+    writer thread, not on the request path.
+    """
+    
+    __slots__ = ("name", "fields")
+    
+    def __init__(self, name: str, fields: dict):
+        self.name = name
+        self.fields = fields
+    
+    def __str__(self):
+        if not self.fields:
+            return self.name
+        return f"{self.name} {json.dumps(self.fields, default=str, ensure_ascii=False)}"
+
+
+class EventLogger:
+    """
+    Leveled structured events on a standard logger
+    
+    Usage:
+        events = get_event_logger("agents.researcher")
+        events.info("search_done", question=question, sources=5)
+    
+    Events below the logger's level cost one level check.
+    """
+    
+    def __init__(self, name: str):
+        self.logger = logging.getLogger(name)
+    
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, fields)
+    
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+    
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+    
+    def error(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields)
+    
+    def _log(self, level: int, event: str, fields: dict):
+        if self.logger.isEnabledFor(level):
+            # stacklevel points %(funcName)s / %(lineno)d at the caller
+            self.logger.log(level, Event(event, fields), stacklevel=3)
+
+
+def get_event_logger(name: str) -> EventLogger:
+    return EventLogger(name)
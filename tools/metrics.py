@@ -0,0 +1,205 @@
+from bisect import bisect_left
+import threading
+import time
+
+# Prometheus-style metrics kept in process and rendered in the text
+# exposition format on /metrics. Hand-rolled to avoid a dependency: every
+# update is a dict lookup and an add under one lock.
+
+# Seconds; covers cache hits (ms) through slow multi-stage reports (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per label combination"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+    
+    def render(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in values]
+
+
+class Gauge(Counter):
+    """Current value per label combination, set or moved in either direction"""
+    
+    kind = "gauge"
+    
+    def set(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Bucketed distribution of observations (e.g. latencies) per label combination"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (plus +Inf), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def time(self, **labels) -> "_Timer":
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, labels)
+    
+    def render(self) -> list:
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Named metrics rendered together; creating an existing name returns it"""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labels)
+    
+    def gauge(self, name: str, help: str, labels: tuple = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labels)
+    
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labels, buckets=buckets)
+    
+    def _get_or_create(self, cls, name, help, labels, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help, labels, **kwargs)
+            return self._metrics[name]
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# One registry per process
+registry = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Web search
+SEARCH_SECONDS = registry.histogram(
+    "search_request_seconds", "DuckDuckGo search latency (cache misses and refreshes)", ("status",))
+
+# LLM calls; seconds include rate-limit waits and retries
+LLM_SECONDS = registry.histogram(
+    "llm_request_seconds", "LLM call latency by agent, model and prompt", ("agent", "model", "prompt", "status"))
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "LLM tokens by agent, model and direction (input/output)", ("agent", "model", "direction"))
+LLM_RETRIES = registry.counter(
+    "llm_retries_total", "LLM calls retried after a transient error", ("model", "reason"))
+LLM_QUEUE_SECONDS = registry.histogram(
+    "llm_queue_wait_seconds", "Time LLM calls waited for the rate limiter", ("model", "lane"))
+
+# Orchestrator
+STAGE_SECONDS = registry.histogram(
+    "pipeline_stage_seconds", "Orchestrator stage latency", ("stage", "status"))
+REPORT_SECONDS = registry.histogram(
+    "report_seconds", "Complete report latency (wall clock)", ("status",))
+
+# Caches (stage caches and the search cache)
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+
+# Admission control (api/admission.py); cost is in expected LLM calls
+ADMISSION_IN_FLIGHT = registry.gauge(
+    "admission_in_flight_cost", "Expected LLM calls of admitted requests still running")
+ADMISSION_QUEUED = registry.gauge(
+    "admission_queued_cost", "Expected LLM calls of requests waiting for admission")
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "admission_wait_seconds", "Time requests waited for admission", ("endpoint", "result"))
+ADMISSION_SHED = registry.counter(
+    "admission_shed_total", "Requests rejected with 503 by admission control", ("endpoint", "reason"))
+
+# HTTP
+HTTP_SECONDS = registry.histogram(
+    "http_request_seconds", "API request latency by route", ("method", "route", "status"))
+ERRORS = registry.counter(
+    "errors_total", "Errors by component", ("component",))
+
+
+def render_metrics() -> str:
+    return registry.render()
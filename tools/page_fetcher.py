@@ -0,0 +1,240 @@
+from cachetools import LRUCache
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+import asyncio
+import importlib.util
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.log_events import get_event_logger
+from tools.metrics import CACHE_REQUESTS, ERRORS
+
+# Full-page fetching for deep research
+# FETCH_TIMEOUT = seconds allowed per page (default 8)
+# FETCH_MAX_BYTES = bytes read per page before the rest is dropped (default 1 MB)
+# FETCH_PER_HOST = concurrent requests to one host (default 2)
+# FETCH_MAX_CONNECTIONS = pooled connections across all hosts (default 20)
+# PAGE_MAX_CHARS = extracted text kept per page (default 4000)
+# PAGE_CACHE_TTL = seconds a fetched page is reused without asking the server
+#                  again; after that it's revalidated with its ETag (default 1 hour)
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", 8))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", 1_000_000))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", 2))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", 20))
+PAGE_MAX_CHARS = int(os.getenv("PAGE_MAX_CHARS", 4000))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", 3600))
+
+events = get_event_logger("tools.page_fetcher")
+
+USER_AGENT = "Mozilla/5.0 (compatible; AI-Research-Assistant/1.0)"
+
+# Page chrome that never holds the article text
+_BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe"]
+
+# lxml is much faster than the built-in parser; used when installed
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+
+def extract_text(html: str, max_chars: int = PAGE_MAX_CHARS) -> str:
+    """
+    Main readable text of an HTML page
+    
+    Drops scripts, navigation and other page chrome, prefers the <article>
+    or <main> element when the page has one, and keeps one block per line.
+    """
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html, HTML_PARSER)
+    for tag in soup(_BOILERPLATE_TAGS):
+        tag.decompose()
+    
+    root = soup.find("article") or soup.find("main") or soup.body or soup
+    lines = []
+    for line in root.get_text("\n").splitlines():
+        line = re.sub(r"\s+", " ", line).strip()
+        # Skip menu items, buttons and other fragments
+        if len(line.split()) >= 4 or (lines and line.endswith((".", ":"))):
+            lines.append(line)
+    return "\n".join(lines)[:max_chars]
+
+
+class PageFetcher:
+    """
+    Fetches pages concurrently over one pooled HTTP client
+    
+    Requests are capped per host and overall, time out after FETCH_TIMEOUT
+    and stop reading at FETCH_MAX_BYTES. Extracted text is cached by URL;
+    expired entries are revalidated with If-None-Match / If-Modified-Since,
+    so an unchanged page costs a 304 and no re-parsing.
+    """
+    
+    def __init__(self, timeout: float = FETCH_TIMEOUT, max_bytes: int = FETCH_MAX_BYTES,
+                 per_host: int = FETCH_PER_HOST, max_connections: int = FETCH_MAX_CONNECTIONS,
+                 max_chars: int = PAGE_MAX_CHARS, cache_ttl: int = PAGE_CACHE_TTL, cache_size: int = 200):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.per_host = per_host
+        self.max_connections = max_connections
+        self.max_chars = max_chars
+        self.cache_ttl = cache_ttl
+        self.cache = LRUCache(maxsize=cache_size)
+        self.stats = {"fetches": 0, "cache_hits": 0, "revalidated": 0, "errors": 0,
+                      "truncated": 0, "bytes_downloaded": 0}
+        self._cache_lock = threading.Lock()
+        # Clients and semaphores belong to the event loop that created them:
+        # the API shares one, sync callers (asyncio.run per call) get their own
+        self._per_loop = weakref.WeakKeyDictionary()
+    
+    def _loop_state(self) -> dict:
+        loop = asyncio.get_running_loop()
+        state = self._per_loop.get(loop)
+        if state is None:
+            import httpx
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT, "Accept": "text/html,text/plain;q=0.9"}
+            )
+            state = self._per_loop[loop] = {"client": client, "host_limits": {}}
+        return state
+    
+    @asynccontextmanager
+    async def _host_limit(self, state: dict, url: str):
+        """
+        Hold one of the url's host's per_host request slots
+        
+        A host's semaphore is dropped once no fetch holds or waits for it,
+        so a long-running server doesn't keep one for every host it ever
+        fetched from. Runs on one event loop, so the count needs no lock.
+        """
+        host = urlparse(url).netloc.lower()
+        limits = state["host_limits"]  # host -> [semaphore, fetches holding or waiting]
+        entry = limits.get(host)
+        if entry is None:
+            entry = limits[host] = [asyncio.Semaphore(self.per_host), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del limits[host]
+    
+    async def fetch(self, url: str):
+        """
+        Extracted text of one page, or None if it can't be fetched or isn't HTML/text
+        """
+        with self._cache_lock:
+            entry = self.cache.get(url)
+        if entry and time.time() - entry["fetched_at"] < self.cache_ttl:
+            self.stats["cache_hits"] += 1
+            CACHE_REQUESTS.inc(cache="page", result="hit")
+            return entry["text"]
+        
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        
+        state = self._loop_state()
+        try:
+            async with self._host_limit(state, url):
+                async with state["client"].stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and entry:
+                        self.stats["revalidated"] += 1
+                        CACHE_REQUESTS.inc(cache="page", result="revalidated")
+                        entry["fetched_at"] = time.time()
+                        return entry["text"]
+                    response.raise_for_status()
+                    content_type = response.headers.get("content-type", "")
+                    if "html" not in content_type and "text/plain" not in content_type:
+                        return None
+                    
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body.extend(chunk)
+                        if len(body) >= self.max_bytes:
+                            self.stats["truncated"] += 1
+                            break
+                    etag = response.headers.get("etag")
+                    last_modified = response.headers.get("last-modified")
+                    encoding = response.encoding or "utf-8"
+        except Exception as e:
+            events.warning("page_fetch_error", url=url, error=str(e))
+            self.stats["errors"] += 1
+            ERRORS.inc(component="page_fetch")
+            return None
+        
+        self.stats["fetches"] += 1
+        CACHE_REQUESTS.inc(cache="page", result="miss")
+        self.stats["bytes_downloaded"] += len(body)
+        html = bytes(body[:self.max_bytes]).decode(encoding, errors="replace")
+        if "html" in content_type:
+            # Parsing is CPU-bound; keep it off the event loop
+            text = await asyncio.to_thread(extract_text, html, self.max_chars)
+        else:
+            text = html[:self.max_chars]
+        
+        with self._cache_lock:
+            self.cache[url] = {"text": text, "etag": etag, "last_modified": last_modified,
+                               "fetched_at": time.time()}
+        return text
+    
+    async def fetch_many(self, urls: list) -> list:
+        """Fetch all urls concurrently; text (or None) in the same order"""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+    
+    async def aclose(self):
+        """Close the running loop's client (for short-lived loops)"""
+        state = self._per_loop.pop(asyncio.get_running_loop(), None)
+        if state:
+            await state["client"].aclose()
+    
+    def get_stats(self) -> dict:
+        return {
+            "cache_size": len(self.cache),
+            "max_size": self.cache.maxsize,
+            "cache_ttl_seconds": self.cache_ttl,
+            "parser": HTML_PARSER,
+            **self.stats
+        }
+
+
+# One fetcher (connection pool and page cache) per process
+fetcher = PageFetcher()
+
+
+async def fetch_pages(urls: list) -> list:
+    """Extracted text of each url (None where the fetch failed)"""
+    return await fetcher.fetch_many(urls)
+
+
+def fetch_pages_sync(urls: list) -> list:
+    """Blocking fetch_pages for sync callers (runs and closes its own loop)"""
+    async def run():
+        try:
+            return await fetcher.fetch_many(urls)
+        finally:
+            await fetcher.aclose()
+    return asyncio.run(run())
+
+
+def get_page_cache_stats() -> dict:
+    """Get page fetch and cache statistics"""
+    return fetcher.get_stats()
+
+
+# Test it
+if __name__ == "__main__":
+    pages = fetch_pages_sync(["https://python.langchain.com/docs/introduction/"])
+    print(pages[0][:500] if pages[0] else "Fetch failed")
+    print(get_page_cache_stats())
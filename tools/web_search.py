@@ -1,31 +1,150 @@
-from duckduckgo_search import DDGS
+from cachetools import LRUCache
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.log_events import get_event_logger
+from tools.metrics import CACHE_REQUESTS, ERRORS, SEARCH_SECONDS
+
+# Search result cache, kept separate from the LLM-output caches so a failed
+# LLM call or a retry never re-queries the search engine
+# SEARCH_CACHE_TTL = seconds results are served as fresh (default 15 minutes)
+# SEARCH_CACHE_STALE_TTL = seconds past that they're still served while
+#                          being refreshed in the background (default 1 hour)
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 900))
+SEARCH_CACHE_STALE_TTL = int(os.getenv("SEARCH_CACHE_STALE_TTL", 3600))
+search_cache = LRUCache(maxsize=int(os.getenv("SEARCH_CACHE_MAXSIZE", 500)))
+search_cache_stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+events = get_event_logger("tools.web_search")
+
+_cache_lock = threading.Lock()
+_refreshing = set()
+
+# One DDGS client per thread, reused across searches instead of a new
+# client (and connection pool) on every call
+_clients = threading.local()
+
+def _get_client():
+    if not hasattr(_clients, "ddgs"):
+        from duckduckgo_search import DDGS
+        _clients.ddgs = DDGS()
+    return _clients.ddgs
+
+def warm_up():
+    """Load the search client library ahead of the first search"""
+    import duckduckgo_search  # noqa: F401
+
+def _fetch(query: str, max_results: int) -> list:
+    """Query DuckDuckGo (raises on failure)"""
+    results = []
+    
+    for result in _get_client().text(query, max_results=max_results):
+        results.append({
+            'title': result.get('title', ''),
+            'url': result.get('href', ''),
+            'snippet': result.get('body', '')
+        })
+    
+    return results
+
+def _timed_fetch(query: str, max_results: int) -> list:
+    """_fetch, recording its latency and errors in the search metrics"""
+    start = time.perf_counter()
+    try:
+        results = _fetch(query, max_results)
+    except Exception:
+        SEARCH_SECONDS.observe(time.perf_counter() - start, status="error")
+        ERRORS.inc(component="search")
+        raise
+    SEARCH_SECONDS.observe(time.perf_counter() - start, status="ok")
+    return results
+
+def _refresh(key: tuple, query: str, max_results: int):
+    """Re-fetch a stale entry in the background, keeping the stale copy on failure"""
+    try:
+        results = _timed_fetch(query, max_results)
+        with _cache_lock:
+            search_cache[key] = (time.time(), results)
+            search_cache_stats["refreshes"] += 1
+    except Exception as e:
+        events.warning("search_refresh_error", query=query, error=str(e))
+        search_cache_stats["errors"] += 1
+    finally:
+        with _cache_lock:
+            _refreshing.discard(key)
 
 def search_web(query: str, max_results: int = 5):
     """
-    Search web using DuckDuckGo
+    Search web using DuckDuckGo, with a stale-while-revalidate cache
     
     Args:
         query: Search query string
         max_results: Number of results to return
-        
+    
     Returns:
         List of dicts with {title, url, snippet}
     """
-    try:
-        results = []
-        ddgs = DDGS()
+    key = (query.lower().strip(), max_results)
+    
+    with _cache_lock:
+        entry = search_cache.get(key)
+    
+    if entry is not None:
+        fetched_at, results = entry
+        age = time.time() - fetched_at
         
-        for result in ddgs.text(query, max_results=max_results):
-            results.append({
-                'title': result.get('title', ''),
-                'url': result.get('href', ''),
-                'snippet': result.get('body', '')
-            })
-            
-        return results
+        if age < SEARCH_CACHE_TTL:
+            search_cache_stats["fresh_hits"] += 1
+            CACHE_REQUESTS.inc(cache="search", result="hit")
+            return list(results)
+        
+        if age < SEARCH_CACHE_TTL + SEARCH_CACHE_STALE_TTL:
+            search_cache_stats["stale_hits"] += 1
+            CACHE_REQUESTS.inc(cache="search", result="stale_hit")
+            with _cache_lock:
+                start_refresh = key not in _refreshing
+                _refreshing.add(key)
+            if start_refresh:
+                threading.Thread(target=_refresh, args=(key, query, max_results), daemon=True).start()
+            return list(results)
+    
+    search_cache_stats["misses"] += 1
+    CACHE_REQUESTS.inc(cache="search", result="miss")
+    try:
+        results = _timed_fetch(query, max_results)
     except Exception as e:
-        print(f"Search error: {e}")
+        events.warning("search_error", query=query, error=str(e))
+        search_cache_stats["errors"] += 1
         return []
+    
+    # Empty result sets aren't cached so a transient throttle isn't remembered
+    if results:
+        with _cache_lock:
+            search_cache[key] = (time.time(), results)
+    return results
+
+def get_search_cache_stats():
+    """Get search result cache statistics"""
+    lookups = search_cache_stats["fresh_hits"] + search_cache_stats["stale_hits"] + search_cache_stats["misses"]
+    hits = search_cache_stats["fresh_hits"] + search_cache_stats["stale_hits"]
+    return {
+        "cache_size": len(search_cache),
+        "max_size": search_cache.maxsize,
+        "ttl_seconds": SEARCH_CACHE_TTL,
+        "stale_ttl_seconds": SEARCH_CACHE_STALE_TTL,
+        **search_cache_stats,
+        "hit_rate": f"{(hits / lookups * 100) if lookups > 0 else 0:.2f}%"
+    }
+
+def clear_search_cache():
+    """Clear all cached search results"""
+    with _cache_lock:
+        search_cache.clear()
+    for stat in search_cache_stats:
+        search_cache_stats[stat] = 0
 
 # Test it
 if __name__ == "__main__":